@@ -0,0 +1,106 @@
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+_BENCHMARKS = {}
+
+
+def benchmark(name, **param_grid):
+    """
+    Registers a benchmark. The decorated function receives one combination of the grid parameters,
+    prepares everything that should not be measured and returns the zero-argument callable to time.
+    It is called again before every repetition, so each measurement starts from a fresh state.
+    """
+
+    def decorator(factory):
+        _BENCHMARKS[name] = (factory, param_grid)
+        return factory
+
+    return decorator
+
+
+def registered_benchmarks():
+    return list(_BENCHMARKS)
+
+
+def run_benchmarks(names=None, repeat=5, quick=False):
+    results = []
+    for name in names or registered_benchmarks():
+        factory, param_grid = _BENCHMARKS[name]
+        for params in _param_combinations(param_grid, quick):
+            timings = [_time_once(factory, params) for _ in range(repeat)]
+            results.append({
+                "name": name,
+                "params": params,
+                "repeat": repeat,
+                "min": min(timings),
+                "median": statistics.median(timings),
+                "mean": statistics.mean(timings),
+            })
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": _current_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def save_results(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def regressions(baseline, current, threshold=1.2):
+    """Benchmarks whose median got slower than threshold times the baseline median."""
+    baseline_medians = {_result_id(result): result["median"] for result in baseline["results"]}
+    slower = []
+    for result in current["results"]:
+        baseline_median = baseline_medians.get(_result_id(result))
+        if baseline_median and result["median"] > baseline_median * threshold:
+            slower.append({
+                "name": result["name"],
+                "params": result["params"],
+                "baseline_median": baseline_median,
+                "median": result["median"],
+                "ratio": result["median"] / baseline_median,
+            })
+    return slower
+
+
+# Private functions
+
+def _param_combinations(param_grid, quick):
+    names = list(param_grid)
+    # Quick runs only use the smallest value of every parameter
+    values = [param_grid[name][:1] if quick else param_grid[name] for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def _time_once(factory, params):
+    timed_function = factory(**params)
+    started = time.perf_counter()
+    timed_function()
+    return time.perf_counter() - started
+
+
+def _result_id(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def _current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,91 @@
+"""
+Measures how long importing a ci_pipe module takes with `python -X importtime` and guards the budget.
+
+    python -m benchmarks.import_time [--module ci_pipe.pipeline] [--budget-ms 100] [--repeat 5]
+                                     [--output import_time.json]
+
+The exit code is 1 when the import takes longer than the budget or when a dependency that should be
+imported lazily is imported eagerly.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SOURCES_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+LAZY_DEPENDENCIES = ("rich", "yaml", "numpy")
+
+
+def import_time_report(module="ci_pipe.pipeline", repeat=5):
+    """Best cumulative import time (in microseconds) of module over repeat fresh interpreters."""
+    runs = [_measure_import(module) for _ in range(repeat)]
+    return {
+        "module": module,
+        "repeat": repeat,
+        "cumulative_us": min(cumulative_us for cumulative_us, _ in runs),
+        "eager_lazy_dependencies": sorted(set().union(*(imported for _, imported in runs))),
+    }
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    report = import_time_report(args.module, args.repeat)
+    report["budget_us"] = args.budget_ms * 1000
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"{report['module']} imports in {report['cumulative_us'] / 1000:.1f} ms (budget {args.budget_ms} ms)")
+
+    failed = False
+    if report["cumulative_us"] > report["budget_us"]:
+        print("Import time is over budget")
+        failed = True
+    if report["eager_lazy_dependencies"]:
+        print(f"Imported eagerly: {', '.join(report['eager_lazy_dependencies'])}")
+        failed = True
+    return 1 if failed else 0
+
+
+# Private functions
+
+def _measure_import(module):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, env=_environment(),
+    )
+    cumulative_us = None
+    imported = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        imported_name = name.strip()
+        if imported_name == module:
+            cumulative_us = int(cumulative)
+        if imported_name in LAZY_DEPENDENCIES:
+            imported.add(imported_name)
+    return cumulative_us, imported
+
+
+def _environment():
+    environment = dict(os.environ)
+    python_path = environment.get("PYTHONPATH")
+    environment["PYTHONPATH"] = SOURCES_DIRECTORY + (os.pathsep + python_path if python_path else "")
+    return environment
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="Measure and guard the ci_pipe import time.")
+    parser.add_argument("--module", default="ci_pipe.pipeline", help="Module to import.")
+    parser.add_argument("--budget-ms", type=float, default=100, help="Maximum cumulative import time.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters to measure with.")
+    parser.add_argument("--output", help="Path of the JSON report.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
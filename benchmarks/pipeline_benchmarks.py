@@ -0,0 +1,162 @@
+from ci_pipe.multi_pipeline import MultiCIPipe
+from ci_pipe.pipeline import CIPipe
+from external_dependencies.file_system.in_memory_file_system import InMemoryFileSystem
+from external_dependencies.isx.in_memory_isx import InMemoryISX
+from external_dependencies.isx.simulated_isx import SimulatedISX
+
+from benchmarks.harness import benchmark
+
+
+# Synthetic pipelines
+
+def add_one(inputs, *, key='numbers'):
+    return {key: [{'ids': entry['ids'], 'value': entry['value'] + 1} for entry in inputs('numbers')]}
+
+
+def numbers_pipeline(file_system, n_values, **kwargs):
+    return CIPipe({'numbers': list(range(n_values))}, file_system=file_system, **kwargs)
+
+
+def videos_directory(file_system, n_videos, directory="input_dir", video_size=0):
+    file_system.makedirs(directory)
+    for index in range(n_videos):
+        file_system.allocate(f"{directory}/video{index}.isxd", video_size)
+    return directory
+
+
+def isx_pipeline(file_system, n_videos, **kwargs):
+    return CIPipe.with_videos_from_directory(
+        videos_directory(file_system, n_videos),
+        file_system=file_system,
+        isx=InMemoryISX(file_system),
+        **kwargs,
+    )
+
+
+# Benchmarks
+
+@benchmark("step_overhead", n_values=[10, 100], n_steps=[10, 50])
+def step_overhead(n_values, n_steps):
+    pipeline = numbers_pipeline(InMemoryFileSystem(), n_values)
+
+    def run():
+        for _ in range(n_steps):
+            pipeline.step("Add one", add_one)
+
+    return run
+
+
+@benchmark("isx_steps", n_videos=[10, 100], n_steps=[5, 20])
+def isx_steps(n_videos, n_steps):
+    pipeline = isx_pipeline(InMemoryFileSystem(), n_videos)
+
+    def run():
+        for _ in range(n_steps):
+            pipeline.isx.preprocess_videos()
+
+    return run
+
+
+@benchmark("trace_load", n_videos=[10, 100], n_steps=[10, 50], trace_journal_enabled=[False, True])
+def trace_load(n_videos, n_steps, trace_journal_enabled):
+    pipeline = isx_pipeline(InMemoryFileSystem(), n_videos, trace_journal_enabled=trace_journal_enabled)
+    for _ in range(n_steps):
+        pipeline.isx.preprocess_videos()
+    repository = pipeline._trace_repository
+
+    def run():
+        repository.invalidate()
+        repository.load()
+
+    return run
+
+
+@benchmark("trace_save", n_videos=[10, 100], n_steps=[10, 50], trace_journal_enabled=[False, True])
+def trace_save(n_videos, n_steps, trace_journal_enabled):
+    pipeline = isx_pipeline(InMemoryFileSystem(), n_videos, trace_journal_enabled=trace_journal_enabled)
+    for _ in range(n_steps - 1):
+        pipeline.isx.preprocess_videos()
+
+    def run():
+        pipeline.isx.preprocess_videos()
+
+    return run
+
+
+@benchmark("clean_up", n_videos=[10, 100], n_steps=[10, 50])
+def clean_up(n_videos, n_steps):
+    pipeline = isx_pipeline(InMemoryFileSystem(), n_videos, auto_clean_up_enabled=False)
+    for _ in range(n_steps):
+        pipeline.isx.preprocess_videos()
+
+    def run():
+        pipeline.clean_up_all()
+
+    return run
+
+
+@benchmark("output_lookup", n_steps=[10, 100, 500], n_lookups=[1000])
+def output_lookup(n_steps, n_lookups):
+    pipeline = numbers_pipeline(InMemoryFileSystem(), 1)
+    for index in range(n_steps):
+        pipeline.step("Add one", add_one, key=f"numbers-{index}")
+    first_key = "numbers-0"
+
+    def run():
+        for _ in range(n_lookups):
+            pipeline.output(first_key)
+
+    return run
+
+
+@benchmark("branches", n_branches=[2, 10], n_steps=[10, 50])
+def branches(n_branches, n_steps):
+    pipeline = numbers_pipeline(InMemoryFileSystem(), 10)
+    for _ in range(n_steps):
+        pipeline.step("Add one", add_one)
+
+    def run():
+        for index in range(n_branches):
+            pipeline.branch(f"Branch {index}").step("Add one", add_one)
+
+    return run
+
+
+@benchmark("multi_pipeline", n_subjects=[2, 10], n_videos=[10])
+def multi_pipeline(n_subjects, n_videos):
+    file_system = InMemoryFileSystem()
+    file_system.makedirs("subjects")
+    for subject in range(n_subjects):
+        videos_directory(file_system, n_videos, f"subjects/subject{subject}")
+
+    def run():
+        pipelines = MultiCIPipe("subjects", file_system=file_system, isx=InMemoryISX(file_system))
+        pipelines.isx.preprocess_videos()
+        pipelines.isx.bandpass_filter_videos()
+
+    return run
+
+
+@benchmark("simulated_isx", n_videos=[4, 16], executor=["serial", "threads"], auto_clean_up_enabled=[True, False])
+def simulated_isx(n_videos, executor, auto_clean_up_enabled):
+    file_system = InMemoryFileSystem()
+    isx = SimulatedISX(
+        file_system,
+        latencies={"preprocess": SimulatedISX.uniform(0.002, 0.004), "spatial_filter": 0.003, "pca_ica": 0.01},
+        sparse=True,
+        seed=0,
+    )
+    pipeline = CIPipe.with_videos_from_directory(
+        videos_directory(file_system, n_videos, video_size=1024 * 1024),
+        file_system=file_system,
+        isx=isx,
+        defaults={"executor": executor},
+        auto_clean_up_enabled=auto_clean_up_enabled,
+    )
+
+    def run():
+        pipeline.isx.preprocess_videos()
+        pipeline.isx.bandpass_filter_videos()
+        pipeline.isx.extract_neurons_pca_ica()
+
+    return run
@@ -0,0 +1,60 @@
+"""
+Runs the pipeline benchmarks on the in-memory backends and stores the results as JSON.
+
+    python -m benchmarks.run [--quick] [--only step_overhead ...] [--output results.json]
+                             [--compare baseline.json] [--threshold 1.2]
+
+With --compare, the exit code is 1 when a benchmark median is slower than threshold times its
+baseline median.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from benchmarks import pipeline_benchmarks  # noqa: E402,F401  (registers the benchmarks)
+from benchmarks.harness import (  # noqa: E402
+    load_results, registered_benchmarks, regressions, run_benchmarks, save_results
+)
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    results = run_benchmarks(args.only, repeat=args.repeat, quick=args.quick)
+
+    output_path = args.output or _default_output_path()
+    save_results(results, output_path)
+    for result in results["results"]:
+        print(f"{result['name']:<16} {str(result['params']):<70} median {result['median'] * 1000:10.3f} ms")
+    print(f"Results saved to {output_path}")
+
+    if not args.compare:
+        return 0
+    slower = regressions(load_results(args.compare), results, args.threshold)
+    for regression in slower:
+        print(f"REGRESSION {regression['name']} {regression['params']}: {regression['ratio']:.2f}x slower")
+    return 1 if slower else 0
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description="Run the ci_pipe benchmarks.")
+    parser.add_argument("--only", nargs="+", choices=registered_benchmarks(), help="Benchmarks to run.")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per parameter combination.")
+    parser.add_argument("--quick", action="store_true", help="Only run the smallest parameter values.")
+    parser.add_argument("--output", help="Path of the JSON results file.")
+    parser.add_argument("--compare", help="Baseline JSON results file to detect regressions against.")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio reported as regression.")
+    return parser.parse_args(argv)
+
+
+def _default_output_path():
+    os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+    return os.path.join(RESULTS_DIRECTORY, f"benchmarks-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+from ci_pipe.errors.output_key_not_found_error import OutputKeyNotFoundError
+
+
+class StepCache:
+    """
+    Content-addressed cache of step results.
+
+    Entries are keyed by step name, step function, positional args, resolved params and the content of
+    the inputs the step read. Output files the step wrote in its output directory are hardlinked into
+    the cache directory, so they survive the pipeline clean-up and can be materialized again (also
+    through hardlinks) without running the step. Content hashes of input files are kept in the index with the
+    file signature (size and modification time), so a file is only read again once it changes.
+
+    With max_bytes, the least recently used entries are evicted once the cached files take more than
+    that; prune() does the same on demand. A cache can be shared by pipelines running in threads.
+    """
+    INDEX_FILE_NAME = "index.json"
+
+    def __init__(self, file_system, directory, max_bytes=None):
+        self._file_system = file_system
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._index_path = file_system.join(directory, self.INDEX_FILE_NAME)
+        self._file_system.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+        self._index_changed = False
+        self._lock = threading.RLock()
+
+    def lookup(self, step_name, step_function, args, params, look_up_function, output_directory):
+        with self._lock:
+            signature = self._signature(step_name, step_function, args, params)
+            outputs = self._cached_outputs(signature, look_up_function, output_directory)
+            if self._index_changed:
+                self._save_index()
+            return outputs
+
+    def store(self, step_name, step_function, args, params, input_keys, look_up_function, outputs, output_directory):
+        with self._lock:
+            self._store(step_name, step_function, args, params, input_keys, look_up_function, outputs,
+                        output_directory)
+
+    def prune(self, max_bytes=None):
+        """
+        Removes the entries whose files are gone, then the least recently used ones until the cached files
+        take at most max_bytes (or the max_bytes of the cache). Returns the number of removed entries.
+        """
+        with self._lock:
+            max_bytes = self._max_bytes if max_bytes is None else max_bytes
+            removed_count = self._evict(max_bytes)
+            self._index["digests"] = {
+                path: digest for path, digest in self._index["digests"].items() if self._file_system.exists(path)
+            }
+            self._save_index()
+            return removed_count
+
+    def size(self):
+        with self._lock:
+            return sum(entry.get("bytes", 0) for entry in self._index["entries"].values())
+
+    def directory(self):
+        return self._directory
+
+    # Private methods
+
+    def _store(self, step_name, step_function, args, params, input_keys, look_up_function, outputs, output_directory):
+        signature = self._signature(step_name, step_function, args, params)
+        input_keys = sorted(set(input_keys))
+        inputs_digest = self._inputs_digest(input_keys, look_up_function)
+        if inputs_digest is None:
+            return
+
+        entry_key = self._entry_key(signature, input_keys, inputs_digest)
+        entry_directory = self._file_system.join(self._directory, entry_key)
+
+        known_input_keys = self._index["signatures"].setdefault(signature, [])
+        if input_keys not in known_input_keys:
+            known_input_keys.append(input_keys)
+        # Only the files the step wrote are cached, other values (e.g. input paths) are kept as they are
+        cached_outputs = self._materialize(outputs, entry_directory, output_directory)
+        self._index["entries"][entry_key] = {
+            "step_name": step_name,
+            "outputs": cached_outputs,
+            "bytes": sum(self._file_system.size(path) or 0 for path in self._cached_files(cached_outputs)),
+            "last_used": self._tick(),
+        }
+        if self._max_bytes is not None:
+            self._evict(self._max_bytes)
+        self._save_index()
+
+    def _load_index(self):
+        index = {"signatures": {}, "entries": {}, "digests": {}, "clock": 0}
+        if self._file_system.exists(self._index_path):
+            index.update(json.loads(self._file_system.read(self._index_path)))
+        return index
+
+    def _save_index(self):
+        self._file_system.write(self._index_path, json.dumps(self._index, indent=4))
+        self._index_changed = False
+
+    def _tick(self):
+        self._index["clock"] += 1
+        self._index_changed = True
+        return self._index["clock"]
+
+    def _cached_outputs(self, signature, look_up_function, output_directory):
+        for input_keys in self._index["signatures"].get(signature, []):
+            inputs_digest = self._inputs_digest(input_keys, look_up_function)
+            if inputs_digest is None:
+                continue
+            entry_key = self._entry_key(signature, input_keys, inputs_digest)
+            entry = self._index["entries"].get(entry_key)
+            if entry is not None and self._entry_files_exist(entry):
+                entry["last_used"] = self._tick()
+                return self._materialize(entry["outputs"], output_directory, self._directory)
+        return None
+
+    def _evict(self, max_bytes):
+        entries = self._index["entries"]
+        evicted_keys = [entry_key for entry_key, entry in entries.items() if not self._entry_files_exist(entry)]
+        remaining_bytes = sum(entry.get("bytes", 0) for key, entry in entries.items() if key not in evicted_keys)
+        if max_bytes is not None:
+            for entry_key in sorted(entries, key=lambda key: entries[key].get("last_used", 0)):
+                if remaining_bytes <= max_bytes:
+                    break
+                if entry_key not in evicted_keys:
+                    evicted_keys.append(entry_key)
+                    remaining_bytes -= entries[entry_key].get("bytes", 0)
+
+        for entry_key in evicted_keys:
+            for path in self._cached_files(entries.pop(entry_key)["outputs"]):
+                if self._file_system.exists(path):
+                    self._file_system.remove(path)
+        if evicted_keys:
+            self._index_changed = True
+        return len(evicted_keys)
+
+    def _signature(self, step_name, step_function, args, params):
+        serialized_args = json.dumps(list(args), sort_keys=True, default=str)
+        serialized_params = json.dumps(params, sort_keys=True, default=str)
+        return self._hash(step_name, self._function_identity(step_function), serialized_args, serialized_params)
+
+    @staticmethod
+    def _function_identity(step_function):
+        # Module steps wrap their method, the method is what tells steps apart
+        function = inspect.unwrap(step_function)
+        qualified_name = getattr(function, "__qualname__", type(function).__qualname__)
+        return f"{getattr(function, '__module__', '')}.{qualified_name}"
+
+    def _entry_key(self, signature, input_keys, inputs_digest):
+        return self._hash(signature, *input_keys, inputs_digest)
+
+    def _inputs_digest(self, input_keys, look_up_function):
+        parts = []
+        for key in input_keys:
+            try:
+                entries = look_up_function(key)
+            except OutputKeyNotFoundError:
+                return None
+            for entry in entries:
+                parts.append(json.dumps(entry['ids'], default=str))
+                parts.append(self._value_digest(entry['value']))
+        return self._hash(*parts)
+
+    def _value_digest(self, value):
+        if isinstance(value, str) and self._file_system.exists(value):
+            try:
+                return self._file_digest(value)
+            except OSError:
+                pass
+        return json.dumps(value, sort_keys=True, default=str)
+
+    def _file_digest(self, path):
+        # Signatures are stored as JSON, so they are compared in their JSON form
+        signature = json.loads(json.dumps(self._file_system.signature(path)))
+        known_digest = self._index["digests"].get(path)
+        if known_digest is not None and known_digest["signature"] == signature:
+            return known_digest["digest"]
+        digest = self._file_system.content_hash(path)
+        self._index["digests"][path] = {"signature": signature, "digest": digest}
+        self._index_changed = True
+        return digest
+
+    def _entry_files_exist(self, entry):
+        return all(self._file_system.exists(path) for path in self._cached_files(entry["outputs"]))
+
+    def _cached_files(self, outputs):
+        return [
+            entry_output['value']
+            for entries in outputs.values()
+            for entry_output in entries
+            if self._is_inside(entry_output['value'], self._directory)
+        ]
+
+    @staticmethod
+    def _is_inside(value, directory):
+        if not isinstance(value, str):
+            return False
+        directory = os.path.abspath(directory)
+        return os.path.commonpath([os.path.abspath(value), directory]) == directory
+
+    def _materialize(self, outputs, destination_directory, source_directory):
+        materialized = {}
+        for key, entries in outputs.items():
+            materialized[key] = [
+                {**entry, 'value': self._link_if_file(entry['value'], destination_directory, source_directory)}
+                for entry in entries
+            ]
+        return materialized
+
+    def _link_if_file(self, value, destination_directory, source_directory):
+        if not self._is_inside(value, source_directory) or not self._file_system.exists(value):
+            return value
+        # The directory is only created for files, so steps without files leave no empty directories behind
+        self._file_system.makedirs(destination_directory, exist_ok=True)
+        destination = self._file_system.join(destination_directory, self._file_system.base_path(value))
+        try:
+            return self._file_system.link(value, destination)
+        except OSError:
+            # Directories and other non regular files are not cached
+            return value
+
+    @staticmethod
+    def _hash(*parts):
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
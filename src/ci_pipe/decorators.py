@@ -39,6 +39,9 @@ def step(step_name: str) -> Callable[[Callable[..., dict[str, list]]], Callable[
 			def step_function(inputs, *s_args, **s_kwargs):
 				return bound_method(inputs, *s_args, **s_kwargs)
 
+			# Hooks and profilers attached to the step see the module method instead of this closure
+			functools.update_wrapper(step_function, method, assigned=("__module__", "__name__", "__qualname__"), updated=())
+
 			orig_sig = inspect.signature(method)
 			new_params = []
 			for name, p in orig_sig.parameters.items():
@@ -0,0 +1,9 @@
+from .ci_pipe_error import CIPipeError
+
+
+class InvalidCleanUpModeError(CIPipeError):
+    def __init__(self, mode: str, valid_modes):
+        super().__init__(
+            f"Clean-up mode '{mode}' is not valid. Valid modes are: {', '.join(valid_modes)}.",
+            context={"mode": mode},
+        )
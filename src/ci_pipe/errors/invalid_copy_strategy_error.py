@@ -0,0 +1,9 @@
+from .ci_pipe_error import CIPipeError
+
+
+class InvalidCopyStrategyError(CIPipeError):
+    def __init__(self, strategy: str, valid_strategies):
+        super().__init__(
+            f"Copy strategy '{strategy}' is not valid. Valid strategies are: {', '.join(valid_strategies)}.",
+            context={"strategy": strategy},
+        )
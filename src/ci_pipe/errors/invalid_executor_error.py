@@ -0,0 +1,9 @@
+from .ci_pipe_error import CIPipeError
+
+
+class InvalidExecutorError(CIPipeError):
+    def __init__(self, executor_type: str, valid_types):
+        super().__init__(
+            f"Executor type '{executor_type}' is not valid. Valid types are: {', '.join(valid_types)}.",
+            context={"executor_type": executor_type},
+        )
@@ -0,0 +1,9 @@
+from .ci_pipe_error import CIPipeError
+
+
+class InvalidHookEventError(CIPipeError):
+    def __init__(self, event: str, valid_events):
+        super().__init__(
+            f"Hook event '{event}' is not valid. Valid events are: {', '.join(valid_events)}.",
+            context={"event": event},
+        )
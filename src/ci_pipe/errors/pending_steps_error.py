@@ -0,0 +1,9 @@
+from .ci_pipe_error import CIPipeError
+
+
+class PendingStepsError(CIPipeError):
+    def __init__(self, pending_step_names):
+        super().__init__(
+            f"The pipeline has steps pending to run ({', '.join(pending_step_names)}). Call run() first.",
+            context={"pending_steps": list(pending_step_names)},
+        )
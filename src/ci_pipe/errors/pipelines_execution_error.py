@@ -0,0 +1,10 @@
+from .ci_pipe_error import CIPipeError
+
+
+class PipelinesExecutionError(CIPipeError):
+    def __init__(self, errors_by_pipeline: dict):
+        self.errors = errors_by_pipeline
+        super().__init__(
+            f"Execution failed for pipelines: {', '.join(errors_by_pipeline.keys())}.",
+            context={"errors": {name: str(error) for name, error in errors_by_pipeline.items()}},
+        )
@@ -1,3 +1,7 @@
+import tempfile
+from contextlib import contextmanager
+from functools import partial
+
 from ci_pipe.decorators import step
 from ci_pipe.errors.caiman_backend_not_configured_error import CaimanBackendNotConfiguredError
 
@@ -5,6 +9,7 @@ from ci_pipe.errors.caiman_backend_not_configured_error import CaimanBackendNotC
 class CaimanModule:
     MOTION_CORRECTION_STEP = "Caiman Motion Correction"
     MOTION_CORRECTION_VIDEOS_SUFFIX = "MC"
+    EXPORT_VIDEOS_TO_TIFF_STEP = "Caiman Export Videos To TIFF"
     CNMF_STEP = "Caiman Constrained Non-negative Matrix Factorization"
     CNMF_VIDEOS_SUFFIX = "CNMF"
 
@@ -26,15 +31,24 @@ class CaimanModule:
             caiman_pw_rigid=True,
             caiman_shifts_opencv=True,
             caiman_border_nan='copy',
-            caiman_save_movie=True
+            caiman_save_movie=True,
+            caiman_keep_mmap=False,
+            caiman_border_to_0=0,
+            caiman_tiff_chunk_frames=None,
+            caiman_tiff_compression=None
     ):
+        # With caiman_keep_mmap the corrected movie stays as a C-order memory-mapped file under 'videos-mmap',
+        # which cnmf reads in place, instead of being reloaded and written again as a TIFF
         # TODO: Think if we should grab all potential extensions accepted by motion correction
         output = []
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.MOTION_CORRECTION_STEP)
 
-        for input_data in inputs('videos-tiff'):
+        dview = self._cluster_dview()
+
+        for input_data in self._ci_pipe.measured_inputs(inputs('videos-tiff')):
             motion_correct_handler = self._caiman.motion_correction.MotionCorrect(
                 fname=input_data['value'],
+                dview=dview,
                 strides=caiman_strides,
                 overlaps=caiman_overlaps,
                 max_shifts=caiman_max_shifts,
@@ -47,7 +61,22 @@ class CaimanModule:
             mmap_files = motion_correct_handler.mmap_file
             mmap_path = mmap_files[0] # we are processing only one at a time, that's why we can unpack it like this
 
-            memmapped_movie = self._caiman.load(mmap_path)
+            if caiman_keep_mmap:
+                # CaImAn appends the dimensions, order and frames to the base name
+                file_system = self._ci_pipe.file_system()
+                stem, _ = file_system.split_text(file_system.base_path(input_data['value']))
+                c_order_mmap_path = self._caiman.save_memmap(
+                    mmap_files,
+                    base_name=file_system.join(output_dir, f"{stem}-{self.MOTION_CORRECTION_VIDEOS_SUFFIX}"),
+                    order='C',
+                    border_to_0=caiman_border_to_0,
+                    dview=dview,
+                )
+                # The F-order files MotionCorrect wrote are only an intermediate copy of the C-order one
+                for mmap_file in mmap_files:
+                    file_system.remove(mmap_file)
+                output.append({'ids': input_data['ids'], 'value': c_order_mmap_path})
+                continue
 
             tif_output_path = self._ci_pipe.make_output_file_path(
                 mmap_path,
@@ -56,7 +85,21 @@ class CaimanModule:
                 ext="tif",
             )
 
-            memmapped_movie.save(tif_output_path)
+            self._save_tiff(mmap_path, tif_output_path, input_data['ids'], caiman_tiff_chunk_frames,
+                            caiman_tiff_compression)
+            output.append({'ids': input_data['ids'], 'value': tif_output_path})
+
+        return {"videos-mmap" if caiman_keep_mmap else "videos-tiff": output}
+
+    @step(EXPORT_VIDEOS_TO_TIFF_STEP)
+    def export_videos_to_tiff(self, inputs, *, caiman_tiff_chunk_frames=None, caiman_tiff_compression=None):
+        output = []
+        output_dir = self._ci_pipe.create_output_directory_for_next_step(self.EXPORT_VIDEOS_TO_TIFF_STEP)
+
+        for input_data in self._ci_pipe.measured_inputs(inputs('videos-mmap')):
+            tif_output_path = self._ci_pipe.make_output_file_path(input_data['value'], output_dir, None, ext="tif")
+            self._save_tiff(input_data['value'], tif_output_path, input_data['ids'], caiman_tiff_chunk_frames,
+                            caiman_tiff_compression)
             output.append({'ids': input_data['ids'], 'value': tif_output_path})
 
         return {"videos-tiff": output}
@@ -136,12 +179,20 @@ class CaimanModule:
             caiman_use_peak_max=False,
             caiman_test_both=False,
             caiman_expected_comps=500,
-            caiman_params=None
+            caiman_params=None,
+            caiman_input_key=None
     ):
         output = []
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.CNMF_STEP)
+        if caiman_dview is None:
+            caiman_dview = self._cluster_dview()
+            caiman_n_processes = caiman_n_processes or self._cluster_n_processes()
+
+        # Movies are taken from whichever of the keys the latest step wrote, so memory-mapped movies from motion
+        # correction are read in place unless TIFF movies were written after them
+        input_key = caiman_input_key or self._ci_pipe.latest_key(['videos-tiff', 'videos-mmap'])
 
-        for input_data in inputs('videos-tiff'):
+        for input_data in self._ci_pipe.measured_inputs(inputs(input_key)):
             cnmf_model = self._caiman.source_extraction.cnmf.CNMF(
                 n_processes=caiman_n_processes,
                 k=caiman_k,
@@ -217,8 +268,11 @@ class CaimanModule:
             )
 
             # Note: Values for this algorithm are changed within estimates object of cnmf model
-            memmapped_movie = self._caiman.load(input_data['value'])
-            cnmf_model.fit(images=memmapped_movie)
+            if input_key == 'videos-mmap':
+                images = self._images_from_memmap(input_data['value'])
+            else:
+                images = self._caiman.load(input_data['value'])
+            cnmf_model.fit(images=images)
 
             hdf5_output_path = self._ci_pipe.make_output_file_path(
                 input_data['value'],
@@ -231,3 +285,58 @@ class CaimanModule:
             output.append({'ids': input_data['ids'], 'value': hdf5_output_path})
 
         return {"files-hdf5": output}
+
+    # Private methods
+
+    def _save_tiff(self, mmap_path, tif_output_path, ids, chunk_frames, compression):
+        if not chunk_frames:
+            self._caiman.load(mmap_path).save(tif_output_path)
+            return
+        # Frames are streamed from the memory-mapped file instead of loading the whole movie to save it
+        from ci_pipe.utils.chunked_tiff_writer import ChunkedTiffWriter
+        Yr, dims, T = self._caiman.load_memmap(mmap_path)
+        with self._frame_major_images(Yr, dims, T, chunk_frames) as images:
+            ChunkedTiffWriter(chunk_frames, compression).write(
+                images,
+                tif_output_path,
+                on_chunk_written=partial(self._ci_pipe.report_progress, ids),
+            )
+
+    def _images_from_memmap(self, mmap_path):
+        # Frames are a view over the file, so the movie is never loaded in memory
+        Yr, dims, T = self._caiman.load_memmap(mmap_path)
+        return self._images(Yr, dims, T)
+
+    @classmethod
+    @contextmanager
+    def _frame_major_images(cls, Yr, dims, T, chunk_frames):
+        if Yr.flags['F_CONTIGUOUS']:
+            # F-order files (such as the MotionCorrect output) keep each frame contiguous, frames are read in place
+            yield cls._images(Yr, dims, T)
+            return
+        # C-order files keep each pixel trace contiguous, so every chunk of frames would touch every page of the
+        # file. The movie is transposed once into a frame-major temporary file instead, a block of whole pixel
+        # traces at a time, so the file is read sequentially and memory stays bounded by about a chunk of frames
+        import numpy
+        num_pixels = Yr.shape[0]
+        pixels_per_block = max(1, chunk_frames * num_pixels // max(T, 1))
+        with tempfile.TemporaryFile() as temporary_file:
+            frames = numpy.memmap(temporary_file, dtype=Yr.dtype, mode='w+', shape=(T, num_pixels))
+            for start in range(0, num_pixels, pixels_per_block):
+                end = min(start + pixels_per_block, num_pixels)
+                frames[:, start:end] = Yr[start:end].T
+            yield cls._images(frames.T, dims, T)
+
+    @staticmethod
+    def _images(Yr, dims, T):
+        # Pixels are flattened in F-order, as CaImAn does
+        return Yr.T.reshape((T,) + tuple(dims), order='F')
+
+    def _cluster_dview(self):
+        # Each input is split in patches across the workers, so inputs share the cluster one at a time
+        caiman_cluster = self._ci_pipe.caiman_cluster()
+        return None if caiman_cluster is None else caiman_cluster.dview()
+
+    def _cluster_n_processes(self):
+        caiman_cluster = self._ci_pipe.caiman_cluster()
+        return None if caiman_cluster is None else caiman_cluster.n_processes()
@@ -1,10 +1,8 @@
+from functools import partial
 from pathlib import Path
 
-import numpy as np
-
 from ci_pipe.decorators import step
 from ci_pipe.errors.isx_backend_not_configured_error import ISXBackendNotConfiguredError
-from ci_pipe.utils.project_template import load_project_templates
 
 
 class ISXModule:
@@ -60,13 +58,15 @@ class ISXModule:
             isx_pp_trim_early_frames=True
     ):
         output = []
+        tasks = []
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.PREPROCESS_VIDEOS_STEP)
 
         for input in inputs('videos-isxd'):
             input_path = input['value']
             output_path = self._isx.make_output_file_path(input_path, output_dir, self.PREPROCESS_VIDEOS_SUFFIX)
 
-            self._isx.preprocess(
+            tasks.append(partial(
+                self._isx.preprocess,
                 input_movie_files=[input_path],
                 output_movie_files=[output_path],
                 temporal_downsample_factor=isx_pp_temporal_downsample_factor,
@@ -75,10 +75,12 @@ class ISXModule:
                 crop_rect_format=isx_pp_crop_rect_format,
                 fix_defective_pixels=isx_pp_fix_defective_pixels,
                 trim_early_frames=isx_pp_trim_early_frames
-            )
+            ))
 
             output.append({'ids': input['ids'], 'value': output_path})
 
+        self._ci_pipe.run_input_tasks(inputs('videos-isxd'), tasks, [[entry['value']] for entry in output])
+
         return {
             'videos-isxd': output
         }
@@ -94,23 +96,27 @@ class ISXModule:
             isx_bp_subtract_global_minimum=True
     ):
         output = []
+        tasks = []
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.BANDPASS_FILTER_VIDEOS_STEP)
 
         for input in inputs('videos-isxd'):
             input_path = input['value']
             output_path = self._isx.make_output_file_path(input_path, output_dir, self.BANDPASS_FILTER_VIDEOS_SUFFIX)
 
-            self._isx.spatial_filter(
+            tasks.append(partial(
+                self._isx.spatial_filter,
                 input_movie_files=[input_path],
                 output_movie_files=[output_path],
                 low_cutoff=isx_bp_low_cutoff,
                 high_cutoff=isx_bp_high_cutoff,
                 retain_mean=isx_bp_retain_mean,
                 subtract_global_minimum=isx_bp_subtract_global_minimum
-            )
+            ))
 
             output.append({'ids': input['ids'], 'value': output_path})
 
+        self._ci_pipe.run_input_tasks(inputs('videos-isxd'), tasks, [[entry['value']] for entry in output])
+
         return {
             'videos-isxd': output
         }
@@ -134,6 +140,8 @@ class ISXModule:
         output_translations = []
         output_crop_rects = []
         output_mean_images = []
+        outputs = []
+        tasks = []
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.MOTION_CORRECTION_VIDEOS_STEP)
 
         for input in inputs('videos-isxd'):
@@ -149,31 +157,38 @@ class ISXModule:
             output_mean_image_path = self._isx.make_output_file_path(input_path, output_dir,
                                                                      f'{isx_mc_series_name}-{self.MOTION_CORRECTION_VIDEOS_MEAN_IMAGES_SUFFIX}')
 
-            self._isx.project_movie(
-                input_movie_files=[input_path],
-                output_image_file=output_mean_image_path
-            )
-
-            self._isx.motion_correct(
-                input_movie_files=[input_path],
-                output_movie_files=[output_video_path],
-                max_translation=isx_mc_max_translation,
-                low_bandpass_cutoff=isx_mc_low_bandpass_cutoff,
-                high_bandpass_cutoff=isx_mc_high_bandpass_cutoff,
-                roi=isx_mc_roi,
-                reference_segment_index=isx_mc_reference_segment_index,
-                reference_frame_index=isx_mc_reference_frame_index,
-                reference_file_name=output_mean_image_path,
-                global_registration_weight=isx_mc_global_registration_weight,
-                output_translation_files=[output_translations_path],
-                output_crop_rect_file=output_crop_rect_path,
-                preserve_input_dimensions=isx_mc_preserve_input_dimensions
-            )
+            tasks.append(partial(
+                _project_movie_and_motion_correct,
+                self._isx.project_movie,
+                self._isx.motion_correct,
+                project_movie_kwargs=dict(
+                    input_movie_files=[input_path],
+                    output_image_file=output_mean_image_path
+                ),
+                motion_correct_kwargs=dict(
+                    input_movie_files=[input_path],
+                    output_movie_files=[output_video_path],
+                    max_translation=isx_mc_max_translation,
+                    low_bandpass_cutoff=isx_mc_low_bandpass_cutoff,
+                    high_bandpass_cutoff=isx_mc_high_bandpass_cutoff,
+                    roi=isx_mc_roi,
+                    reference_segment_index=isx_mc_reference_segment_index,
+                    reference_frame_index=isx_mc_reference_frame_index,
+                    reference_file_name=output_mean_image_path,
+                    global_registration_weight=isx_mc_global_registration_weight,
+                    output_translation_files=[output_translations_path],
+                    output_crop_rect_file=output_crop_rect_path,
+                    preserve_input_dimensions=isx_mc_preserve_input_dimensions
+                )
+            ))
 
             output_videos.append({'ids': input['ids'], 'value': output_video_path})
             output_translations.append({'ids': input['ids'], 'value': output_translations_path})
             output_crop_rects.append({'ids': input['ids'], 'value': output_crop_rect_path})
             output_mean_images.append({'ids': input['ids'], 'value': output_mean_image_path})
+            outputs.append([output_video_path, output_translations_path, output_crop_rect_path, output_mean_image_path])
+
+        self._ci_pipe.run_input_tasks(inputs('videos-isxd'), tasks, outputs)
 
         return {
             'videos-isxd': output_videos,
@@ -190,20 +205,24 @@ class ISXModule:
             isx_dff_f0_type='mean'
     ):
         output = []
+        tasks = []
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.NORMALIZE_DFF_VIDEOS_STEP)
 
         for input in inputs('videos-isxd'):
             input_path = input['value']
             output_path = self._isx.make_output_file_path(input_path, output_dir, self.NORMALIZE_DFF_VIDEOS_SUFFIX)
 
-            self._isx.dff(
+            tasks.append(partial(
+                self._isx.dff,
                 input_movie_files=[input_path],
                 output_movie_files=[output_path],
                 f0_type=isx_dff_f0_type
-            )
+            ))
 
             output.append({'ids': input['ids'], 'value': output_path})
 
+        self._ci_pipe.run_input_tasks(inputs('videos-isxd'), tasks, [[entry['value']] for entry in output])
+
         return {
             'videos-isxd': output
         }
@@ -223,6 +242,7 @@ class ISXModule:
             isx_pca_ica_average_cell_diameter=13,
     ):
         output = []
+        tasks = []
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.EXTRACT_NEURONS_PCA_ICA_STEP)
 
         for input in inputs('videos-isxd'):
@@ -230,7 +250,8 @@ class ISXModule:
             output_path = self._isx.make_output_file_path(input_path, output_dir,
                                                           self.EXTRACT_NEURONS_PCA_ICA_VIDEOS_SUFFIX)
 
-            self._isx.pca_ica(
+            tasks.append(partial(
+                self._isx.pca_ica,
                 input_movie_files=[input_path],
                 output_cell_set_files=[output_path],
                 num_pcs=isx_pca_ica_num_pcs,
@@ -241,10 +262,12 @@ class ISXModule:
                 block_size=isx_pca_ica_block_size,
                 auto_estimate_num_ics=isx_pca_ica_auto_estimate_num_ics,
                 average_cell_diameter=isx_pca_ica_average_cell_diameter
-            )
+            ))
 
             output.append({'ids': input['ids'], 'value': output_path})
 
+        self._ci_pipe.run_input_tasks(inputs('videos-isxd'), tasks, [[entry['value']] for entry in output])
+
         return {
             'cellsets-isxd': output
         }
@@ -261,13 +284,15 @@ class ISXModule:
             isx_ed_accepted_cells_only=False
     ):
         output = []
+        tasks = []
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.DETECT_EVENTS_IN_CELLS_STEP)
 
         for input in inputs('cellsets-isxd'):
             input_path = input['value']
             output_path = self._isx.make_output_file_path(input_path, output_dir, self.DETECT_EVENTS_IN_CELLS_SUFFIX)
 
-            self._isx.event_detection(
+            tasks.append(partial(
+                self._isx.event_detection,
                 input_cell_set_files=[input_path],
                 output_event_set_files=[output_path],
                 threshold=isx_ed_threshold,
@@ -275,10 +300,12 @@ class ISXModule:
                 event_time_ref=isx_ed_event_time_ref,
                 ignore_negative_transients=isx_ed_ignore_negative_transients,
                 accepted_cells_only=isx_ed_accepted_cells_only
-            )
+            ))
 
             output.append({'ids': input['ids'], 'value': output_path})
 
+        self._ci_pipe.run_input_tasks(inputs('cellsets-isxd'), tasks, [[entry['value']] for entry in output])
+
         return {
             'events-isxd': output
         }
@@ -296,7 +323,9 @@ class ISXModule:
         pairs = self._ci_pipe.associate_keys_by_id('cellsets-isxd', 'events-isxd')
 
         for ids, cellset_path, event_path in pairs:
-            output_path = self._ci_pipe.copy_file_to_output_directory(cellset_path, self.AUTO_ACCEPT_REJECT_CELLS_STEP)
+            # The copy is modified in place by auto accept reject
+            output_path = self._ci_pipe.copy_file_to_output_directory(
+                cellset_path, self.AUTO_ACCEPT_REJECT_CELLS_STEP, for_write=True)
 
             self._isx.auto_accept_reject(
                 input_cell_set_files=[output_path],
@@ -320,7 +349,7 @@ class ISXModule:
         output = []
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.EXPORT_MOVIE_TO_TIFF_STEP)
 
-        for video in inputs('videos-isxd'):
+        for video in self._ci_pipe.measured_inputs(inputs('videos-isxd')):
             input_path = video['value']
             output_path = self._isx.make_output_file_path(input_path, output_dir, '', ext='tiff')
 
@@ -343,7 +372,7 @@ class ISXModule:
         output = []
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.EXPORT_MOVIE_TO_NWB_STEP)
 
-        for video in inputs('videos-isxd'):
+        for video in self._ci_pipe.measured_inputs(inputs('videos-isxd')):
             input_path = video['value']
             output_path = self._isx.make_output_file_path(input_path, output_dir, '', ext='nwb')
 
@@ -418,20 +447,15 @@ class ISXModule:
         file_system = self._ci_pipe.file_system()
         output_dir = self._ci_pipe.create_output_directory_for_next_step(self.GUI_VISUALIZATION_STEP)
 
-        dff_by_ids = self._group_by_ids(inputs("videos-isxd"))
-        cell_by_ids = self._group_by_ids(inputs("cellsets-isxd"))
-        ev_by_ids = self._group_by_ids(inputs("events-isxd"))
-
-        common_unique_ids = sorted(set(dff_by_ids) & set(cell_by_ids) & set(ev_by_ids))
+        values_by_ids = self._ci_pipe.group_keys_by_id("videos-isxd", "cellsets-isxd", "events-isxd")
         outputs = []
 
+        from ci_pipe.utils.project_template import load_project_templates
         plane_template, project_template = load_project_templates()
 
-        for ids_key in common_unique_ids:
+        for ids_key in sorted(values_by_ids):
             # sort to create stable "plane order"
-            dffs = sorted(dff_by_ids[ids_key])
-            cellsets = sorted(cell_by_ids[ids_key])
-            events = sorted(ev_by_ids[ids_key])
+            dffs, cellsets, events = (sorted(values) for values in values_by_ids[ids_key])
 
             # pick base name from first dff file
             base_path = Path(dffs[0]).name
@@ -521,13 +545,9 @@ class ISXModule:
             reorder(output_movies),
         )
 
-    def _group_by_ids(self, items):
-        groups = {}
-        for item in items:
-            groups.setdefault(tuple(item["ids"]), []).append(item["value"])
-        return groups
-
     def _movie_first_frame_min_max(self, movie_path):
+        import numpy as np
+
         movie = None
         try:
             movie = self._isx.Movie.read(str(movie_path))
@@ -558,3 +578,10 @@ class ISXModule:
                 del movie
             except Exception:
                 pass
+
+
+# Module level so it can be pickled when tasks run in a process pool. It takes the backend functions
+# instead of the backend, because the isx package is a module and modules can not be pickled
+def _project_movie_and_motion_correct(project_movie, motion_correct, project_movie_kwargs, motion_correct_kwargs):
+    project_movie(**project_movie_kwargs)
+    motion_correct(**motion_correct_kwargs)
@@ -1,22 +1,47 @@
+from .errors.invalid_executor_error import InvalidExecutorError
+from .errors.pipelines_execution_error import PipelinesExecutionError
 from .modules.multi_module_proxy import MultiModuleProxy
 from external_dependencies.file_system.persistent_file_system import PersistentFileSystem
 from .pipeline import CIPipe
+from .utils.caiman_cluster import CaimanCluster
+from .utils.deletion_queue import DeletionQueue
+from .utils.executor import Executor
 
 class MultiCIPipe():
 
     @classmethod
-    def from_pipelines(cls, pipelines_dict):
+    def from_pipelines(cls, pipelines_dict, executor=None):
         multi_cipipe = cls.__new__(cls)
-        multi_cipipe.init_with_pipelines(pipelines_dict)
+        multi_cipipe.init_with_pipelines(pipelines_dict, executor)
         return multi_cipipe
 
     def __init__(self, inputs_directory, branch_name='Main Branch', outputs_directory='output', trace_path="trace.json", auto_clean_up_enabled=True,
-                 file_system=PersistentFileSystem(), defaults=None, defaults_path=None, isx=None, caiman=None):
-        self._pipelines = self._create_pipelines_from_inputs_directory(inputs_directory, branch_name, outputs_directory, trace_path, auto_clean_up_enabled,
-                 file_system, defaults, defaults_path, isx, caiman)
+                 file_system=PersistentFileSystem(), defaults=None, defaults_path=None, isx=None, caiman=None, executor=None,
+                 lazy=False, step_cache=None, trace_journal_enabled=False, clean_up_mode=DeletionQueue.IMMEDIATE,
+                 metrics_enabled=False, hooks=None, input_checkpoints_enabled=False):
+        # Pipeline options other than the directories are the same for every pipeline
+        pipeline_options = {
+            'branch_name': branch_name,
+            'auto_clean_up_enabled': auto_clean_up_enabled,
+            'defaults': defaults,
+            'defaults_path': defaults_path,
+            'isx': isx,
+            'caiman': caiman,
+            'lazy': lazy,
+            'step_cache': step_cache,
+            'trace_journal_enabled': trace_journal_enabled,
+            'clean_up_mode': clean_up_mode,
+            'metrics_enabled': metrics_enabled,
+            'hooks': hooks,
+            'input_checkpoints_enabled': input_checkpoints_enabled,
+        }
+        self._pipelines = self._create_pipelines_from_inputs_directory(inputs_directory, outputs_directory, trace_path,
+                 file_system, pipeline_options)
+        self._executor = self._validated_executor(executor)
         
-    def init_with_pipelines(self, pipelines_dict):
+    def init_with_pipelines(self, pipelines_dict, executor=None):
         self._pipelines = pipelines_dict
+        self._executor = self._validated_executor(executor)
 
     # Main protocol
 
@@ -25,22 +50,56 @@ class MultiCIPipe():
 
     def values(self, key):
         values = []
-        self.with_pipelines_do(lambda pipeline: values.extend([v for v in pipeline.values(key)]))
+        for pipeline in self._pipelines.values():
+            values.extend(pipeline.values(key))
         return values
 
     def branch(self, branch_name):
         branched_pipelines = {}
         for name, pipeline in self._pipelines.items():
             branched_pipelines[name] = pipeline.branch(branch_name)
-        return MultiCIPipe.from_pipelines(branched_pipelines)
+        return MultiCIPipe.from_pipelines(branched_pipelines, self._executor)
     
     def set_defaults(self, **defaults):
-        self.with_pipelines_do(lambda pipeline: pipeline.set_defaults(**defaults))
+        for pipeline in self._pipelines.values():
+            pipeline.set_defaults(**defaults)
         return self
     
     def with_pipelines_do(self, action):
+        names = list(self._pipelines.keys())
+        if self._executor.is_serial():
+            # One pipeline at a time, the first error stops the run and is raised as it is
+            return {name: action(self._pipelines[name]) for name in names}
+
+        tasks = [self._task_capturing_errors(action, self._pipelines[name]) for name in names]
+        outcomes = self._executor.run(tasks)
+
+        errors = {name: error for name, (_, error) in zip(names, outcomes) if error is not None}
+        if errors:
+            raise PipelinesExecutionError(errors)
+        return {name: result for name, (result, _) in zip(names, outcomes)}
+
+    def run(self):
+        self.with_pipelines_do(lambda pipeline: pipeline.run())
+        return self
+
+    def executor(self):
+        return self._executor
+
+    def start_caiman_cluster(self, n_processes=None, backend=CaimanCluster.MULTIPROCESSING):
+        # A single cluster serves every pipeline, instead of one set of worker processes per pipeline
+        pipelines = list(self._pipelines.values())
+        if not pipelines:
+            return self
+        caiman_cluster = pipelines[0].start_caiman_cluster(n_processes, backend).caiman_cluster()
+        for pipeline in pipelines[1:]:
+            pipeline.use_caiman_cluster(caiman_cluster)
+        return self
+
+    def shutdown_caiman_cluster(self):
         for pipeline in self._pipelines.values():
-            action(pipeline)
+            pipeline.shutdown_caiman_cluster()
+        return self
 
     # Modules
 
@@ -54,8 +113,23 @@ class MultiCIPipe():
     
     # Private methods
 
-    def _create_pipelines_from_inputs_directory(self, inputs_directory, branch_name, outputs_directory, trace_path, auto_clean_up_enabled,
-                 file_system, defaults, defaults_path, isx, caiman):
+    def _validated_executor(self, executor):
+        executor = executor or Executor()
+        # Pipelines are updated in place, so they can not be sent to other processes
+        if executor.executor_type() == Executor.PROCESSES:
+            raise InvalidExecutorError(executor.executor_type(), [Executor.SERIAL, Executor.THREADS])
+        return executor
+
+    def _task_capturing_errors(self, action, pipeline):
+        def task():
+            try:
+                return action(pipeline), None
+            except Exception as error:
+                return None, error
+        return task
+
+    def _create_pipelines_from_inputs_directory(self, inputs_directory, outputs_directory, trace_path, file_system,
+                 pipeline_options):
         pipelines = {}
         for dir_entry in file_system.subdirs(inputs_directory):
             dir_path = file_system.join(inputs_directory, dir_entry)
@@ -64,15 +138,10 @@ class MultiCIPipe():
                 file_system.makedirs(outputs_directory_for_pipeline, exist_ok=True)
                 pipeline = CIPipe.with_videos_from_directory(
                     dir_path,
-                    branch_name=branch_name,
                     outputs_directory=outputs_directory_for_pipeline,
                     trace_path=file_system.join(outputs_directory_for_pipeline, trace_path),
                     file_system=file_system,
-                    defaults=defaults,
-                    defaults_path=defaults_path,
-                    auto_clean_up_enabled=auto_clean_up_enabled,
-                    isx=isx,
-                    caiman=caiman
+                    **pipeline_options
                 )
                 pipelines[dir_entry] = pipeline
-        return pipelines
\ No newline at end of file
+        return pipelines
@@ -0,0 +1,27 @@
+class PendingStep:
+    """
+    A step recorded by a lazy pipeline, executed when the pipeline runs.
+
+    Lazy mode only defers execution: recorded steps run in order, exactly as in eager mode. The keys a
+    step reads and writes are only known once its function runs, so steps are not pruned, reordered
+    or fused.
+    """
+
+    def __init__(self, step_name, step_function, args=None, kwargs=None):
+        self._step_name = step_name
+        self._step_function = step_function
+        self._args = args if args is not None else ()
+        self._kwargs = dict(kwargs) if kwargs is not None else {}
+
+    def name(self):
+        return self._step_name
+
+    def function(self):
+        return self._step_function
+
+    def args(self):
+        return self._args
+
+    def arguments(self):
+        return self._kwargs
+
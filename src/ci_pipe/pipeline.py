@@ -1,25 +1,42 @@
+import atexit
+import copy
 import hashlib
 import inspect
+import itertools
+import time
 
+from external_dependencies.file_system.copy_strategy import CopyStrategy
 from external_dependencies.file_system.persistent_file_system import PersistentFileSystem
+from .errors.caiman_backend_not_configured_error import CaimanBackendNotConfiguredError
 from .errors.defaults_after_step_error import DefaultsAfterStepsError
+from .errors.invalid_copy_strategy_error import InvalidCopyStrategyError
 from .errors.output_key_not_found_error import OutputKeyNotFoundError
+from .errors.pending_steps_error import PendingStepsError
 from .errors.resume_execution_error import ResumeExecutionError
-from .modules.caiman_module import CaimanModule
-from .modules.isx_module import ISXModule
-from .plotter import Plotter
+from .pending_step import PendingStep
 from .step import Step
+from .trace.input_checkpoints import InputCheckpoints
+from .trace.journaled_trace_repository import JournaledTraceRepository
 from .trace.schema.branch import Branch
 from .trace.trace_repository import TraceRepository
-from .utils.config_defaults import ConfigDefaults
+from .utils.caiman_cluster import CaimanCluster
+from .utils.deletion_queue import DeletionQueue
+from .utils.executor import Executor
+from .utils.hook_registry import HookRegistry
+from .utils.output_references import OutputReferences
+from .utils.step_metrics import StepMetrics
 
 
 class CIPipe:
+    COPY_STRATEGY_DEFAULT_KEY = "copy_strategy"
+
     @classmethod
     def with_videos_from_directory(cls, input, branch_name='Main Branch', outputs_directory='output',
                                    trace_path="trace.json", file_system=PersistentFileSystem(), defaults=None,
                                    defaults_path=None,
-                                   isx=None, caiman=None, auto_clean_up_enabled=True):
+                                   isx=None, caiman=None, auto_clean_up_enabled=True, step_cache=None,
+                                   trace_journal_enabled=False, clean_up_mode=DeletionQueue.IMMEDIATE, lazy=False,
+                                   metrics_enabled=False, hooks=None, input_checkpoints_enabled=False):
         files = file_system.listdir(input)
         inputs = cls._video_inputs_with_extension(files)
 
@@ -34,6 +51,13 @@ class CIPipe:
             isx=isx,
             caiman=caiman,
             auto_clean_up_enabled=auto_clean_up_enabled,
+            step_cache=step_cache,
+            trace_journal_enabled=trace_journal_enabled,
+            clean_up_mode=clean_up_mode,
+            lazy=lazy,
+            metrics_enabled=metrics_enabled,
+            hooks=hooks,
+            input_checkpoints_enabled=input_checkpoints_enabled,
         )
 
     @classmethod
@@ -51,6 +75,13 @@ class CIPipe:
             isx=None,
             caiman=None,
             auto_clean_up_enabled=True,
+            step_cache=None,
+            trace_journal_enabled=False,
+            clean_up_mode=DeletionQueue.IMMEDIATE,
+            lazy=False,
+            metrics_enabled=False,
+            hooks=None,
+            input_checkpoints_enabled=False,
     ):
         files = file_system.listdir(input_dir)
         inputs = cls._video_inputs_with_extension(files)
@@ -66,6 +97,13 @@ class CIPipe:
             isx=isx,
             caiman=caiman,
             auto_clean_up_enabled=auto_clean_up_enabled,
+            step_cache=step_cache,
+            trace_journal_enabled=trace_journal_enabled,
+            clean_up_mode=clean_up_mode,
+            lazy=lazy,
+            metrics_enabled=metrics_enabled,
+            hooks=hooks,
+            input_checkpoints_enabled=input_checkpoints_enabled,
         )
 
         # NOTE: Overwriting of input ids, everything in that folder belongs to the same "original video"
@@ -81,30 +119,60 @@ class CIPipe:
     def __init__(self, inputs, branch_name='Main Branch', outputs_directory='output', trace_path="trace.json",
                  steps=None,
                  file_system=PersistentFileSystem(), defaults=None, defaults_path=None, isx=None,
-                 validator=None, caiman=None, auto_clean_up_enabled=True):
+                 validator=None, caiman=None, auto_clean_up_enabled=True, step_cache=None,
+                 trace_journal_enabled=False, output_references=None, clean_up_mode=DeletionQueue.IMMEDIATE,
+                 deletion_queue=None, lazy=False, metrics_enabled=False, hooks=None, input_checkpoints_enabled=False,
+                 caiman_cluster=None):
         self._pipeline_inputs = self._inputs_with_ids(inputs)
         self._raw_pipeline_inputs = inputs
         self._steps = steps or []
+        self._lazy = lazy
+        self._pending_steps = []
+        self._running_pending_steps = False
+        self._latest_step_by_key = {}
+        self._index_steps_outputs(self._steps)
         self._defaults = {}
         self._branch_name = branch_name
         self._auto_clean_up_enabled = auto_clean_up_enabled
+        self._deletion_queue = deletion_queue or DeletionQueue(file_system, clean_up_mode)
+        if self._deletion_queue.mode() != DeletionQueue.IMMEDIATE:
+            # Removals still pending when the interpreter exits can fail too, their errors go to the trace
+            atexit.register(self.flush_clean_up)
         self._outputs_directory = outputs_directory
         self._file_system = file_system
-        self._trace_repository = TraceRepository(
+        self._trace_journal_enabled = trace_journal_enabled
+        trace_repository_class = JournaledTraceRepository if trace_journal_enabled else TraceRepository
+        self._trace_repository = trace_repository_class(
             self._file_system, trace_path, validator)
         self._trace = self._trace_repository.load()
-        self._plotter = Plotter()
+        self._output_references = output_references or OutputReferences.from_trace(self._trace)
+        self._output_references.add_steps(self._branch_name, self._steps)
+        self._plotter = None
         self._isx = isx
         self._caiman = caiman
+        self._caiman_cluster = caiman_cluster
+        self._step_cache = step_cache
+        self._accessed_keys = None
+        self._applied_copy_strategies = None
+        self._metrics_enabled = metrics_enabled
+        self._step_metrics = None
+        self._hooks = hooks or HookRegistry()
+        self._current_step_name = None
+        self._input_checkpoints_enabled = input_checkpoints_enabled
+        self._input_checkpoints = InputCheckpoints(self._file_system, trace_path)
+        self._current_step_key = None
         self._load_combined_defaults(defaults, defaults_path)
         self._build_initial_trace()
 
     # Main protocol
 
     def output(self, key):
-        for step in reversed(self._steps):
-            if key in step.step_output():
-                return step.step_output()[key]
+        self._assert_no_pending_steps()
+        if self._accessed_keys is not None:
+            self._accessed_keys.add(key)
+        latest_step = self._latest_step_by_key.get(key)
+        if latest_step is not None:
+            return latest_step.step_output()[key]
         if key in self._pipeline_inputs:
             return self._pipeline_inputs[key]
         raise OutputKeyNotFoundError(key)
@@ -114,25 +182,81 @@ class CIPipe:
         return [entry['value'] for entry in outputs]
 
     def step(self, step_name, step_function, *args, **kwargs):
+        if self._lazy:
+            self._pending_steps.append(PendingStep(step_name, step_function, args, kwargs))
+            return self
+        return self._execute_step(step_name, step_function, args, kwargs)
+
+    def run(self):
+        self._running_pending_steps = True
+        try:
+            while self._pending_steps:
+                # A step that fails stays pending, so the next run starts again from it
+                pending_step = self._pending_steps[0]
+                self._execute_step(pending_step.name(), pending_step.function(), pending_step.args(),
+                                   pending_step.arguments())
+                self._pending_steps.pop(0)
+        finally:
+            self._running_pending_steps = False
+        return self
+
+    def pending_steps(self):
+        return list(self._pending_steps)
+
+    def _execute_step(self, step_name, step_function, args, kwargs):
         self._assert_pipeline_can_resume_execution()
         self._restore_previous_steps_from_trace_if_applicable()
         self._populate_default_params(step_function, kwargs)
-        new_step = Step(step_name, self.output, step_function, args, kwargs)
+        self._hooks.run(HookRegistry.PRE_STEP, pipeline=self, step_name=step_name, step_function=step_function,
+                        params=kwargs)
+        self._current_step_name = step_name
+        # Steps restored from the trace come first, so the index matches the one of an interrupted run
+        step_key = self._input_checkpoints.step_key(self._branch_name, len(self._steps) + 1, step_name, kwargs)
+        self._current_step_key = step_key
+        new_step, error = None, None
+        try:
+            new_step = self._run_or_restore_step_from_cache(step_name, step_function, args, kwargs)
+        except Exception as step_error:
+            error = step_error
+            raise
+        finally:
+            self._current_step_name = None
+            self._current_step_key = None
+            # Also after a failure, so whatever pre_step started (e.g. a profiler) can be stopped
+            self._hooks.run(HookRegistry.POST_STEP, pipeline=self, step_name=step_name, step_function=step_function,
+                            params=kwargs, step=new_step, error=error)
+        superseded_outputs = self._outputs_superseded_by(new_step)
         self._steps.append(new_step)
+        self._index_steps_outputs([new_step])
+        self._output_references.add_steps(self._branch_name, [new_step])
+        for key, values in superseded_outputs.items():
+            self._output_references.release(self._branch_name, key, values)
         self._update_trace_if_available()
-        self._try_clean_up_if_enabled()
+        self._input_checkpoints.clear(step_key)
+        self._try_clean_up_if_enabled(superseded_outputs)
+        self._record_clean_up_errors_in_trace()
         return self
 
     def info(self, step_number):
-        self._plotter.get_step_info(self._trace_repository.load(), step_number, self._branch_name)
+        self._trace_plotter().get_step_info(self._trace_repository.load(), step_number, self._branch_name)
 
     def trace(self):
-        self._plotter.get_all_trace_from_branch(self._trace_repository.load(), self._branch_name)
+        self._trace_plotter().get_all_trace_from_branch(self._trace_repository.load(), self._branch_name)
+
+    def hot_spots(self, sort_by="wall_time", descending=True):
+        self._trace_plotter().get_hot_spots_from_branch(self._trace_repository.load(), self._branch_name, sort_by, descending)
 
     def trace_as_json(self):
-        return self._trace_repository.load().to_dict()
+        # The loaded trace is the one the pipeline keeps updating, callers get a detached copy
+        return copy.deepcopy(self._trace_repository.load().to_dict())
+
+    def compact_trace(self):
+        self._trace_repository.compact()
+        return self
 
     def branch(self, branch_name):
+        # A branch starts from the executed steps, so pending ones have to run first
+        self.run()
         new_pipe = CIPipe(
             self._raw_pipeline_inputs.copy(),
             outputs_directory=self._outputs_directory,
@@ -144,6 +268,15 @@ class CIPipe:
             defaults=self._defaults.copy(),
             isx=self._isx,
             caiman=self._caiman,
+            step_cache=self._step_cache,
+            trace_journal_enabled=self._trace_journal_enabled,
+            output_references=self._output_references,
+            deletion_queue=self._deletion_queue,
+            lazy=self._lazy,
+            metrics_enabled=self._metrics_enabled,
+            hooks=self._hooks,
+            input_checkpoints_enabled=self._input_checkpoints_enabled,
+            caiman_cluster=self._caiman_cluster,
         )
 
         return new_pipe
@@ -152,7 +285,7 @@ class CIPipe:
         return self._file_system
 
     def set_defaults(self, defaults_path=None, **defaults):
-        if self._steps:
+        if self._steps or self._pending_steps:
             raise DefaultsAfterStepsError()
         self._load_combined_defaults(defaults, defaults_path)
         self._build_initial_trace()
@@ -161,6 +294,45 @@ class CIPipe:
     def defaults(self):
         return self._defaults.copy()
 
+    def executor(self):
+        return Executor.from_defaults(self._defaults)
+
+    def copy_strategy(self):
+        strategy = self._defaults.get(self.COPY_STRATEGY_DEFAULT_KEY) or CopyStrategy.COPY
+        if strategy not in CopyStrategy.STRATEGIES:
+            raise InvalidCopyStrategyError(strategy, CopyStrategy.STRATEGIES)
+        return strategy
+
+    def caiman_cluster(self):
+        return self._caiman_cluster
+
+    def start_caiman_cluster(self, n_processes=None, backend=CaimanCluster.MULTIPROCESSING):
+        if self._caiman is None:
+            raise CaimanBackendNotConfiguredError()
+        if self._caiman_cluster is None:
+            self._caiman_cluster = CaimanCluster(self._caiman, n_processes, backend)
+        return self
+
+    def use_caiman_cluster(self, caiman_cluster):
+        self._caiman_cluster = caiman_cluster
+        return self
+
+    def shutdown_caiman_cluster(self):
+        if self._caiman_cluster is not None:
+            self._caiman_cluster.shutdown()
+        return self
+
+    def hooks(self):
+        return self._hooks
+
+    def add_hook(self, event, hook):
+        self._hooks.register(event, hook)
+        return self
+
+    def remove_hook(self, event, hook):
+        self._hooks.unregister(event, hook)
+        return self
+
     def output_directory_for_next_step(self, next_step_name):
         steps_count = len(self._steps)
         step_folder_name = f"{self._branch_name} - Step {steps_count + 1} - {next_step_name}"
@@ -173,27 +345,89 @@ class CIPipe:
         return output_dir
 
     def copy_file_to_output_directory(self, file_path,
-                                      next_step_name):
+                                      next_step_name, for_write=False):
         output_dir = self.output_directory_for_next_step(next_step_name)
-        new_file_path = self._file_system.copy2(file_path, output_dir)
+        strategy = self.copy_strategy()
+        if for_write and strategy == CopyStrategy.HARDLINK:
+            # A hardlink would have to be detached, with a full copy, before the step writes the file
+            strategy = CopyStrategy.COPY
+        new_file_path, applied_strategy = self._file_system.copy_file(file_path, output_dir, strategy)
+        if self._applied_copy_strategies is not None:
+            self._applied_copy_strategies.add(applied_strategy)
         return new_file_path
 
+    def run_input_tasks(self, input_entries, tasks, outputs=None):
+        """
+        outputs are the files each input writes. When given, finished inputs are checkpointed, and on a
+        resumed run the inputs whose outputs are still the recorded ones are skipped (their result is None).
+        """
+        input_entries = list(input_entries)
+        tasks = list(tasks)
+        pending = self._pending_input_indexes(input_entries, outputs)
+        pending_entries = [input_entries[index] for index in pending]
+        executor = self.executor()
+        in_worker_processes = executor.executor_type() == Executor.PROCESSES
+        if in_worker_processes:
+            # Hooks can not run inside worker processes, so they surround each submitted task instead
+            for entry in pending_entries:
+                self._run_input_hook(HookRegistry.PER_INPUT_START, entry)
+            pending_tasks = [tasks[index] for index in pending]
+        else:
+            pending_tasks = [self._task_with_input_hooks(input_entries[index], tasks[index]) for index in pending]
+
+        def on_task_done(pending_index, timed_result):
+            entry = pending_entries[pending_index]
+            if in_worker_processes:
+                self._run_input_hook(HookRegistry.PER_INPUT_END, entry)
+            self._record_input_duration(entry['ids'], timed_result[1])
+            if self._checkpoints_inputs(outputs):
+                self._input_checkpoints.record(self._current_step_key, entry['ids'], outputs[pending[pending_index]])
+
+        results = [None] * len(input_entries)
+        for index, (result, _) in zip(pending, executor.run_timed(pending_tasks, on_task_done)):
+            results[index] = result
+        return results
+
+    def report_progress(self, ids, done, total):
+        self._hooks.run(HookRegistry.ON_PROGRESS, pipeline=self, step_name=self._current_step_name, ids=ids,
+                        done=done, total=total)
+
+    def measured_inputs(self, input_entries):
+        for entry in input_entries:
+            self._run_input_hook(HookRegistry.PER_INPUT_START, entry)
+            started = time.perf_counter()
+            yield entry
+            self._record_input_duration(entry['ids'], time.perf_counter() - started)
+            self._run_input_hook(HookRegistry.PER_INPUT_END, entry)
+
     def file_in_output_directory(self, file_name, next_step_name):
         output_dir = self.output_directory_for_next_step(next_step_name)
         return self._file_system.join(output_dir, file_name)
 
     def associate_keys_by_id(self, key, key_to_associate):
-        key_inputs = self.output(key)
-        key_to_associate_inputs = self.output(key_to_associate)
-
-        pairs = [
-            (key_input['ids'], key_input['value'], key_to_associate_input['value'])
-            for key_input in key_inputs
-            for key_to_associate_input in key_to_associate_inputs
-            if key_input['ids'] == key_to_associate_input['ids']
-        ]
-
-        return pairs
+        return self.join_keys(key, key_to_associate)
+
+    def join_keys(self, key, *keys_to_associate):
+        values_by_ids_for_keys = [self._values_by_ids(self.output(other_key)) for other_key in keys_to_associate]
+
+        rows = []
+        for entry in self.output(key):
+            ids = tuple(entry['ids'])
+            matches = [values_by_ids.get(ids) for values_by_ids in values_by_ids_for_keys]
+            if all(matches):
+                for associated_values in itertools.product(*matches):
+                    rows.append((entry['ids'], entry['value'], *associated_values))
+        return rows
+
+    def group_keys_by_id(self, key, *keys_to_associate):
+        values_by_ids_for_keys = [self._values_by_ids(self.output(each_key)) for each_key in (key, *keys_to_associate)]
+        first_values_by_ids, other_values_by_ids = values_by_ids_for_keys[0], values_by_ids_for_keys[1:]
+
+        return {
+            ids: tuple(values_by_ids[ids] for values_by_ids in values_by_ids_for_keys)
+            for ids in first_values_by_ids
+            if all(ids in values_by_ids for values_by_ids in other_values_by_ids)
+        }
 
     def clean_up_all(self):
         for key in self.all_keys():
@@ -202,21 +436,34 @@ class CIPipe:
 
     def clean_up_key(self, key):
         old_values = self._old_values_for_key(key)
-        old_values = self._exclude_values_used_in_other_branches(key, old_values)
-        for old_value in old_values:
-            if isinstance(old_value, str) and self._file_system.exists(old_value):
-                self._file_system.remove(old_value)
+        self._output_references.release(self._branch_name, key, old_values)
+        self._remove_values_not_used_in_other_branches(key, old_values)
+        return self
+
+    def flush_clean_up(self):
+        self._deletion_queue.flush()
+        self._record_clean_up_errors_in_trace()
         return self
 
     def all_keys(self):
-        keys = set()
-        for step in self._steps:
-            for key in step.step_output().keys():
-                keys.add(key)
+        keys = set(self._latest_step_by_key.keys())
         for key in self._pipeline_inputs.keys():
             keys.add(key)
         return list(keys)
 
+    def latest_key(self, keys):
+        """
+        Returns the one of the given keys written by the latest step, pipeline inputs count as written before
+        every step. Ties (or none of the keys being present) are resolved by the order of the keys.
+        """
+        def written_at(key):
+            latest_step = self._latest_step_by_key.get(key)
+            if latest_step is not None:
+                return next(index for index, step in enumerate(self._steps, start=1) if step is latest_step)
+            return 0 if key in self._pipeline_inputs else -1
+
+        return max(keys, key=written_at)
+
     def assert_trace_is_valid(self):
         return self._trace_repository.validate()
 
@@ -250,14 +497,24 @@ class CIPipe:
 
     @property
     def isx(self):
+        # Modules are imported on first use, so headless jobs do not pay for their dependencies
+        from .modules.isx_module import ISXModule
         return ISXModule(self._isx, self)
 
     @property
     def caiman(self):
+        from .modules.caiman_module import CaimanModule
         return CaimanModule(self._caiman, self)
 
     # Private methods
 
+    def _trace_plotter(self):
+        if self._plotter is None:
+            # rich is only needed once something is printed
+            from .plotter import Plotter
+            self._plotter = Plotter()
+        return self._plotter
+
     @classmethod
     def _video_inputs_with_extension(cls, files):
         inputs = {}
@@ -269,6 +526,16 @@ class CIPipe:
 
         return inputs
 
+    def _assert_no_pending_steps(self):
+        # Outputs are only up to date once the recorded steps ran; steps running now see the ones before them
+        if self._pending_steps and not self._running_pending_steps:
+            raise PendingStepsError([pending_step.name() for pending_step in self._pending_steps])
+
+    def _traced_defaults(self):
+        # How inputs are scheduled does not change the results, so executor settings stay out of the trace
+        executor_keys = (Executor.TYPE_DEFAULT_KEY, Executor.MAX_WORKERS_DEFAULT_KEY)
+        return {key: value for key, value in self._defaults.items() if key not in executor_keys}
+
     def _load_defaults(self, defaults):
         for defaults_key, defaults_value in defaults.items():
             self._defaults[defaults_key] = defaults_value
@@ -277,6 +544,7 @@ class CIPipe:
         loaded_defaults = {}
 
         if defaults_path:
+            from .utils.config_defaults import ConfigDefaults
             file_defaults = ConfigDefaults.load_from_file(defaults_path, self._file_system)
             loaded_defaults.update(file_defaults)
         if defaults and isinstance(defaults, dict):
@@ -301,7 +569,7 @@ class CIPipe:
         existing_branch = self._trace.branch_from(self._branch_name)
         if existing_branch and existing_branch.steps():
             return
-        self._trace.set_pipeline(self._pipeline_inputs, self._defaults, self._outputs_directory)
+        self._trace.set_pipeline(self._pipeline_inputs, self._traced_defaults(), self._outputs_directory)
 
         if existing_branch is None:
             self._trace.add_branch(Branch(self._branch_name, []))
@@ -363,6 +631,13 @@ class CIPipe:
                 params=step['params']
             )
             self._steps.append(restored_steps)
+            self._index_steps_outputs([restored_steps])
+        self._output_references.add_steps(self._branch_name, self._steps)
+
+    def _index_steps_outputs(self, steps):
+        for step in steps:
+            for key in step.step_output().keys():
+                self._latest_step_by_key[key] = step
 
     def _inputs_with_ids(self, inputs):
         inputs_with_ids = {}
@@ -375,9 +650,106 @@ class CIPipe:
     def _hash_id(self, key, value):
         return hashlib.sha256((key + str(value)).encode()).hexdigest()
 
-    def _try_clean_up_if_enabled(self):
-        if self._auto_clean_up_enabled:
-            self.clean_up_all()
+    def _values_by_ids(self, entries):
+        values_by_ids = {}
+        for entry in entries:
+            values_by_ids.setdefault(tuple(entry['ids']), []).append(entry['value'])
+        return values_by_ids
+
+    def _run_or_restore_step_from_cache(self, step_name, step_function, args, kwargs):
+        if self._step_cache is not None:
+            step_metrics = StepMetrics(self._file_system) if self._metrics_enabled else None
+            if step_metrics is not None:
+                step_metrics.start()
+            output_dir = self.output_directory_for_next_step(step_name)
+            cached_outputs = self._step_cache.lookup(step_name, step_function, args, kwargs, self.output, output_dir)
+            if cached_outputs is not None:
+                cached_step = Step(step_name, kwargs=kwargs, step_outputs=cached_outputs)
+                if step_metrics is not None:
+                    cached_step.set_metrics(step_metrics.stop([], cached_outputs, cached=True))
+                return cached_step
+
+        new_step, accessed_keys = self._run_step(step_name, step_function, args, kwargs)
+        if self._step_cache is not None:
+            self._step_cache.store(step_name, step_function, args, kwargs, accessed_keys, self.output,
+                                   new_step.step_output(), self.output_directory_for_next_step(step_name))
+        return new_step
+
+    def _run_step(self, step_name, step_function, args, kwargs):
+        # Keys read while running the step are the ones its cache entry and read bytes depend on
+        self._accessed_keys = set()
+        self._applied_copy_strategies = set()
+        self._step_metrics = StepMetrics(self._file_system) if self._metrics_enabled else None
+        step_metrics = self._step_metrics
+        try:
+            if step_metrics is not None:
+                step_metrics.start()
+            new_step = Step(step_name, self.output, step_function, args, kwargs)
+            accessed_keys = self._accessed_keys
+            applied_copy_strategies = self._applied_copy_strategies
+        finally:
+            self._accessed_keys = None
+            self._applied_copy_strategies = None
+            self._step_metrics = None
+
+        # Full copies are the default, other strategies are reported with what they fell back to
+        if applied_copy_strategies and self.copy_strategy() != CopyStrategy.COPY:
+            new_step.set_copy_strategies(sorted(applied_copy_strategies))
+
+        if step_metrics is not None:
+            input_entries = [entry for key in sorted(accessed_keys) for entry in self.output(key)]
+            new_step.set_metrics(step_metrics.stop(input_entries, new_step.step_output()))
+        return new_step, accessed_keys
+
+    def _task_with_input_hooks(self, entry, task):
+        step_name = self._current_step_name
+
+        def task_with_input_hooks():
+            self._run_input_hook(HookRegistry.PER_INPUT_START, entry, step_name)
+            result = task()
+            self._run_input_hook(HookRegistry.PER_INPUT_END, entry, step_name)
+            return result
+
+        return task_with_input_hooks
+
+    def _run_input_hook(self, event, entry, step_name=None):
+        self._hooks.run(event, pipeline=self, step_name=step_name or self._current_step_name, ids=entry['ids'])
+
+    def _checkpoints_inputs(self, outputs):
+        return outputs is not None and self._input_checkpoints_enabled and self._current_step_key is not None
+
+    def _pending_input_indexes(self, input_entries, outputs):
+        if not self._checkpoints_inputs(outputs):
+            return list(range(len(input_entries)))
+        completed_inputs = self._input_checkpoints.completed_inputs(self._current_step_key)
+        return [
+            index for index, entry in enumerate(input_entries)
+            if not self._input_checkpoints.is_completed(completed_inputs, entry['ids'], outputs[index])
+        ]
+
+    def _record_input_duration(self, ids, wall_time):
+        if self._step_metrics is not None:
+            self._step_metrics.record_input(ids, wall_time)
+
+    def _try_clean_up_if_enabled(self, superseded_outputs):
+        if not self._auto_clean_up_enabled:
+            return
+        for key, values in superseded_outputs.items():
+            self._remove_values_not_used_in_other_branches(key, values)
+
+    def _outputs_superseded_by(self, new_step):
+        # Only the latest outputs of the keys a step writes can become old because of it
+        superseded_outputs = {}
+        for key, entries in new_step.step_output().items():
+            latest_step = self._latest_step_by_key.get(key)
+            if latest_step is None:
+                continue
+            new_values = self._hashable_values(entries)
+            superseded_outputs[key] = [
+                entry['value'] for entry in latest_step.step_output()[key]
+                if OutputReferences.hashable_value(entry['value']) not in new_values
+            ]
+        return superseded_outputs
 
     def _old_values_for_key(self, key):
         all_values = []
@@ -385,24 +757,26 @@ class CIPipe:
             step_output = step.step_output()
             if key in step_output:
                 all_values.extend([entry['value'] for entry in step_output[key]])
-        current_values = [entry['value'] for entry in self.output(key)]
-        old_values = [value for value in all_values if value not in current_values]
+        current_values = self._hashable_values(self.output(key))
+        old_values = [value for value in all_values if OutputReferences.hashable_value(value) not in current_values]
         return old_values
 
-    def _exclude_values_used_in_other_branches(self, key, values):
-        branches = self._trace.branches()
-        current_branch = self._trace.branch_from(self._branch_name)
-        values_in_other_branches = set()
-
-        for branch in branches:
-            if branch.name() == current_branch.name():
+    def _remove_values_not_used_in_other_branches(self, key, values):
+        for value in values:
+            if self._output_references.is_used_outside(self._branch_name, key, value):
                 continue
-            for step in branch.steps():
-                step_output = step.step_output()
-                if key in step_output:
-                    values_in_other_branches.update(
-                        entry['value'] for entry in step_output[key]
-                    )
-
-        filtered_values = [value for value in values if value not in values_in_other_branches]
-        return filtered_values
+            if isinstance(value, str):
+                self._deletion_queue.enqueue(value, self._branch_name, self._clean_up_hook_runner(key, value))
+
+    def _clean_up_hook_runner(self, key, path):
+        return lambda: self._hooks.run(HookRegistry.ON_CLEAN_UP, pipeline=self, key=key, path=path)
+
+    def _record_clean_up_errors_in_trace(self):
+        errors = self._deletion_queue.drain_failures(self._branch_name)
+        if not errors or not self._trace:
+            return
+        self._trace.add_clean_up_errors(errors, self._branch_name)
+        self._trace_repository.save(self._trace)
+
+    def _hashable_values(self, entries):
+        return {OutputReferences.hashable_value(entry['value']) for entry in entries}
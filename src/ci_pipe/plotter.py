@@ -9,6 +9,14 @@ from ci_pipe.step import Step
 
 
 class Plotter:
+    METRIC_COLUMNS = {
+        "wall_time": "Wall time (s)",
+        "cpu_time": "CPU time (s)",
+        "peak_rss_increase": "Peak RSS increase (bytes)",
+        "bytes_read": "Bytes read",
+        "bytes_written": "Bytes written",
+    }
+
     def __init__(self, console=None):
         self.console = console or Console(file=io.StringIO(), force_terminal=True)
 
@@ -67,6 +75,45 @@ class Plotter:
         self.console.print(f"\n[bold underline]Pipeline Trace of branch: {branch_name}[/bold underline]\n")
         self.console.print(*panels, justify="center")
 
+    def get_hot_spots_from_branch(self, trace, branch_name, sort_by="wall_time", descending=True):
+        if sort_by not in self.METRIC_COLUMNS:
+            self.console.print(
+                f"[bold red]Can not sort by '{sort_by}'. Valid metrics are: {', '.join(self.METRIC_COLUMNS)}[/bold red]")
+            return
+
+        steps = trace.steps_from(branch_name)
+        measured_steps = [(index, step) for index, step in enumerate(steps, start=1) if step.metrics()]
+        if not measured_steps:
+            self.console.print(f"[yellow]No step metrics found in branch '{branch_name}'[/yellow]")
+            return
+
+        measured_steps.sort(key=lambda indexed_step: indexed_step[1].metrics().get(sort_by) or 0, reverse=descending)
+        self.console.print(self._build_hot_spots_table(measured_steps, branch_name, sort_by))
+
+    def _build_hot_spots_table(self, measured_steps, branch_name, sort_by):
+        table = Table(title=f"Hot spots of branch: {branch_name} (sorted by {sort_by})")
+        table.add_column("Step", style="cyan", no_wrap=True)
+        for metric, header in self.METRIC_COLUMNS.items():
+            table.add_column(header, style="bold yellow" if metric == sort_by else "yellow", justify="right")
+        table.add_column("Slowest input (s)", style="yellow", justify="right")
+
+        for index, step in measured_steps:
+            metrics = step.metrics()
+            input_times = [input_metrics["wall_time"] for input_metrics in metrics.get("inputs", [])]
+            table.add_row(
+                f"{index}. {step.name()}",
+                *(self._format_metric(metrics.get(metric)) for metric in self.METRIC_COLUMNS),
+                self._format_metric(max(input_times) if input_times else None),
+            )
+        return table
+
+    def _format_metric(self, value):
+        if value is None:
+            return "-"
+        if isinstance(value, float):
+            return f"{value:.3f}"
+        return str(value)
+
     def _format_params(self, params):
         if not params:
             return "None"
@@ -1,6 +1,9 @@
 class Step:
-    def __init__(self, step_name, look_up_function=None, step_function=None, args=None, kwargs=None, step_outputs=None):
+    def __init__(self, step_name, look_up_function=None, step_function=None, args=None, kwargs=None, step_outputs=None,
+                 metrics=None, copy_strategies=None):
         self._step_name = step_name
+        self._metrics = metrics
+        self._copy_strategies = copy_strategies
         self._step_function = step_function
         self._args = args if args is not None else []
         self._kwargs = kwargs if kwargs is not None else {}
@@ -24,6 +27,8 @@ class Step:
             args=None,
             kwargs=data.get("params"),
             step_outputs=data.get("outputs"),
+            metrics=data.get("metrics"),
+            copy_strategies=data.get("copy_strategies"),
         )
 
     @classmethod
@@ -35,6 +40,8 @@ class Step:
         obj._args = ()
         obj._kwargs = params or {}
         obj._step_outputs = outputs  # Preload, do not execute
+        obj._metrics = None
+        obj._copy_strategies = None
         return obj
 
     def step_output(self):
@@ -49,9 +56,26 @@ class Step:
     def arguments(self):
         return self._kwargs
 
+    def metrics(self):
+        return self._metrics
+
+    def set_metrics(self, metrics):
+        self._metrics = metrics
+
+    def copy_strategies(self):
+        return self._copy_strategies
+
+    def set_copy_strategies(self, copy_strategies):
+        self._copy_strategies = copy_strategies
+
     def to_dict(self):
-        return {
+        data = {
             "name": self.name(),
             "outputs": self.output(),
             "params": self.arguments()
         }
+        if self._metrics:
+            data["metrics"] = self._metrics
+        if self._copy_strategies:
+            data["copy_strategies"] = self._copy_strategies
+        return data
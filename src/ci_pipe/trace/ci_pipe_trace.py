@@ -28,6 +28,9 @@ class CIPipeTrace:
     def set_pipeline(self, inputs, defaults, outputs_directory):
         self._pipeline = Pipeline(inputs, defaults or {}, outputs_directory)
 
+    def pipeline(self) -> Pipeline:
+        return self._pipeline
+
     def add_branch(self, branch: Branch):
         self._branches[branch.name()] = branch
 
@@ -36,6 +39,11 @@ class CIPipeTrace:
             self._branches[branch_name] = Branch(branch_name, [])
         self._branches[branch_name].add_steps(steps)
 
+    def add_clean_up_errors(self, errors, branch_name):
+        if branch_name not in self._branches:
+            self._branches[branch_name] = Branch(branch_name, [])
+        self._branches[branch_name].add_clean_up_errors(errors)
+
     def branch_from(self, branch_name) -> Branch:
         return self._branches.get(branch_name)
     
@@ -0,0 +1,73 @@
+import json
+import threading
+
+
+class InputCheckpoints:
+    """
+    Progress of the steps being executed, appended next to the trace as one JSON line per finished input.
+    A step that was interrupted halfway only processes again the inputs whose recorded outputs are
+    missing or changed since they were written. Records of a step are dropped once it completes.
+    """
+    SUFFIX = ".progress"
+
+    def __init__(self, file_system, trace_path):
+        self._file_system = file_system
+        self._path = f"{trace_path}{self.SUFFIX}"
+        self._lock = threading.Lock()
+
+    def step_key(self, branch_name, step_index, step_name, params):
+        return json.dumps([branch_name, step_index, step_name, params], sort_keys=True, default=str)
+
+    def completed_inputs(self, step_key):
+        completed = {}
+        for record in self._records():
+            if record["step"] == step_key:
+                completed[self._ids_key(record["ids"])] = record
+        return completed
+
+    def is_completed(self, completed_inputs, ids, output_paths):
+        record = completed_inputs.get(self._ids_key(ids))
+        if record is None or record["outputs"] != list(output_paths):
+            return False
+        return all(
+            self._signature(path) == signature
+            for path, signature in zip(output_paths, record["signatures"])
+        )
+
+    def record(self, step_key, ids, output_paths):
+        record = {
+            "step": step_key,
+            "ids": ids,
+            "outputs": list(output_paths),
+            "signatures": [self._signature(path) for path in output_paths],
+        }
+        with self._lock:
+            self._file_system.append(self._path, json.dumps(record) + "\n")
+
+    def clear(self, step_key):
+        with self._lock:
+            if not self._file_system.exists(self._path):
+                return
+            records = self._records()
+            remaining_records = [record for record in records if record["step"] != step_key]
+            if len(remaining_records) < len(records):
+                self._file_system.write(self._path, "".join(json.dumps(record) + "\n" for record in remaining_records))
+
+    def path(self):
+        return self._path
+
+    # Private methods
+
+    def _records(self):
+        if not self._file_system.exists(self._path):
+            return []
+        lines = self._file_system.read(self._path).splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def _signature(self, path):
+        # Signatures are compared with the ones read back from JSON, where tuples become lists
+        return json.loads(json.dumps(self._file_system.signature(path)))
+
+    @staticmethod
+    def _ids_key(ids):
+        return json.dumps(ids)
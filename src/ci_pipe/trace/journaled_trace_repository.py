@@ -0,0 +1,132 @@
+import json
+
+from ci_pipe.trace.ci_pipe_trace import CIPipeTrace
+from ci_pipe.trace.trace_repository import TraceRepository
+
+
+class JournaledTraceRepository(TraceRepository):
+    """
+    Trace repository that appends one journal record per pipeline or branch change instead of
+    rewriting the whole trace file on every save.
+
+    The trace is the base trace file plus the replayed journal. compact() folds the journal back
+    into the base file, which keeps the usual trace.json schema.
+    """
+    JOURNAL_SUFFIX = ".journal"
+
+    def __init__(self, file_system, filename, validator=None):
+        super().__init__(file_system, filename, validator)
+        self._journal_filename = f"{filename}{self.JOURNAL_SUFFIX}"
+        self._persisted_pipeline = None
+        self._persisted_steps_count = {}
+        self._persisted_clean_up_errors_count = {}
+
+    def save(self, trace: CIPipeTrace):
+        # Appending only keeps the in-memory trace valid if it already matched the files
+        cache_stays_fresh = trace is self._cached_trace and self._is_cache_fresh()
+        self._write_trace(trace)
+        if cache_stays_fresh:
+            self._cache(trace, self._files_signature())
+        else:
+            self.invalidate()
+
+    def compact(self):
+        trace = self.load()
+        super()._write_trace(trace)
+        self._file_system.write(self._journal_filename, "")
+        self._cache(trace, self._files_signature())
+        return trace
+
+    def exists(self):
+        return super().exists() or self._file_system.exists(self._journal_filename)
+
+    def journal_path(self):
+        return self._journal_filename
+
+    # Private methods
+
+    def _read_trace(self):
+        json_trace = self._read_base_trace()
+        for record in self._read_journal():
+            self._apply_record(json_trace, record)
+        self._remember_persisted_state(json_trace)
+        return CIPipeTrace.from_dict(json_trace)
+
+    def _write_trace(self, trace):
+        records = []
+
+        serialized_pipeline = self._serialize(trace.pipeline().to_dict())
+        if serialized_pipeline != self._persisted_pipeline:
+            records.append({"pipeline": trace.pipeline().to_dict()})
+            self._persisted_pipeline = serialized_pipeline
+
+        for branch in trace.branches():
+            persisted_steps_count = self._persisted_steps_count.get(branch.name())
+            steps_count = len(branch.steps())
+            # Steps are only appended; a shorter in-memory branch is a stale view, not a deletion
+            if persisted_steps_count is not None and steps_count <= persisted_steps_count:
+                continue
+            start = persisted_steps_count or 0
+            records.append({"branch": branch.name(), "start": start, "steps": branch.steps_to_dict(start)})
+            self._persisted_steps_count[branch.name()] = steps_count
+
+        for branch in trace.branches():
+            persisted_errors_count = self._persisted_clean_up_errors_count.get(branch.name(), 0)
+            errors = branch.clean_up_errors()
+            if len(errors) <= persisted_errors_count:
+                continue
+            records.append({
+                "clean_up_errors": branch.name(),
+                "start": persisted_errors_count,
+                "errors": errors[persisted_errors_count:],
+            })
+            self._persisted_clean_up_errors_count[branch.name()] = len(errors)
+
+        if records:
+            self._file_system.append(
+                self._journal_filename,
+                "".join(self._serialize(record) + "\n" for record in records)
+            )
+
+    def _files_signature(self):
+        return super()._files_signature(), self._file_system.signature(self._journal_filename)
+
+    def _read_base_trace(self):
+        try:
+            return json.loads(self._file_system.read(self._filename))
+        except Exception:
+            return {}
+
+    def _read_journal(self):
+        if not self._file_system.exists(self._journal_filename):
+            return []
+        lines = self._file_system.read(self._journal_filename).splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+
+    def _apply_record(self, json_trace, record):
+        if "pipeline" in record:
+            json_trace["pipeline"] = record["pipeline"]
+        if "branch" in record:
+            steps = json_trace.setdefault(record["branch"], {"steps": []})["steps"]
+            del steps[record["start"]:]
+            steps.extend(record["steps"])
+        if "clean_up_errors" in record:
+            branch = json_trace.setdefault(record["clean_up_errors"], {"steps": []})
+            errors = branch.setdefault("clean_up_errors", [])
+            del errors[record["start"]:]
+            errors.extend(record["errors"])
+
+    def _remember_persisted_state(self, json_trace):
+        self._persisted_pipeline = self._serialize(json_trace["pipeline"]) if "pipeline" in json_trace else None
+        self._persisted_steps_count = {
+            name: len(payload.get("steps", []))
+            for name, payload in json_trace.items() if name != "pipeline"
+        }
+        self._persisted_clean_up_errors_count = {
+            name: len(payload.get("clean_up_errors", []))
+            for name, payload in json_trace.items() if name != "pipeline"
+        }
+
+    @staticmethod
+    def _serialize(data):
+        return json.dumps(data, sort_keys=True)
@@ -4,34 +4,55 @@ from ci_pipe.step import Step
 
 
 class Branch:
-    def __init__(self, name, steps):
+    def __init__(self, name, steps, clean_up_errors=None):
         self._name = name
         self._steps = steps
+        self._clean_up_errors = clean_up_errors or []
 
     @classmethod
     def from_dict(cls, name, data):
         serialized_steps = data.get("steps", [])
         steps = [Step.from_dict(serialized_step) for serialized_step in serialized_steps]
-        return cls(name, steps)
+        return cls(name, steps, data.get("clean_up_errors"))
 
     def to_dict(self):
-        return {
-            "steps": [
-                {
-                    "index": index,
-                    "name": step.name(),
-                    "params": step.arguments(),
-                    "outputs": step.step_output(),
-                }
-                for index, step in enumerate(self._steps, start=1)
-            ]
+        data = {
+            "steps": self.steps_to_dict()
         }
+        if self._clean_up_errors:
+            data["clean_up_errors"] = self._clean_up_errors
+        return data
+
+    def steps_to_dict(self, start=0):
+        return [
+            self._step_to_dict(index, step)
+            for index, step in enumerate(self._steps[start:], start=start + 1)
+        ]
 
     def add_steps(self, steps: List[Step]):
         self._steps.extend(steps)
 
+    def add_clean_up_errors(self, errors):
+        self._clean_up_errors.extend(errors)
+
+    def clean_up_errors(self):
+        return self._clean_up_errors
+
     def name(self):
         return self._name
 
     def steps(self):
         return self._steps
+
+    def _step_to_dict(self, index, step):
+        data = {
+            "index": index,
+            "name": step.name(),
+            "params": step.arguments(),
+            "outputs": step.step_output(),
+        }
+        if step.metrics():
+            data["metrics"] = step.metrics()
+        if step.copy_strategies():
+            data["copy_strategies"] = step.copy_strategies()
+        return data
@@ -4,21 +4,45 @@ from ci_pipe.trace.ci_pipe_trace import CIPipeTrace
 
 
 class TraceRepository:
+    """
+    Loads and saves the pipeline trace.
+
+    The last loaded or saved trace is kept in memory and returned by load() for as long as the
+    trace file signature (modification time and size) does not change, so read paths do not parse
+    the trace file again. generation() increases every time the in-memory trace is replaced.
+    """
+
     def __init__(self, file_system, filename, validator=None):
         self._file_system = file_system
         self._filename = filename
         self._validator = validator
+        self._cached_trace = None
+        self._cached_signature = None
+        self._generation = 0
 
     def load(self) -> CIPipeTrace:
-        try:
-            json_trace = json.loads(self._file_system.read(self._filename))
-        except Exception:
-            json_trace = {}
-        return CIPipeTrace.from_dict(json_trace)
+        if self._is_cache_fresh():
+            return self._cached_trace
+        signature = self._files_signature()
+        trace = self._read_trace()
+        self._cache(trace, signature)
+        return trace
 
     def save(self, trace: CIPipeTrace):
-        trace_as_json = trace.to_dict()
-        self._file_system.write(self._filename, json.dumps(trace_as_json, indent=4))
+        self._write_trace(trace)
+        self._cache(trace, self._files_signature())
+
+    def compact(self):
+        # The whole trace is rewritten on every save, so there is nothing to fold
+        return self.load()
+
+    def invalidate(self):
+        self._cached_trace = None
+        self._cached_signature = None
+        self._generation += 1
+
+    def generation(self):
+        return self._generation
 
     def exists(self):
         return self._file_system.exists(self._filename)
@@ -31,4 +55,28 @@ class TraceRepository:
         return self._validator.validate(data_as_json)
     
     def trace_path(self):
-        return self._filename
\ No newline at end of file
+        return self._filename
+
+    # Private methods
+
+    def _read_trace(self):
+        try:
+            json_trace = json.loads(self._file_system.read(self._filename))
+        except Exception:
+            json_trace = {}
+        return CIPipeTrace.from_dict(json_trace)
+
+    def _write_trace(self, trace):
+        trace_as_json = trace.to_dict()
+        self._file_system.write(self._filename, json.dumps(trace_as_json, indent=4))
+
+    def _files_signature(self):
+        return self._file_system.signature(self._filename)
+
+    def _is_cache_fresh(self):
+        return self._cached_trace is not None and self._files_signature() == self._cached_signature
+
+    def _cache(self, trace, signature):
+        self._cached_trace = trace
+        self._cached_signature = signature
+        self._generation += 1
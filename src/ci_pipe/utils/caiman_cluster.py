@@ -0,0 +1,47 @@
+import atexit
+import threading
+
+
+class CaimanCluster:
+    """
+    Local CaImAn cluster shared by the CaImAn steps of one or more pipelines.
+
+    The cluster is started on the first step that needs it and reused by the following ones, so the
+    worker processes are spawned once instead of on every call. It is stopped on shutdown() (or when the
+    interpreter exits), and started again if a step needs it afterwards.
+    """
+    MULTIPROCESSING = "multiprocessing"
+    IPYPARALLEL = "ipyparallel"
+
+    def __init__(self, caiman, n_processes=None, backend=MULTIPROCESSING):
+        self._caiman = caiman
+        self._requested_processes = n_processes
+        self._backend = backend
+        self._dview = None
+        self._n_processes = None
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def dview(self):
+        with self._lock:
+            if self._dview is None:
+                _, self._dview, self._n_processes = self._caiman.cluster.setup_cluster(
+                    backend=self._backend,
+                    n_processes=self._requested_processes,
+                    single_thread=False,
+                )
+            return self._dview
+
+    def n_processes(self):
+        self.dview()
+        return self._n_processes
+
+    def is_running(self):
+        return self._dview is not None
+
+    def shutdown(self):
+        with self._lock:
+            if self._dview is None:
+                return
+            dview, self._dview, self._n_processes = self._dview, None, None
+            self._caiman.stop_server(dview=dview)
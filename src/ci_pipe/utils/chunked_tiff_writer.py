@@ -0,0 +1,56 @@
+class ChunkedTiffWriter:
+    """
+    Writes a movie (frames x height x width, such as a view over a memory-mapped file) to a BigTIFF a
+    fixed number of frames at a time, so memory is bounded by the chunk instead of the movie length.
+    numpy and tifffile are imported on first use, they come with CaImAn.
+    """
+    DEFAULT_CHUNK_FRAMES = 500
+
+    def __init__(self, chunk_frames=DEFAULT_CHUNK_FRAMES, compression=None, tifffile=None):
+        self._chunk_frames = chunk_frames
+        self._compression = compression
+        self._tifffile = tifffile
+
+    def write(self, movie, output_path, on_chunk_written=None):
+        """
+        on_chunk_written(frames_written, total_frames) is called once each chunk is handed to the writer.
+        """
+        total_frames = len(movie)
+        frames_written = [0]
+
+        def report(count):
+            frames_written[0] = count
+            if on_chunk_written is not None:
+                on_chunk_written(count, total_frames)
+
+        self._tifffile_module().imwrite(
+            output_path,
+            data=self._frames(movie, report),
+            shape=(total_frames, *movie.shape[1:]),
+            dtype=movie.dtype,
+            bigtiff=True,
+            photometric='minisblack',
+            compression=self._compression,
+        )
+        # The writer stops asking for frames after the last one, before the last chunk is reported
+        if frames_written[0] < total_frames:
+            report(total_frames)
+        return output_path
+
+    # Private methods
+
+    def _frames(self, movie, report):
+        import numpy
+        total_frames = len(movie)
+        for start in range(0, total_frames, self._chunk_frames):
+            end = min(start + self._chunk_frames, total_frames)
+            if start > 0:
+                report(start)
+            # Only this copy is held in memory, slicing a memory-mapped movie does not read it
+            yield from numpy.array(movie[start:end])
+
+    def _tifffile_module(self):
+        if self._tifffile is None:
+            import tifffile
+            self._tifffile = tifffile
+        return self._tifffile
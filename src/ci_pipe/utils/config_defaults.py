@@ -1,6 +1,3 @@
-import yaml
-
-
 class ConfigDefaults:
     """
     Responsible for loading default configuration values from a file.
@@ -25,6 +22,9 @@ class ConfigDefaults:
         if not file_system.exists(path):
             raise FileNotFoundError(f"Config file not found: {path}")
 
+        # Imported here so pipelines without a config file do not load yaml
+        import yaml
+
         try:
             content = file_system.read(path)
             data = yaml.safe_load(content) or {}
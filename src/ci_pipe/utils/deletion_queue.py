@@ -0,0 +1,104 @@
+import queue
+import threading
+
+from ci_pipe.errors.invalid_clean_up_mode_error import InvalidCleanUpModeError
+
+
+class DeletionQueue:
+    """
+    Removes the files discarded by the pipeline clean-up.
+
+    - immediate: files are removed as soon as they are enqueued, and removal errors are raised.
+    - deferred: files are removed on flush() (pipelines also flush when the interpreter exits).
+    - background: a worker thread removes files in batches while the pipeline keeps running.
+
+    The queue is bounded: when it is full, deferred queues flush and background queues block until the
+    worker catches up. Removal failures of deferred and background queues are kept per branch until
+    they are drained. on_removed callbacks run once their file is removed, in the worker thread for
+    background queues.
+    """
+    IMMEDIATE = "immediate"
+    DEFERRED = "deferred"
+    BACKGROUND = "background"
+    MODES = (IMMEDIATE, DEFERRED, BACKGROUND)
+
+    def __init__(self, file_system, mode=IMMEDIATE, max_pending=1000, batch_size=32):
+        if mode not in self.MODES:
+            raise InvalidCleanUpModeError(mode, self.MODES)
+        self._file_system = file_system
+        self._mode = mode
+        self._batch_size = batch_size
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._failures = []
+        self._failures_lock = threading.Lock()
+        self._worker = None
+
+    def enqueue(self, path, branch_name, on_removed=None):
+        if self._mode == self.IMMEDIATE:
+            self._remove(path, on_removed)
+            return
+        if self._mode == self.BACKGROUND:
+            self._start_worker_if_needed()
+            self._pending.put((path, branch_name, on_removed))
+            return
+        try:
+            self._pending.put_nowait((path, branch_name, on_removed))
+        except queue.Full:
+            self.flush()
+            self._pending.put_nowait((path, branch_name, on_removed))
+
+    def flush(self):
+        if self._mode == self.BACKGROUND:
+            self._pending.join()
+            return
+        while not self._pending.empty():
+            self._remove_batch(self._next_batch(block=False))
+
+    def drain_failures(self, branch_name):
+        with self._failures_lock:
+            branch_failures = [failure for failure in self._failures if failure["branch"] == branch_name]
+            self._failures = [failure for failure in self._failures if failure["branch"] != branch_name]
+        return [{"path": failure["path"], "error": failure["error"]} for failure in branch_failures]
+
+    def pending(self):
+        return self._pending.qsize()
+
+    def mode(self):
+        return self._mode
+
+    # Private methods
+
+    def _start_worker_if_needed(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, name="ci-pipe-clean-up", daemon=True)
+            self._worker.start()
+
+    def _work(self):
+        while True:
+            self._remove_batch(self._next_batch(block=True))
+
+    def _next_batch(self, block):
+        batch = [self._pending.get(block=block)]
+        while len(batch) < self._batch_size:
+            try:
+                batch.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _remove_batch(self, batch):
+        for path, branch_name, on_removed in batch:
+            try:
+                self._remove(path, on_removed)
+            except Exception as e:
+                with self._failures_lock:
+                    self._failures.append({"branch": branch_name, "path": path, "error": str(e)})
+            finally:
+                self._pending.task_done()
+
+    def _remove(self, path, on_removed):
+        if not self._file_system.exists(path):
+            return
+        self._file_system.remove(path)
+        if on_removed is not None:
+            on_removed()
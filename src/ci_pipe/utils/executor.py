@@ -0,0 +1,90 @@
+import time
+from functools import partial
+
+from ci_pipe.errors.invalid_executor_error import InvalidExecutorError
+
+
+class Executor:
+    """
+    Runs independent tasks (zero-argument callables) serially, in a thread pool or in a process pool.
+    Results are always returned in the same order as the tasks were given.
+
+    When using processes, tasks must be picklable (e.g. functools.partial over module level functions).
+    """
+    SERIAL = "serial"
+    THREADS = "threads"
+    PROCESSES = "processes"
+    TYPE_DEFAULT_KEY = "executor"
+    MAX_WORKERS_DEFAULT_KEY = "max_workers"
+
+    # Pool class names in concurrent.futures, imported on first parallel run (it pulls in multiprocessing)
+    _POOLS = {
+        THREADS: "ThreadPoolExecutor",
+        PROCESSES: "ProcessPoolExecutor",
+    }
+
+    @classmethod
+    def from_defaults(cls, defaults):
+        return cls(
+            defaults.get(cls.TYPE_DEFAULT_KEY) or cls.SERIAL,
+            defaults.get(cls.MAX_WORKERS_DEFAULT_KEY),
+        )
+
+    def __init__(self, executor_type=SERIAL, max_workers=None):
+        valid_types = [self.SERIAL, *self._POOLS.keys()]
+        if executor_type not in valid_types:
+            raise InvalidExecutorError(executor_type, valid_types)
+        self._executor_type = executor_type
+        self._max_workers = max_workers
+
+    def run(self, tasks, on_task_done=None):
+        """
+        on_task_done(index, result) is called from the calling thread as each task finishes. When a task
+        fails, the remaining tasks of a pool still finish and are reported before the error is raised.
+        """
+        tasks = list(tasks)
+        if self.is_serial() or len(tasks) <= 1:
+            results = []
+            for index, task in enumerate(tasks):
+                results.append(task())
+                if on_task_done is not None:
+                    on_task_done(index, results[index])
+            return results
+
+        import concurrent.futures
+        pool_class = getattr(concurrent.futures, self._POOLS[self._executor_type])
+        results = [None] * len(tasks)
+        error = None
+        with pool_class(max_workers=self._max_workers) as pool:
+            futures = {pool.submit(task): index for index, task in enumerate(tasks)}
+            for future in concurrent.futures.as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as task_error:
+                    error = error or task_error
+                    continue
+                if on_task_done is not None:
+                    on_task_done(index, results[index])
+        if error is not None:
+            raise error
+        return results
+
+    def run_timed(self, tasks, on_task_done=None):
+        return self.run([partial(_timed_call, task) for task in tasks], on_task_done)
+
+    def is_serial(self):
+        return self._executor_type == self.SERIAL or self._max_workers == 1
+
+    def executor_type(self):
+        return self._executor_type
+
+    def max_workers(self):
+        return self._max_workers
+
+
+def _timed_call(task):
+    # Module level so timed tasks stay picklable for process pools
+    started = time.perf_counter()
+    result = task()
+    return result, time.perf_counter() - started
@@ -0,0 +1,46 @@
+from ci_pipe.errors.invalid_hook_event_error import InvalidHookEventError
+
+
+class HookRegistry:
+    """
+    Callables invoked by the pipeline around steps, inputs and clean-up. Hooks receive keyword
+    arguments only:
+
+    - pre_step / post_step: pipeline, step_name, step_function, params. post_step also runs when the
+      step fails, and gets step (None if it failed) and error (None if it did not).
+    - per_input_start / per_input_end: pipeline, step_name, ids.
+    - on_progress: pipeline, step_name, ids, done, total (reported by long operations on one input).
+    - on_clean_up: pipeline, key, path, once the file is removed (in the clean-up worker thread for
+      background clean-up).
+
+    A registry is shared between a pipeline and its branches.
+    """
+    PRE_STEP = "pre_step"
+    POST_STEP = "post_step"
+    PER_INPUT_START = "per_input_start"
+    PER_INPUT_END = "per_input_end"
+    ON_PROGRESS = "on_progress"
+    ON_CLEAN_UP = "on_clean_up"
+    EVENTS = (PRE_STEP, POST_STEP, PER_INPUT_START, PER_INPUT_END, ON_PROGRESS, ON_CLEAN_UP)
+
+    def __init__(self):
+        self._hooks = {event: [] for event in self.EVENTS}
+
+    def register(self, event, hook):
+        self._assert_valid_event(event)
+        self._hooks[event].append(hook)
+        return hook
+
+    def unregister(self, event, hook):
+        self._assert_valid_event(event)
+        self._hooks[event].remove(hook)
+
+    def run(self, event, **context):
+        for hook in list(self._hooks[event]):
+            hook(**context)
+
+    # Private methods
+
+    def _assert_valid_event(self, event):
+        if event not in self.EVENTS:
+            raise InvalidHookEventError(event, self.EVENTS)
@@ -0,0 +1,55 @@
+import json
+
+
+class OutputReferences:
+    """
+    Index of which branches reference each (key, value) output pair as their latest output of the key.
+    It is shared between a pipeline and its branches and updated as steps are added, so clean-up can
+    check if another branch still uses a value with a single lookup. A branch releases a value once one
+    of its steps supersedes it, and pairs no branch references are dropped, so a value another branch
+    kept alive is removed by the last branch that supersedes it.
+    """
+
+    @classmethod
+    def from_trace(cls, trace):
+        references = cls()
+        for branch in trace.branches():
+            references.add_steps(branch.name(), branch.steps())
+        return references
+
+    def __init__(self):
+        self._branches_by_output = {}
+
+    def add_steps(self, branch_name, steps):
+        # Outputs of a key written again by a later step are already superseded
+        latest_entries_by_key = {}
+        for step in steps:
+            latest_entries_by_key.update(step.step_output())
+        for key, entries in latest_entries_by_key.items():
+            for entry in entries:
+                self._branches_by_output.setdefault(self._output_id(key, entry['value']), set()).add(branch_name)
+
+    def release(self, branch_name, key, values):
+        for value in values:
+            output_id = self._output_id(key, value)
+            branches = self._branches_by_output.get(output_id)
+            if branches is None:
+                continue
+            branches.discard(branch_name)
+            if not branches:
+                del self._branches_by_output[output_id]
+
+    def is_used_outside(self, branch_name, key, value):
+        branches = self._branches_by_output.get(self._output_id(key, value), ())
+        return any(name != branch_name for name in branches)
+
+    @staticmethod
+    def hashable_value(value):
+        try:
+            hash(value)
+        except TypeError:
+            return json.dumps(value, sort_keys=True, default=str)
+        return value
+
+    def _output_id(self, key, value):
+        return key, self.hashable_value(value)
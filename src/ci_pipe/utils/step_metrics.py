@@ -0,0 +1,63 @@
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class StepMetrics:
+    """
+    Measures a single step execution: wall and CPU time, peak RSS increase, bytes of the input and
+    output files, and the time spent on each input.
+
+    peak_rss_increase is how much the peak RSS of the process grew during the step. A step that stays
+    below an earlier peak reports 0, so it is only a lower bound of the memory the step needed. Steps
+    restored from the step cache are marked as cached, their times are the ones of the restore.
+    """
+
+    def __init__(self, file_system):
+        self._file_system = file_system
+        self._inputs = []
+        self._wall_start = None
+        self._cpu_start = None
+        self._peak_rss_start = None
+
+    def start(self):
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._peak_rss_start = self._peak_rss()
+
+    def record_input(self, ids, wall_time):
+        self._inputs.append({"ids": ids, "wall_time": wall_time})
+
+    def stop(self, input_entries, outputs, cached=False):
+        peak_rss = self._peak_rss()
+        return {
+            "wall_time": time.perf_counter() - self._wall_start,
+            "cpu_time": time.process_time() - self._cpu_start,
+            "peak_rss_increase": None if peak_rss is None else peak_rss - self._peak_rss_start,
+            "bytes_read": self._bytes_of(input_entries),
+            "bytes_written": self._bytes_of(entry for entries in outputs.values() for entry in entries),
+            "inputs": self._inputs,
+            "cached": cached,
+        }
+
+    # Private methods
+
+    def _bytes_of(self, entries):
+        total = 0
+        for entry in entries:
+            value = entry.get('value')
+            if isinstance(value, str):
+                total += self._file_system.size(value) or 0
+        return total
+
+    @staticmethod
+    def _peak_rss():
+        if resource is None:
+            return None
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+        return peak_rss if sys.platform == "darwin" else peak_rss * 1024
@@ -1,3 +1,7 @@
+import re
+
+from external_dependencies.caiman.mocked_cluster_submodule import MockedClusterSubModule
+from external_dependencies.caiman.mocked_memmap import MockedMemmap
 from external_dependencies.caiman.mocked_motion_correction_submodule import MockedMotionCorrectionSubModule
 from external_dependencies.caiman.mocked_movie import MockedMovie
 from external_dependencies.caiman.mocked_source_extraction import MockedSourceExtractionModule
@@ -8,6 +12,23 @@ class InMemoryCaiman:
         self._file_system = file_system
         self.motion_correction = MockedMotionCorrectionSubModule(file_system)
         self.source_extraction = MockedSourceExtractionModule(file_system)
+        self.cluster = MockedClusterSubModule()
 
     def load(self, fname):
-        return MockedMovie(fname, self._file_system)
\ No newline at end of file
+        return MockedMovie(fname, self._file_system)
+
+    def save_memmap(self, filenames, base_name='Yr', order='F', border_to_0=0, dview=None, **kwargs):
+        fname_new = f"{base_name}_d1_1_d2_1_d3_1_order_{order}_frames_1.mmap"
+        self._file_system.write(fname_new, "")
+        return fname_new
+
+    def load_memmap(self, filename, mode='r'):
+        # Dimensions, order and frames come from the name, as CaImAn writes them
+        match = re.search(r'_d1_(\d+)_d2_(\d+)_d3_\d+_order_([CF])_frames_(\d+)', filename)
+        dims, order, num_frames = ((1, 1), 'C', 1) if match is None else (
+            (int(match.group(1)), int(match.group(2))), match.group(3), int(match.group(4)))
+        return MockedMemmap(filename, dims, num_frames, order=order), dims, num_frames
+
+    def stop_server(self, dview=None):
+        if dview is not None:
+            dview.terminate()
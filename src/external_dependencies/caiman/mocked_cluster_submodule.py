@@ -0,0 +1,24 @@
+import os
+
+
+class MockedDView:
+    def __init__(self, n_processes):
+        self.n_processes = n_processes
+        self.terminated = False
+
+    def map(self, function, iterable):
+        return list(map(function, iterable))
+
+    def terminate(self):
+        self.terminated = True
+
+
+class MockedClusterSubModule:
+    def __init__(self):
+        self.started_clusters = []
+
+    def setup_cluster(self, backend='multiprocessing', n_processes=None, single_thread=False):
+        n_processes = n_processes or os.cpu_count() or 1
+        dview = MockedDView(n_processes)
+        self.started_clusters.append(dview)
+        return None, dview, n_processes
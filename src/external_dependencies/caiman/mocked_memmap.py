@@ -0,0 +1,22 @@
+import numpy
+
+
+class MockedMemmap(numpy.ndarray):
+    # In-memory stand-in for the pixels x frames numpy.memmap CaImAn loads, views keep the file name
+    def __new__(cls, fname, dims, num_frames, order='C'):
+        num_pixels = int(numpy.prod(dims))
+        pixels = numpy.arange(num_pixels * num_frames, dtype=numpy.float32).reshape(num_pixels, num_frames)
+        memmap = numpy.array(pixels, order=order).view(cls)
+        memmap._fname = fname
+        memmap.dims = dims
+        memmap.num_frames = num_frames
+        return memmap
+
+    def __array_finalize__(self, obj):
+        self._fname = getattr(obj, '_fname', None)
+        self.dims = getattr(obj, 'dims', None)
+        self.num_frames = getattr(obj, 'num_frames', None)
+
+    @property
+    def filename(self):
+        return self._fname
@@ -2,6 +2,7 @@ class MockedMotionCorrect:
     def __init__(
             self,
             fname,
+            dview=None,
             strides=(48, 48),
             overlaps=(24, 24),
             max_shifts=(6, 6),
@@ -12,6 +13,7 @@ class MockedMotionCorrect:
             file_system=None):
         self._file_system = file_system
         self._fname = fname
+        self._dview = dview
         self._strides = strides
         self._overlaps = overlaps
         self._max_shifts = max_shifts
@@ -19,10 +21,12 @@ class MockedMotionCorrect:
         self._pw_rigid = pw_rigid
         self._shifts_opencv = shifts_opencv
         self._border_nan = border_nan
+        self._mmap_file = None
 
     def motion_correct(self, save_movie=True, **motion_kwargs):
-        output = self._fname
-        self._file_system.write(output, "")
+        # As CaImAn, the corrected movie is written as an F-order memory-mapped file next to the input
+        self._mmap_file = self._file_system.split_text(self._fname)[0] + ".mmap"
+        self._file_system.write(self._mmap_file, "")
 
     @property
     def motion_correction(self):
@@ -30,4 +34,8 @@ class MockedMotionCorrect:
 
     @property
     def mmap_file(self):
-        return [self._fname]
+        return [self._mmap_file]
+
+    @property
+    def dview(self):
+        return self._dview
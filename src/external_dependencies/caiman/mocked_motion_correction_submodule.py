@@ -8,6 +8,7 @@ class MockedMotionCorrectionSubModule:
     def MotionCorrect(
             self,
             fname,
+            dview=None,
             strides=(48, 48),
             overlaps=(24, 24),
             max_shifts=(6, 6),
@@ -19,6 +20,7 @@ class MockedMotionCorrectionSubModule:
         return MockedMotionCorrect(
             file_system=self._file_system,
             fname=fname,
+            dview=dview,
             strides=strides,
             overlaps=overlaps,
             max_shifts=max_shifts,
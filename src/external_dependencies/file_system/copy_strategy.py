@@ -0,0 +1,12 @@
+class CopyStrategy:
+    """
+    How a file system copies a file into a step output directory:
+
+    - reflink: the copy shares blocks with the source until either is written (copy-on-write).
+    - hardlink: the copy is a hardlink, so it is not used for copies the step modifies (they fall back to copy).
+    - copy: a full copy of the content. It is also the fallback when a strategy is not supported.
+    """
+    REFLINK = "reflink"
+    HARDLINK = "hardlink"
+    COPY = "copy"
+    STRATEGIES = (REFLINK, HARDLINK, COPY)
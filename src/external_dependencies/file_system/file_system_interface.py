@@ -1,15 +1,32 @@
 from typing import List
 
+from .copy_strategy import CopyStrategy
+
 class FileSystemInterface:
     def write(self, path: str, content: str):
         raise NotImplementedError
 
+    def append(self, path: str, content: str):
+        raise NotImplementedError
+
     def read(self, path: str) -> str:
         raise NotImplementedError
     
     def exists(self, path: str) -> bool:
         raise NotImplementedError
 
+    def signature(self, path: str):
+        """Cheap value that changes whenever the file changes, or None if it does not exist."""
+        raise NotImplementedError
+
+    def size(self, path: str):
+        """Size in bytes of a file, or None if there is no file at path."""
+        raise NotImplementedError
+
+    def allocate(self, path: str, size: int):
+        """Creates a file of size bytes without writing its content (sparse where supported)."""
+        raise NotImplementedError
+
     def makedirs(self, path: str, exist_ok: bool = False):
         raise NotImplementedError
 
@@ -25,6 +42,16 @@ class FileSystemInterface:
     def copy2(self, src: str, dst: str):
         raise NotImplementedError
 
+    def link(self, src: str, dst: str):
+        raise NotImplementedError
+
+    def copy_file(self, src: str, dst_directory: str, strategy: str = CopyStrategy.COPY):
+        """Copies src into dst_directory, returning the new path and the strategy actually applied."""
+        raise NotImplementedError
+
+    def content_hash(self, path: str) -> str:
+        raise NotImplementedError
+
     def join(self, directory, filename):
         raise NotImplementedError
 
@@ -1,16 +1,27 @@
+import hashlib
 from io import StringIO
 from typing import List
 
+from .copy_strategy import CopyStrategy
 from .file_system_interface import FileSystemInterface
 
 class InMemoryFileSystem(FileSystemInterface):
     def __init__(self):
         self.files = {}
         self.directories = set()
+        self._generations = {}
+        self._generation = 0
 
     def write(self, path: str, content: str):
         from io import StringIO
         self.files[path] = StringIO(content)
+        self._touch(path)
+
+    def append(self, path: str, content: str):
+        file_obj = self.files.setdefault(path, StringIO())
+        file_obj.seek(0, 2)
+        file_obj.write(content)
+        self._touch(path)
 
     def read(self, path: str) -> str:
         file_obj = self.files.get(path, None)
@@ -22,6 +33,20 @@ class InMemoryFileSystem(FileSystemInterface):
     def exists(self, path: str) -> bool:
         return path in self.files or path in self.directories
 
+    def signature(self, path: str):
+        if path not in self.files:
+            return None
+        return self._generations.get(path)
+
+    def size(self, path: str):
+        if path not in self.files:
+            return None
+        return len(self.files[path].getvalue().encode())
+
+    def allocate(self, path: str, size: int):
+        self.files[path] = StringIO("\0" * size)
+        self._touch(path)
+
     def makedirs(self, path: str, exist_ok: bool = False):
         self.directories.add(path)
 
@@ -46,6 +71,7 @@ class InMemoryFileSystem(FileSystemInterface):
         if 'w' in mode:
             file_content = ""
             self.files[path] = StringIO(file_content)
+            self._touch(path)
         elif 'r' in mode:
             content = self.files.get(path, None)
             if content is None:
@@ -58,10 +84,34 @@ class InMemoryFileSystem(FileSystemInterface):
             src_filename = self.base_path(src)
             dst_path = self.join(dst, src_filename)
             self.files[dst_path] = StringIO(self.files[src].getvalue())
+            self._touch(dst_path)
             return dst_path
         else:
             raise FileNotFoundError(f"No such file: {src}")
 
+    def link(self, src: str, dst: str):
+        if src not in self.files:
+            raise FileNotFoundError(f"No such file: {src}")
+        self.files[dst] = StringIO(self.files[src].getvalue())
+        self._touch(dst)
+        return dst
+
+    def copy_file(self, src: str, dst_directory: str, strategy: str = CopyStrategy.COPY):
+        if src not in self.files:
+            raise FileNotFoundError(f"No such file: {src}")
+        # Buffers can be shared like hardlinks, but there is no block level copy-on-write to reflink with
+        if strategy == CopyStrategy.HARDLINK:
+            dst = self.join(dst_directory, self.base_path(src))
+            self.files[dst] = self.files[src]
+            self._touch(dst)
+            return dst, CopyStrategy.HARDLINK
+        return self.copy2(src, dst_directory), CopyStrategy.COPY
+
+    def content_hash(self, path: str) -> str:
+        if path not in self.files:
+            raise FileNotFoundError(f"No such file: {path}")
+        return hashlib.sha256(self.files[path].getvalue().encode()).hexdigest()
+
     def join(self, directory, filename):
         return f"{directory}/{filename}"
 
@@ -77,5 +127,10 @@ class InMemoryFileSystem(FileSystemInterface):
     def remove(self, path):
         if path in self.files:
             del self.files[path]
+            self._generations.pop(path, None)
         else:
-            raise FileNotFoundError(f"No such file: {path}")
\ No newline at end of file
+            raise FileNotFoundError(f"No such file: {path}")
+
+    def _touch(self, path):
+        self._generation += 1
+        self._generations[path] = self._generation
\ No newline at end of file
@@ -1,14 +1,24 @@
+import hashlib
 import os
 import shutil
 from typing import List
 
+from .copy_strategy import CopyStrategy
 from .file_system_interface import FileSystemInterface
 
 class PersistentFileSystem(FileSystemInterface):
+    HASH_CHUNK_SIZE = 1024 * 1024
+    # Linux ioctl that clones a file (copy-on-write) on btrfs, xfs and other reflink capable file systems
+    FICLONE = 0x40049409
+
     def write(self, path: str, content: str):
         with open(path, 'w', encoding='utf-8') as f:
             f.write(content)
 
+    def append(self, path: str, content: str):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(content)
+
     def read(self, path: str) -> str:
         with open(path, 'r', encoding='utf-8') as f:
             return f.read()
@@ -16,6 +26,22 @@ class PersistentFileSystem(FileSystemInterface):
     def exists(self, path: str) -> bool:
         return os.path.exists(path)
 
+    def signature(self, path: str):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def size(self, path: str):
+        if not os.path.isfile(path):
+            return None
+        return os.path.getsize(path)
+
+    def allocate(self, path: str, size: int):
+        with open(path, 'wb') as f:
+            f.truncate(size)
+
     def makedirs(self, path: str, exist_ok: bool = False):
         os.makedirs(path, exist_ok=exist_ok)
 
@@ -31,6 +57,30 @@ class PersistentFileSystem(FileSystemInterface):
     def copy2(self, src: str, dst: str):
         return shutil.copy2(src, dst)
 
+    def link(self, src: str, dst: str):
+        try:
+            os.link(src, dst)
+        except OSError:
+            # Hardlinks are not available across devices or on some network file systems
+            shutil.copy2(src, dst)
+        return dst
+
+    def copy_file(self, src: str, dst_directory: str, strategy: str = CopyStrategy.COPY):
+        dst = os.path.join(dst_directory, os.path.basename(src))
+        if strategy == CopyStrategy.REFLINK and self._reflink(src, dst):
+            return dst, CopyStrategy.REFLINK
+        if strategy == CopyStrategy.HARDLINK and self._hardlink(src, dst):
+            return dst, CopyStrategy.HARDLINK
+        shutil.copy2(src, dst)
+        return dst, CopyStrategy.COPY
+
+    def content_hash(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
     def join(self, directory: str, filename: str):
         return os.path.join(directory, filename)
 
@@ -41,4 +91,28 @@ class PersistentFileSystem(FileSystemInterface):
         return os.path.splitext(path)
     
     def remove(self, path):
-        return os.remove(path)
\ No newline at end of file
+        return os.remove(path)
+
+    def _reflink(self, src, dst):
+        try:
+            import fcntl
+        except ImportError:  # Not available on Windows
+            return False
+        try:
+            with open(src, 'rb') as source, open(dst, 'wb') as destination:
+                fcntl.ioctl(destination.fileno(), self.FICLONE, source.fileno())
+        except OSError:
+            if os.path.exists(dst):
+                os.remove(dst)
+            return False
+        shutil.copystat(src, dst)
+        return True
+
+    def _hardlink(self, src, dst):
+        if os.path.exists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            return False
+        return True
\ No newline at end of file
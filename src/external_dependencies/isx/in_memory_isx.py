@@ -1,3 +1,6 @@
+from types import SimpleNamespace
+
+
 class InMemoryISX:
     def __init__(self, file_system=None):
         self._file_system = file_system
@@ -139,6 +142,19 @@ class InMemoryISX:
                     @property
                     def num_cells(self):
                         return 1
+
+                    @property
+                    def timing(self):
+                        return SimpleNamespace(period=SimpleNamespace(secs_float=0.05))
+
+                    def get_cell_image_data(self, index):
+                        return [[0.0, 1.0], [2.0, 3.0]]
+
+                    def get_cell_trace_data(self, index):
+                        return [0.0, 1.0, 0.0]
+
+                    def get_cell_status(self, index):
+                        return "accepted"
                 return Dummy()
         return CellSet
 
@@ -200,6 +216,14 @@ class InMemoryISX:
                     raise IOError(f"Cannot read movie: {path}")
                 return Movie(path)
 
+            @property
+            def timing(self):
+                return SimpleNamespace(num_samples=3, period=SimpleNamespace(secs_float=0.05))
+
+            @property
+            def spacing(self):
+                return SimpleNamespace(num_pixels=(2, 2))
+
             def get_frame_data(self, index):
                 return [
                     [0.0, 1.0],
@@ -0,0 +1,31 @@
+"""
+ISX backend double shaped like the isx package: plain module functions writing empty files on disk, so
+tasks built from them can be sent to worker processes as the real backend is.
+"""
+import os
+
+
+def make_output_file_path(in_file, out_dir, suffix, ext="isxd"):
+    stem, _ = os.path.splitext(os.path.basename(in_file))
+    if suffix:
+        stem = f"{stem}-{suffix}"
+    return os.path.join(out_dir, f"{stem}.{ext}")
+
+
+def preprocess(input_movie_files, output_movie_files, **kwargs):
+    _touch(*output_movie_files)
+
+
+def project_movie(input_movie_files, output_image_file, stat_type='mean'):
+    _touch(output_image_file)
+
+
+def motion_correct(input_movie_files, output_movie_files, output_translation_files=None,
+                   output_crop_rect_file=None, **kwargs):
+    _touch(*output_movie_files, *(output_translation_files or []), output_crop_rect_file)
+
+
+def _touch(*paths):
+    for path in paths:
+        with open(path, "w"):
+            pass
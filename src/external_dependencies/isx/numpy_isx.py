@@ -0,0 +1,721 @@
+import csv
+import os
+from functools import lru_cache
+
+import numpy
+from numpy.lib.format import MAGIC_PREFIX, open_memmap
+
+
+class NumpyISX:
+    """
+    Open implementation of ISX operations on NumPy arrays, for nodes without the Inscopix SDK.
+
+    Movies are NumPy arrays of frames x height x width saved in .npy format (whatever their extension),
+    read and written through memory maps a fixed number of frames at a time, so memory is bounded by
+    chunk_frames instead of the movie length. Operations that are not implemented here are delegated to
+    the fallback backend when one is given (e.g. the isx module itself).
+
+    Inputs that are not NumPy files, such as the outputs of an operation of the fallback, are read through
+    the Movie and CellSet of the fallback. Outputs are always NumPy files, so operations of the fallback
+    can not read the outputs of the ones implemented here.
+
+    .npy movies do not store their timing, so they are taken to be recorded at frame_rate. Movies of the
+    fallback keep their own timing, and cell sets store the sampling period of the movies they come from.
+    """
+    DEFAULT_CHUNK_FRAMES = 500
+    F0_TYPES = ('mean', 'min', 'percentile')
+    STAT_TYPES = ('mean', 'min', 'max', 'standard_deviation')
+    EVENT_TIME_REFS = ('maximum', 'beginning', 'mid_rise')
+    UNMIX_TYPES = ('spatial', 'temporal', 'both')
+
+    def __init__(self, fallback=None, chunk_frames=DEFAULT_CHUNK_FRAMES, f0_percentile=10, frame_rate=20.0, seed=0):
+        self._fallback = fallback
+        self._chunk_frames = chunk_frames
+        self._f0_percentile = f0_percentile
+        self._frame_rate = frame_rate
+        self._seed = seed
+
+    def __getattr__(self, name):
+        fallback = self.__dict__.get('_fallback')
+        if fallback is None:
+            raise AttributeError(f"'{type(self).__name__}' does not implement '{name}' and has no fallback backend")
+        return getattr(fallback, name)
+
+    def dff(
+            self,
+            input_movie_files,
+            output_movie_files,
+            f0_type='mean'
+    ):
+        if f0_type not in self.F0_TYPES:
+            raise ValueError(f"f0_type must be one of {', '.join(self.F0_TYPES)}, got '{f0_type}'")
+        movies = [self._read_movie(path) for path in input_movie_files]
+
+        # First pass: F0 of every pixel over the frames of all the movies, as in a single series
+        f0 = self._f0(movies, f0_type)
+
+        # Second pass: (F - F0) / F0, with pixels whose F0 is zero left at zero
+        for movie, output_file in zip(movies, output_movie_files):
+            output_movie = self._create_movie(output_file, movie.shape)
+            for start, chunk in self._chunks(movie):
+                output_movie[start:start + len(chunk)] = numpy.divide(
+                    chunk - f0, f0, out=numpy.zeros(chunk.shape, dtype=numpy.float64), where=f0 != 0)
+            output_movie.flush()
+            del output_movie
+
+    def spatial_filter(
+            self,
+            input_movie_files,
+            output_movie_files,
+            low_cutoff=0.005,
+            high_cutoff=0.5,
+            retain_mean=False,
+            subtract_global_minimum=True
+    ):
+        movies = [self._read_movie(path) for path in input_movie_files]
+        output_movies = [self._create_movie(path, movie.shape) for movie, path in zip(movies, output_movie_files)]
+
+        # Frequencies in cycles per pixel outside [low_cutoff, high_cutoff] are removed from batches of frames
+        global_minimum = numpy.inf
+        for movie, output_movie in zip(movies, output_movies):
+            mask = _bandpass_mask(movie.shape[1:], low_cutoff, high_cutoff, retain_mean)
+            for start, chunk in self._chunks(movie):
+                filtered = numpy.fft.irfft2(numpy.fft.rfft2(chunk) * mask, s=movie.shape[1:])
+                output_movie[start:start + len(chunk)] = filtered
+                global_minimum = min(global_minimum, filtered.min(initial=numpy.inf))
+
+        # The minimum of the whole series is only known once every frame is filtered
+        if subtract_global_minimum and numpy.isfinite(global_minimum):
+            for output_movie in output_movies:
+                for start, chunk in self._chunks(output_movie):
+                    output_movie[start:start + len(chunk)] = chunk - global_minimum
+
+        for output_movie in output_movies:
+            output_movie.flush()
+
+    def project_movie(
+            self,
+            input_movie_files,
+            output_image_file,
+            stat_type='mean'
+    ):
+        if stat_type not in self.STAT_TYPES:
+            raise ValueError(f"stat_type must be one of {', '.join(self.STAT_TYPES)}, got '{stat_type}'")
+        total, total_of_squares, minimum, maximum, frames_count = 0.0, 0.0, numpy.inf, -numpy.inf, 0
+        for movie in (self._read_movie(path) for path in input_movie_files):
+            for _, chunk in self._chunks(movie):
+                total = total + chunk.sum(axis=0)
+                total_of_squares = total_of_squares + numpy.square(chunk).sum(axis=0)
+                minimum = numpy.minimum(minimum, chunk.min(axis=0))
+                maximum = numpy.maximum(maximum, chunk.max(axis=0))
+                frames_count += len(chunk)
+
+        mean = total / frames_count
+        image = {
+            'mean': lambda: mean,
+            'min': lambda: minimum,
+            'max': lambda: maximum,
+            'standard_deviation': lambda: numpy.sqrt(numpy.maximum(total_of_squares / frames_count - mean ** 2, 0)),
+        }[stat_type]()
+        output_image = self._create_movie(output_image_file, image.shape)
+        output_image[:] = image
+        output_image.flush()
+
+    def motion_correct(
+            self,
+            input_movie_files,
+            output_movie_files,
+            max_translation=20,
+            low_bandpass_cutoff=0.004,
+            high_bandpass_cutoff=0.016,
+            roi=None,
+            reference_segment_index=0,
+            reference_frame_index=0,
+            reference_file_name='',
+            global_registration_weight=1,
+            output_translation_files=None,
+            output_crop_rect_file=None,
+            preserve_input_dimensions=False
+    ):
+        """
+        Rigid, whole-pixel correction by phase correlation of the bandpassed frames against the reference
+        (reference_file_name, or the given frame of the given movie). roi points only restrict the region
+        used to estimate the translations to their bounding box; global_registration_weight is not used.
+        """
+        movies = [self._read_movie(path) for path in input_movie_files]
+        if reference_file_name:
+            reference = numpy.load(reference_file_name).astype(numpy.float64)
+        else:
+            reference = numpy.asarray(movies[reference_segment_index][reference_frame_index], dtype=numpy.float64)
+        frame_shape = reference.shape
+        top, bottom, left, right = _roi_bounding_box(roi, frame_shape)
+
+        # First pass: translations of every frame, small enough to keep while the crop is not known
+        estimator = _PhaseCorrelation(
+            reference[top:bottom, left:right], low_bandpass_cutoff, high_bandpass_cutoff, max_translation)
+        translations = [
+            numpy.concatenate([estimator.translations(chunk[:, top:bottom, left:right])
+                               for _, chunk in self._chunks(movie)] or [numpy.zeros((0, 2), dtype=int)])
+            for movie in movies
+        ]
+
+        # The crop keeps the pixels that every translated frame covers
+        if preserve_input_dimensions:
+            crop = (0, frame_shape[0], 0, frame_shape[1])
+        else:
+            all_translations = numpy.concatenate(translations)
+            crop = (
+                int(max(all_translations[:, 0].max(initial=0), 0)),
+                int(frame_shape[0] + min(all_translations[:, 0].min(initial=0), 0)),
+                int(max(all_translations[:, 1].max(initial=0), 0)),
+                int(frame_shape[1] + min(all_translations[:, 1].min(initial=0), 0)),
+            )
+
+        # Second pass: translated frames, cropped
+        crop_top, crop_bottom, crop_left, crop_right = crop
+        for movie, movie_translations, output_file in zip(movies, translations, output_movie_files):
+            output_movie = self._create_movie(output_file, (len(movie), crop_bottom - crop_top, crop_right - crop_left))
+            for start, chunk in self._chunks(movie):
+                shifted = _translated_frames(chunk, movie_translations[start:start + len(chunk)])
+                output_movie[start:start + len(chunk)] = shifted[:, crop_top:crop_bottom, crop_left:crop_right]
+            output_movie.flush()
+
+        translation_files = output_translation_files or []
+        for movie, movie_translations, translation_file in zip(movies, translations, translation_files):
+            self._write_translations(translation_file, movie_translations, self._period(movie))
+        if output_crop_rect_file:
+            with open(output_crop_rect_file, 'w', newline='') as crop_rect_file:
+                csv.writer(crop_rect_file).writerow([crop_left, crop_top, crop_right - crop_left, crop_bottom - crop_top])
+
+    def pca_ica(
+            self,
+            input_movie_files,
+            output_cell_set_files,
+            num_pcs,
+            num_ics=120,
+            unmix_type='spatial',
+            ica_temporal_weight=0,
+            max_iterations=100,
+            convergence_threshold=0.00001,
+            block_size=1000,
+            auto_estimate_num_ics=False,
+            average_cell_diameter=13
+    ):
+        """
+        The principal components come from a randomized SVD built from block_size frames at a time, so the
+        pixels x frames matrix is never held. FastICA then unmixes them into cells. The movies of a series
+        share the cell images, and each output cell set gets the traces of its own movie. With
+        auto_estimate_num_ics, num_ics is the number of cells of average_cell_diameter that fit in a frame.
+        """
+        if unmix_type not in self.UNMIX_TYPES:
+            raise ValueError(f"unmix_type must be one of {', '.join(self.UNMIX_TYPES)}, got '{unmix_type}'")
+        movies = [self._read_movie(path) for path in input_movie_files]
+        frame_shape = movies[0].shape[1:]
+        period = self._period(movies[0])
+
+        spatial, singular_values, temporal = _StreamedRandomizedSVD(
+            num_pcs, block_size, numpy.random.default_rng(self._seed)).decompose(movies)
+
+        if auto_estimate_num_ics:
+            num_ics = int(numpy.prod(frame_shape) // (numpy.pi * (average_cell_diameter / 2) ** 2))
+        num_ics = max(min(num_ics, len(singular_values)), 1)
+        temporal_weight = {'spatial': 0.0, 'temporal': 1.0, 'both': ica_temporal_weight}[unmix_type]
+        # A block with no weight would only add zero samples to the whitening and the contrast
+        signals = []
+        if temporal_weight < 1:
+            signals.append((1 - temporal_weight) * spatial.T * numpy.sqrt(spatial.shape[0]))
+        if temporal_weight > 0:
+            signals.append(temporal_weight * temporal * numpy.sqrt(temporal.shape[1]))
+        signals = numpy.hstack(signals)
+        unmixing = _fast_ica(signals, num_ics, max_iterations, convergence_threshold,
+                             numpy.random.default_rng(self._seed))
+
+        # Images are the unmixed spatial components, traces their least squares fit to the reduced movie
+        images = unmixing @ spatial.T
+        images *= numpy.sign(_skewness(images))[:, numpy.newaxis]
+        images /= numpy.abs(images).max(axis=1, keepdims=True)
+        traces = numpy.linalg.lstsq((images @ spatial).T, singular_values[:, numpy.newaxis] * temporal, rcond=None)[0]
+
+        start = 0
+        for movie, output_file in zip(movies, output_cell_set_files):
+            self.CellSet.write(output_file, images.reshape((num_ics, *frame_shape)).astype(numpy.float32),
+                               traces[:, start:start + len(movie)].astype(numpy.float32), period)
+            start += len(movie)
+
+    def event_detection(
+            self,
+            input_cell_set_files,
+            output_event_set_files,
+            threshold=5,
+            tau=0.2,
+            event_time_ref='beginning',
+            ignore_negative_transients=True,
+            accepted_cells_only=False
+    ):
+        """
+        Events are the peaks of each trace above its median plus threshold median absolute deviations,
+        that are the highest of the trace within tau seconds. All the cells of a cell set are processed at
+        once; mid_rise events are placed halfway between the beginning and the maximum.
+        """
+        if event_time_ref not in self.EVENT_TIME_REFS:
+            raise ValueError(f"event_time_ref must be one of {', '.join(self.EVENT_TIME_REFS)}, got '{event_time_ref}'")
+        for input_file, output_file in zip(input_cell_set_files, output_event_set_files):
+            cell_set = self._read_cell_set(input_file)
+            tau_frames = max(int(round(tau / cell_set.period)), 1)
+            detected_cells = numpy.arange(cell_set.num_cells)
+            if accepted_cells_only:
+                detected_cells = detected_cells[cell_set.statuses == 'accepted']
+            traces = cell_set.traces[detected_cells].astype(numpy.float64)
+
+            events = [_detected_events(traces, threshold, tau_frames, event_time_ref)]
+            if not ignore_negative_transients:
+                cells, frames, amplitudes = _detected_events(-traces, threshold, tau_frames, event_time_ref)
+                events.append((cells, frames, -amplitudes))
+            cells, frames, amplitudes = (numpy.concatenate(values) for values in zip(*events))
+            order = numpy.lexsort((frames, cells))
+            self.EventSet.write(output_file, cell_set.num_cells, detected_cells[cells[order]],
+                                frames[order] * cell_set.period, amplitudes[order])
+
+    @property
+    def CellSet(self):
+        return NumpyCellSet
+
+    @property
+    def EventSet(self):
+        return NumpyEventSet
+
+    def make_output_file_path(
+            self,
+            in_file,
+            out_dir,
+            suffix,
+            ext="isxd"
+    ):
+        stem, _ = os.path.splitext(os.path.basename(in_file))
+        if suffix:
+            stem = f"{stem}-{suffix}"
+        return os.path.join(out_dir, f"{stem}.{ext}")
+
+    def make_output_file_paths(
+            self,
+            in_files,
+            out_dir,
+            suffix,
+            ext="isxd"
+    ):
+        return [self.make_output_file_path(in_file, out_dir, suffix, ext) for in_file in in_files]
+
+    # Private methods
+
+    def _read_movie(self, path):
+        if _starts_with(path, MAGIC_PREFIX):
+            return numpy.load(path, mmap_mode='r')
+        return _FallbackMovie(self._fallback_for(path).Movie.read(path))
+
+    def _read_cell_set(self, path):
+        if _starts_with(path, _ZIP_MAGIC_PREFIX):
+            return NumpyCellSet.read(path)
+        return NumpyCellSet.from_cell_set(self._fallback_for(path).CellSet.read(path))
+
+    def _fallback_for(self, path):
+        if self._fallback is None:
+            raise ValueError(f"'{path}' is not a NumPy file and there is no fallback backend to read it")
+        return self._fallback
+
+    def _period(self, movie):
+        return movie.period if isinstance(movie, _FallbackMovie) else 1 / self._frame_rate
+
+    def _write_translations(self, path, translations, period):
+        with open(path, 'w', newline='') as translations_file:
+            writer = csv.writer(translations_file)
+            writer.writerow(['x_translation', 'y_translation', 'time'])
+            for frame_index, (y_translation, x_translation) in enumerate(translations):
+                # Times are kept to the microsecond, as isx timestamps
+                writer.writerow([x_translation, y_translation, round(frame_index * period, 6)])
+
+    def _create_movie(self, path, shape):
+        return open_memmap(path, mode='w+', dtype=numpy.float32, shape=shape)
+
+    def _chunks(self, movie):
+        for start in range(0, len(movie), self._chunk_frames):
+            yield start, numpy.asarray(movie[start:start + self._chunk_frames], dtype=numpy.float64)
+
+    def _f0(self, movies, f0_type):
+        if f0_type == 'percentile':
+            sketch = PercentileSketch(self._f0_percentile)
+            for movie in movies:
+                for _, chunk in self._chunks(movie):
+                    sketch.update(chunk)
+            return sketch.value()
+
+        f0 = None
+        frames_count = 0
+        for movie in movies:
+            for _, chunk in self._chunks(movie):
+                frames_count += len(chunk)
+                if f0_type == 'mean':
+                    chunk_f0 = chunk.sum(axis=0)
+                    f0 = chunk_f0 if f0 is None else f0 + chunk_f0
+                else:
+                    chunk_f0 = chunk.min(axis=0)
+                    f0 = chunk_f0 if f0 is None else numpy.minimum(f0, chunk_f0)
+        return f0 / frames_count if f0_type == 'mean' else f0
+
+
+_ZIP_MAGIC_PREFIX = b'PK\x03\x04'
+
+
+def _starts_with(path, prefix):
+    with open(path, 'rb') as file:
+        return file.read(len(prefix)) == prefix
+
+
+class _FallbackMovie:
+    """
+    Movie of the fallback backend (with the timing, spacing and get_frame_data of an isx.Movie), indexed
+    by frames like a memory map.
+    """
+
+    def __init__(self, movie):
+        self._movie = movie
+        self.shape = (movie.timing.num_samples, *movie.spacing.num_pixels)
+        self.period = movie.timing.period.secs_float
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return numpy.asarray(self._movie.get_frame_data(index))
+        frames = [numpy.asarray(self._movie.get_frame_data(frame)) for frame in range(*index.indices(len(self)))]
+        return numpy.stack(frames) if frames else numpy.zeros((0, *self.shape[1:]))
+
+
+@lru_cache(maxsize=32)
+def _bandpass_mask(frame_shape, low_cutoff, high_cutoff, retain_mean):
+    # Computed once per frame shape and cut-offs, rfft2 only keeps the non-negative horizontal frequencies
+    vertical_frequencies = numpy.fft.fftfreq(frame_shape[0])[:, numpy.newaxis]
+    horizontal_frequencies = numpy.fft.rfftfreq(frame_shape[1])[numpy.newaxis, :]
+    frequencies = numpy.hypot(vertical_frequencies, horizontal_frequencies)
+    mask = ((frequencies >= low_cutoff) & (frequencies <= high_cutoff)).astype(numpy.float64)
+    if retain_mean:
+        mask[0, 0] = 1.0
+    mask.setflags(write=False)
+    return mask
+
+
+def _detected_events(traces, threshold, tau_frames, event_time_ref):
+    """
+    (cells, frames, amplitudes) of the events of every trace (cells x frames), without looping over cells.
+    """
+    frames_count = traces.shape[1]
+    median = numpy.median(traces, axis=1, keepdims=True)
+    noise = numpy.median(numpy.abs(traces - median), axis=1, keepdims=True)
+    above = traces > median + threshold * noise
+
+    # A peak is the highest sample within tau frames on both sides, and the first one of a plateau
+    padded = numpy.pad(traces, ((0, 0), (tau_frames, tau_frames)), constant_values=-numpy.inf)
+    neighbourhood_maximum = _running_maximum(padded, 2 * tau_frames + 1)
+    previous = numpy.pad(traces, ((0, 0), (1, 0)), constant_values=-numpy.inf)[:, :-1]
+    peaks = above & (traces == neighbourhood_maximum) & (traces > previous)
+    cells, peak_frames = numpy.nonzero(peaks)
+    amplitudes = traces[cells, peak_frames]
+
+    if event_time_ref == 'maximum':
+        return cells, peak_frames, amplitudes
+
+    # The beginning is the first frame of the run above the threshold that reaches the peak
+    frame_indices = numpy.broadcast_to(numpy.arange(frames_count), traces.shape)
+    run_starts = above & ~numpy.pad(above, ((0, 0), (1, 0)))[:, :-1]
+    beginnings = numpy.maximum.accumulate(numpy.where(run_starts, frame_indices, 0), axis=1)[cells, peak_frames]
+    if event_time_ref == 'beginning':
+        return cells, beginnings, amplitudes
+    return cells, (beginnings + peak_frames) // 2, amplitudes
+
+
+class _StreamedRandomizedSVD:
+    """
+    Truncated SVD of the pixels x frames matrix of a series of movies, centered on the mean of each pixel,
+    from a few passes over blocks of frames (Halko, Martinsson & Tropp, 2011). Only pixels x components
+    and components x frames arrays are kept.
+    """
+    OVERSAMPLING = 10
+    POWER_ITERATIONS = 2
+
+    def __init__(self, num_components, block_size, random):
+        self._num_components = num_components
+        self._block_size = block_size
+        self._random = random
+
+    def decompose(self, movies):
+        frames_count = sum(len(movie) for movie in movies)
+        pixels_count = int(numpy.prod(movies[0].shape[1:]))
+        rank = min(self._num_components + self.OVERSAMPLING, pixels_count, frames_count)
+
+        # First pass: pixel means, and the range of the matrix sampled with a random test matrix
+        total = numpy.zeros(pixels_count)
+        sample = numpy.zeros((pixels_count, rank))
+        test_sums = numpy.zeros(rank)
+        for block in self._blocks(movies):
+            test_matrix = self._random.standard_normal((block.shape[1], rank))
+            total += block.sum(axis=1)
+            sample += block @ test_matrix
+            test_sums += test_matrix.sum(axis=0)
+        mean = total / frames_count
+        sample -= numpy.outer(mean, test_sums)
+        basis = numpy.linalg.qr(sample)[0]
+
+        # Power iterations sharpen the basis when the spectrum decays slowly, one pass each
+        for _ in range(self.POWER_ITERATIONS):
+            sample = numpy.zeros_like(basis)
+            for block in self._blocks(movies, mean):
+                sample += block @ (block.T @ basis)
+            basis = numpy.linalg.qr(sample)[0]
+
+        # Last pass: the matrix projected on the basis, whose SVD gives the one of the movie
+        projected = numpy.hstack([basis.T @ block for block in self._blocks(movies, mean)])
+        left, singular_values, right = numpy.linalg.svd(projected, full_matrices=False)
+        components = min(self._num_components, len(singular_values))
+        return basis @ left[:, :components], singular_values[:components], right[:components]
+
+    # Private methods
+
+    def _blocks(self, movies, mean=None):
+        for movie in movies:
+            for start in range(0, len(movie), self._block_size):
+                frames = numpy.asarray(movie[start:start + self._block_size], dtype=numpy.float64)
+                block = frames.reshape(len(frames), -1).T
+                yield block if mean is None else block - mean[:, numpy.newaxis]
+
+
+def _fast_ica(signals, num_components, max_iterations, convergence_threshold, random):
+    """
+    Unmixing matrix (components x signals) of symmetric FastICA with the logcosh contrast
+    (Hyvärinen, 1999), on signals (signals x samples).
+    """
+    centered = signals - signals.mean(axis=1, keepdims=True)
+    eigenvalues, eigenvectors = numpy.linalg.eigh(centered @ centered.T / centered.shape[1])
+    eigenvalues = numpy.maximum(eigenvalues, numpy.finfo(numpy.float64).eps)
+    whitening = (eigenvectors / numpy.sqrt(eigenvalues)).T
+    whitened = whitening @ centered
+
+    unmixing = _symmetric_decorrelation(random.standard_normal((num_components, len(whitened))))
+    for _ in range(max_iterations):
+        projections = numpy.tanh(unmixing @ whitened)
+        updated = _symmetric_decorrelation(
+            projections @ whitened.T / whitened.shape[1]
+            - (1 - projections ** 2).mean(axis=1)[:, numpy.newaxis] * unmixing)
+        converged = numpy.max(numpy.abs(numpy.abs(numpy.sum(updated * unmixing, axis=1)) - 1)) < convergence_threshold
+        unmixing = updated
+        if converged:
+            break
+    return unmixing @ whitening
+
+
+def _symmetric_decorrelation(unmixing):
+    eigenvalues, eigenvectors = numpy.linalg.eigh(unmixing @ unmixing.T)
+    return (eigenvectors / numpy.sqrt(eigenvalues)) @ eigenvectors.T @ unmixing
+
+
+def _skewness(rows):
+    centered = rows - rows.mean(axis=1, keepdims=True)
+    return (centered ** 3).mean(axis=1)
+
+
+def _running_maximum(values, window):
+    # Maximum of every window of each row, doubling the covered span on each pass
+    maximum, covered = values, 1
+    while covered < window:
+        step = min(covered, window - covered)
+        maximum = numpy.maximum(maximum[:, :-step], maximum[:, step:])
+        covered += step
+    return maximum
+
+
+def _roi_bounding_box(roi, frame_shape):
+    if not roi:
+        return 0, frame_shape[0], 0, frame_shape[1]
+    xs, ys = zip(*roi)
+    return (max(min(ys), 0), min(max(ys) + 1, frame_shape[0]),
+            max(min(xs), 0), min(max(xs) + 1, frame_shape[1]))
+
+
+def _translated_frames(frames, translations):
+    # Pixels moved in from outside the frame are zero, the crop drops them
+    translated = numpy.zeros_like(frames)
+    height, width = frames.shape[1:]
+    for index, (dy, dx) in enumerate(translations):
+        translated[index, max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)] = \
+            frames[index, max(-dy, 0):height + min(-dy, 0), max(-dx, 0):width + min(-dx, 0)]
+    return translated
+
+
+class _PhaseCorrelation:
+    """
+    Translations (rows, columns) that align batches of frames to a reference: the peak of the inverse
+    transform of their normalized cross-power spectrum, bandpassed and within max_translation.
+    """
+
+    def __init__(self, reference, low_cutoff, high_cutoff, max_translation):
+        self._shape = reference.shape
+        self._mask = _bandpass_mask(self._shape, low_cutoff, high_cutoff, False)
+        self._reference_spectrum = numpy.conj(numpy.fft.rfft2(reference))
+        row_shifts = numpy.rint(numpy.fft.fftfreq(self._shape[0]) * self._shape[0]).astype(int)
+        column_shifts = numpy.rint(numpy.fft.fftfreq(self._shape[1]) * self._shape[1]).astype(int)
+        self._shifts = (row_shifts, column_shifts)
+        self._out_of_range = (numpy.abs(row_shifts)[:, numpy.newaxis] > max_translation) | \
+                             (numpy.abs(column_shifts)[numpy.newaxis, :] > max_translation)
+
+    def translations(self, frames):
+        cross_power = numpy.fft.rfft2(frames) * self._reference_spectrum * self._mask
+        cross_power /= numpy.abs(cross_power) + numpy.finfo(numpy.float64).eps
+        correlation = numpy.fft.irfft2(cross_power, s=self._shape)
+        correlation[:, self._out_of_range] = -numpy.inf
+        peaks = correlation.reshape(len(frames), -1).argmax(axis=1)
+        rows, columns = numpy.unravel_index(peaks, self._shape)
+        # The peak is the displacement of each frame, the translation moves it back
+        return -numpy.stack([self._shifts[0][rows], self._shifts[1][columns]], axis=1)
+
+
+class NumpyCellSet:
+    """
+    Cell set saved as an .npz archive (whatever its extension) with the images (cells x height x width),
+    traces (cells x frames) and statuses of its cells, and the sampling period (seconds) of the traces.
+    """
+
+    def __init__(self, images, traces, statuses, period):
+        self.images = images
+        self.traces = traces
+        self.statuses = statuses
+        self.period = float(period)
+
+    @classmethod
+    def read(cls, path):
+        with numpy.load(path) as archive:
+            return cls(archive['images'], archive['traces'], archive['statuses'], archive['period'])
+
+    @classmethod
+    def from_cell_set(cls, cell_set):
+        # Copies a cell set of another backend, e.g. an isx.CellSet
+        cells = range(cell_set.num_cells)
+        return cls(numpy.array([cell_set.get_cell_image_data(cell) for cell in cells]),
+                   numpy.array([cell_set.get_cell_trace_data(cell) for cell in cells]),
+                   numpy.array([cell_set.get_cell_status(cell) for cell in cells], dtype=str),
+                   cell_set.timing.period.secs_float)
+
+    @classmethod
+    def write(cls, path, images, traces, period, statuses=None):
+        if statuses is None:
+            statuses = numpy.full(len(traces), 'undecided')
+        # Writing through a file object keeps numpy from appending .npz to the path
+        with open(path, 'wb') as cell_set_file:
+            numpy.savez(cell_set_file, images=images, traces=traces, statuses=numpy.asarray(statuses, dtype=str),
+                        period=period)
+        return cls(images, traces, statuses, period)
+
+    @property
+    def num_cells(self):
+        return len(self.traces)
+
+    def get_cell_image_data(self, index):
+        return self.images[index]
+
+    def get_cell_trace_data(self, index):
+        return self.traces[index]
+
+    def get_cell_status(self, index):
+        return str(self.statuses[index])
+
+
+class NumpyEventSet:
+    """
+    Event set saved as an .npz archive (whatever its extension) with the cell, time (seconds) and amplitude
+    of every event.
+    """
+
+    def __init__(self, num_cells, cells, times, amplitudes):
+        self.num_cells = int(num_cells)
+        self.cells = cells
+        self.times = times
+        self.amplitudes = amplitudes
+
+    @classmethod
+    def read(cls, path):
+        with numpy.load(path) as archive:
+            return cls(archive['num_cells'], archive['cells'], archive['times'], archive['amplitudes'])
+
+    @classmethod
+    def write(cls, path, num_cells, cells, times, amplitudes):
+        with open(path, 'wb') as event_set_file:
+            numpy.savez(event_set_file, num_cells=num_cells, cells=cells, times=times, amplitudes=amplitudes)
+        return cls(num_cells, cells, times, amplitudes)
+
+    def get_cell_data(self, index):
+        # As isx, offsets are in microseconds
+        events = self.cells == index
+        return self.times[events] * 1e6, self.amplitudes[events]
+
+
+class PercentileSketch:
+    """
+    Running estimate of a percentile of every pixel, using the P-square algorithm (Jain & Chlamtac, 1985)
+    vectorized over pixels. It keeps five markers per pixel, so memory does not grow with the frames.
+    """
+
+    def __init__(self, percentile):
+        p = percentile / 100
+        self._first_frames = []
+        self._heights = None
+        self._positions = None
+        self._desired_positions = numpy.array([0, 2 * p, 4 * p, 2 + 2 * p, 4])
+        self._increments = numpy.array([0, p / 2, p, (1 + p) / 2, 1])
+        self._percentile = percentile
+
+    def update(self, frames):
+        for frame in frames:
+            if self._heights is None:
+                self._collect_first_frame(frame)
+            else:
+                self._add(frame)
+
+    def value(self):
+        if self._heights is None:
+            return numpy.percentile(numpy.stack(self._first_frames), self._percentile, axis=0)
+        return self._heights[2].copy()
+
+    # Private methods
+
+    def _collect_first_frame(self, frame):
+        self._first_frames.append(numpy.array(frame, dtype=numpy.float64))
+        if len(self._first_frames) == 5:
+            self._heights = numpy.sort(numpy.stack(self._first_frames), axis=0)
+            self._positions = numpy.broadcast_to(
+                numpy.arange(5, dtype=numpy.float64).reshape((5,) + (1,) * frame.ndim), self._heights.shape).copy()
+            self._desired_positions = numpy.broadcast_to(
+                self._desired_positions.reshape((5,) + (1,) * frame.ndim), self._heights.shape).copy()
+            self._increments = self._increments.reshape((5,) + (1,) * frame.ndim)
+            self._first_frames = []
+
+    def _add(self, frame):
+        q, n = self._heights, self._positions
+        q[0] = numpy.minimum(q[0], frame)
+        q[4] = numpy.maximum(q[4], frame)
+        cell = (frame >= q[1]).astype(int) + (frame >= q[2]) + (frame >= q[3])
+        for i in range(1, 5):
+            n[i] += cell < i
+        self._desired_positions += self._increments
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            for i in range(1, 4):
+                d = self._desired_positions[i] - n[i]
+                adjust = ((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1))
+                s = numpy.sign(d)
+                parabolic = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                        (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                        + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                neighbour_heights = numpy.where(s > 0, q[i + 1], q[i - 1])
+                neighbour_positions = numpy.where(s > 0, n[i + 1], n[i - 1])
+                linear = q[i] + s * (neighbour_heights - q[i]) / (neighbour_positions - n[i])
+                height = numpy.where((q[i - 1] < parabolic) & (parabolic < q[i + 1]), parabolic, linear)
+                q[i] = numpy.where(adjust, height, q[i])
+                n[i] = numpy.where(adjust, n[i] + s, n[i])
@@ -0,0 +1,113 @@
+import hashlib
+import random
+import time
+
+from .in_memory_isx import InMemoryISX
+
+
+class SimulatedISX(InMemoryISX):
+    """
+    InMemoryISX whose operations take time and write outputs sized after their inputs, to benchmark the
+    orchestration (executors, clean-up, caching) against realistic step profiles.
+
+    - latencies: seconds per operation call. Each value is a number or a callable receiving a
+      random.Random and returning seconds (see uniform() and normal()).
+    - size_ratios: output movie bytes as a ratio of the input bytes, per operation.
+    - sparse: allocate outputs without writing their content instead of writing real bytes.
+    """
+    DEFAULT_SIZE_RATIOS = {
+        "preprocess": 1.0,
+        "spatial_filter": 1.0,
+        "motion_correct": 1.0,
+        "project_movie": 0.01,
+        "dff": 1.0,
+        "pca_ica": 0.05,
+        "event_detection": 0.01,
+        "longitudinal_registration": 1.0,
+        "export_movie_to_tiff": 1.0,
+        "export_movie_to_nwb": 1.0,
+    }
+
+    @staticmethod
+    def uniform(low, high):
+        return lambda rng: rng.uniform(low, high)
+
+    @staticmethod
+    def normal(mean, stddev):
+        return lambda rng: max(0.0, rng.gauss(mean, stddev))
+
+    def __init__(self, file_system=None, latencies=None, size_ratios=None, sparse=False, seed=None):
+        super().__init__(file_system)
+        self._latencies = latencies or {}
+        self._size_ratios = {**self.DEFAULT_SIZE_RATIOS, **(size_ratios or {})}
+        self._sparse = sparse
+        self._random = random.Random(seed)
+
+    def preprocess(self, input_movie_files, output_movie_files, **kwargs):
+        super().preprocess(input_movie_files, output_movie_files, **kwargs)
+        self._simulate("preprocess", input_movie_files, output_movie_files)
+
+    def spatial_filter(self, input_movie_files, output_movie_files, **kwargs):
+        super().spatial_filter(input_movie_files, output_movie_files, **kwargs)
+        self._simulate("spatial_filter", input_movie_files, output_movie_files)
+
+    def motion_correct(self, input_movie_files, output_movie_files, **kwargs):
+        super().motion_correct(input_movie_files, output_movie_files, **kwargs)
+        self._simulate("motion_correct", input_movie_files, output_movie_files)
+
+    def project_movie(self, input_movie_files, output_image_file, **kwargs):
+        super().project_movie(input_movie_files, output_image_file, **kwargs)
+        self._simulate("project_movie", input_movie_files, [output_image_file])
+
+    def dff(self, input_movie_files, output_movie_files, **kwargs):
+        super().dff(input_movie_files, output_movie_files, **kwargs)
+        self._simulate("dff", input_movie_files, output_movie_files)
+
+    def pca_ica(self, input_movie_files, output_cell_set_files, num_pcs, **kwargs):
+        super().pca_ica(input_movie_files, output_cell_set_files, num_pcs, **kwargs)
+        self._simulate("pca_ica", input_movie_files, output_cell_set_files)
+
+    def event_detection(self, input_cell_set_files, output_event_set_files, **kwargs):
+        super().event_detection(input_cell_set_files, output_event_set_files, **kwargs)
+        self._simulate("event_detection", input_cell_set_files, output_event_set_files)
+
+    def longitudinal_registration(self, input_cell_set_files, output_cell_set_files, **kwargs):
+        super().longitudinal_registration(input_cell_set_files, output_cell_set_files, **kwargs)
+        self._simulate("longitudinal_registration", input_cell_set_files, output_cell_set_files)
+        input_movie_files = kwargs.get("input_movie_files", [])
+        output_movie_files = kwargs.get("output_movie_files", [])
+        for input_file, output_file in zip(input_movie_files, output_movie_files):
+            self._write_sized(output_file, self._output_size("longitudinal_registration", [input_file]))
+
+    def export_movie_to_tiff(self, input_movie_files, output_movie_file, **kwargs):
+        super().export_movie_to_tiff(input_movie_files, output_movie_file, **kwargs)
+        self._simulate("export_movie_to_tiff", input_movie_files, [output_movie_file])
+
+    def export_movie_to_nwb(self, input_movie_files, output_movie_file, **kwargs):
+        super().export_movie_to_nwb(input_movie_files, output_movie_file, **kwargs)
+        self._simulate("export_movie_to_nwb", input_movie_files, [output_movie_file])
+
+    # Private methods
+
+    def _simulate(self, operation, input_files, output_files):
+        time.sleep(self._latency(operation))
+        # Each output is produced from the input in the same position, or from all inputs otherwise
+        for index, output_file in enumerate(output_files):
+            sources = [input_files[index]] if len(input_files) == len(output_files) else input_files
+            self._write_sized(output_file, self._output_size(operation, sources))
+
+    def _latency(self, operation):
+        latency = self._latencies.get(operation, 0)
+        return latency(self._random) if callable(latency) else latency
+
+    def _output_size(self, operation, input_files):
+        input_bytes = sum(self._file_system.size(input_file) or 0 for input_file in input_files)
+        return int(input_bytes * self._size_ratios.get(operation, 1.0))
+
+    def _write_sized(self, path, size):
+        if self._sparse:
+            self._file_system.allocate(path, size)
+            return
+        # Content depends on the path, so outputs of different inputs do not hash the same
+        block = hashlib.sha256(path.encode()).hexdigest()
+        self._file_system.write(path, (block * (size // len(block) + 1))[:size])
@@ -0,0 +1,38 @@
+import unittest
+
+from benchmarks import pipeline_benchmarks  # noqa: F401  (registers the benchmarks)
+from benchmarks.harness import registered_benchmarks, regressions, run_benchmarks
+
+
+class BenchmarksTestCase(unittest.TestCase):
+    def test_01_quick_benchmarks_run_every_registered_benchmark_once_per_repetition(self):
+        # When
+        results = run_benchmarks(repeat=1, quick=True)
+
+        # Then
+        self.assertEqual([result["name"] for result in results["results"]], registered_benchmarks())
+        for result in results["results"]:
+            self.assertEqual(result["repeat"], 1)
+            self.assertGreaterEqual(result["median"], 0)
+
+    def test_02_regressions_report_benchmarks_slower_than_the_threshold(self):
+        # Given
+        baseline = {"results": [
+            {"name": "fast", "params": {"n": 1}, "median": 1.0},
+            {"name": "slow", "params": {"n": 1}, "median": 1.0},
+        ]}
+        current = {"results": [
+            {"name": "fast", "params": {"n": 1}, "median": 1.1},
+            {"name": "slow", "params": {"n": 1}, "median": 2.0},
+            {"name": "new", "params": {"n": 1}, "median": 5.0},
+        ]}
+
+        # When
+        slower = regressions(baseline, current, threshold=1.2)
+
+        # Then
+        self.assertEqual([(regression["name"], regression["ratio"]) for regression in slower], [("slow", 2.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,13 @@
+import sys
 import unittest
+from unittest import mock
+
+import numpy
 
 from ci_pipe.errors.caiman_backend_not_configured_error import CaimanBackendNotConfiguredError
 from ci_pipe.pipeline import CIPipe
 from external_dependencies.caiman.in_memory_caiman import InMemoryCaiman
+from tests.chunked_tiff_writer_test import RecordingTiffFile
 from tests.ci_pipe_test_case import CIPipeTestCase
 
 
@@ -76,6 +81,210 @@ class CaimanTestCase(CIPipeTestCase):
             self._file_system,
         )
 
+    def test_04_a_pipeline_starts_its_caiman_cluster_once_and_passes_it_to_every_step(self):
+        # Given
+        caiman = InMemoryCaiman(self._file_system)
+        received_dviews = self._record_received_dviews(caiman)
+        pipeline = self._pipeline_with_two_videos(caiman).start_caiman_cluster(n_processes=2)
+
+        # When
+        pipeline.caiman.motion_correction()
+        pipeline.caiman.cnmf()
+
+        # Then
+        started_cluster, = caiman.cluster.started_clusters
+        self.assertEqual(received_dviews, [started_cluster] * 4)
+        self.assertEqual(pipeline.caiman_cluster().n_processes(), 2)
+
+    def test_05_a_caiman_cluster_is_stopped_on_shutdown_and_restarted_on_the_next_step(self):
+        # Given
+        caiman = InMemoryCaiman(self._file_system)
+        pipeline = self._pipeline_with_two_videos(caiman).start_caiman_cluster()
+        pipeline.caiman.motion_correction()
+
+        # When
+        pipeline.shutdown_caiman_cluster()
+
+        # Then
+        first_cluster, = caiman.cluster.started_clusters
+        self.assertTrue(first_cluster.terminated)
+        self.assertFalse(pipeline.caiman_cluster().is_running())
+        pipeline.caiman.cnmf()
+        self.assertEqual(len(caiman.cluster.started_clusters), 2)
+
+    def test_06_a_pipeline_without_caiman_can_not_start_a_caiman_cluster(self):
+        # Given
+        pipeline = CIPipe({'videos-tiff': ['file1.tiff']}, file_system=self._file_system)
+
+        # When / Then
+        with self.assertRaises(CaimanBackendNotConfiguredError):
+            pipeline.start_caiman_cluster()
+
+    def test_07_a_caiman_step_without_a_cluster_keeps_running_without_dview(self):
+        # Given
+        caiman = InMemoryCaiman(self._file_system)
+        received_dviews = self._record_received_dviews(caiman)
+        pipeline = self._pipeline_with_two_videos(caiman)
+
+        # When
+        pipeline.caiman.motion_correction()
+
+        # Then
+        self.assertEqual(received_dviews, [None, None])
+        self.assertEqual(caiman.cluster.started_clusters, [])
+
+    def test_08_motion_correction_can_keep_the_memory_mapped_movies_instead_of_tiffs(self):
+        # Given
+        pipeline = self._pipeline_with_two_videos(InMemoryCaiman(self._file_system))
+
+        # When
+        pipeline.caiman.motion_correction(caiman_keep_mmap=True)
+
+        # Then
+        self._assert_output_files(
+            pipeline,
+            'videos-mmap',
+            [
+                'output/Main Branch - Step 1 - Caiman Motion Correction/file1-MC_d1_1_d2_1_d3_1_order_C_frames_1.mmap',
+                'output/Main Branch - Step 1 - Caiman Motion Correction/file2-MC_d1_1_d2_1_d3_1_order_C_frames_1.mmap',
+            ],
+            self._file_system,
+        )
+        self.assertEqual(pipeline.values('videos-tiff'), ['input_dir/file1.tiff', 'input_dir/file2.tiff'])
+        self.assertFalse(self._file_system.exists('input_dir/file1.mmap'))
+        self.assertFalse(self._file_system.exists('input_dir/file2.mmap'))
+
+    def test_09_cnmf_reads_memory_mapped_movies_in_place(self):
+        # Given
+        caiman = InMemoryCaiman(self._file_system)
+        loaded_files = []
+        load = caiman.load
+        caiman.load = lambda fname: loaded_files.append(fname) or load(fname)
+        pipeline = self._pipeline_with_two_videos(caiman)
+        pipeline.caiman.motion_correction(caiman_keep_mmap=True)
+
+        # When
+        pipeline.caiman.cnmf()
+
+        # Then
+        self.assertEqual(loaded_files, [])
+        self.assertEqual(pipeline.values('files-hdf5'), [
+            'output/Main Branch - Step 2 - Caiman Constrained Non-negative Matrix Factorization/'
+            'file1-MC_d1_1_d2_1_d3_1_order_C_frames_1-CNMF.hdf5',
+            'output/Main Branch - Step 2 - Caiman Constrained Non-negative Matrix Factorization/'
+            'file2-MC_d1_1_d2_1_d3_1_order_C_frames_1-CNMF.hdf5',
+        ])
+
+    def test_10_memory_mapped_movies_can_be_exported_to_tiff_as_a_final_step(self):
+        # Given
+        pipeline = self._pipeline_with_two_videos(InMemoryCaiman(self._file_system))
+        pipeline.caiman.motion_correction(caiman_keep_mmap=True)
+
+        # When
+        pipeline.caiman.export_videos_to_tiff()
+
+        # Then
+        self._assert_output_files(
+            pipeline,
+            'videos-tiff',
+            [
+                'output/Main Branch - Step 2 - Caiman Export Videos To TIFF/file1-MC_d1_1_d2_1_d3_1_order_C_frames_1.tif',
+                'output/Main Branch - Step 2 - Caiman Export Videos To TIFF/file2-MC_d1_1_d2_1_d3_1_order_C_frames_1.tif',
+            ],
+            self._file_system,
+        )
+
+    def test_11_motion_correction_can_stream_the_corrected_movies_to_tiff_in_chunks(self):
+        # Given
+        tifffile = RecordingTiffFile()
+        pipeline = self._pipeline_with_two_videos(InMemoryCaiman(self._file_system))
+
+        # When
+        with mock.patch.dict(sys.modules, {'tifffile': tifffile}):
+            pipeline.caiman.motion_correction(caiman_tiff_chunk_frames=10)
+
+        # Then
+        self.assertEqual(list(tifffile.written), pipeline.values('videos-tiff'))
+        self.assertEqual([frames.shape for frames in tifffile.written.values()], [(1, 1, 1), (1, 1, 1)])
+
+    def test_12_memory_mapped_movies_can_be_exported_to_tiff_in_chunks(self):
+        # Given
+        tifffile = RecordingTiffFile()
+        pipeline = self._pipeline_with_two_videos(InMemoryCaiman(self._file_system))
+        pipeline.caiman.motion_correction(caiman_keep_mmap=True)
+
+        # When
+        with mock.patch.dict(sys.modules, {'tifffile': tifffile}):
+            pipeline.caiman.export_videos_to_tiff(caiman_tiff_chunk_frames=10, caiman_tiff_compression='zlib')
+
+        # Then
+        self.assertEqual(list(tifffile.written), pipeline.values('videos-tiff'))
+        self.assertEqual([frames.shape for frames in tifffile.written.values()], [(1, 1, 1), (1, 1, 1)])
+        self.assertEqual({arguments['compression'] for arguments in tifffile.arguments.values()}, {'zlib'})
+
+    def test_13_memory_mapped_movies_are_exported_frame_by_frame_in_either_order(self):
+        for order in ['C', 'F']:
+            with self.subTest(order=order):
+                # Given
+                tifffile = RecordingTiffFile()
+                mmap_path = f'movie_d1_2_d2_3_d3_1_order_{order}_frames_5.mmap'
+                self._file_system.write(mmap_path, '')
+                pipeline = CIPipe(
+                    {'videos-mmap': [mmap_path]},
+                    file_system=self._file_system,
+                    caiman=InMemoryCaiman(self._file_system),
+                )
+
+                # When
+                with mock.patch.dict(sys.modules, {'tifffile': tifffile}):
+                    pipeline.caiman.export_videos_to_tiff(caiman_tiff_chunk_frames=2)
+
+                # Then
+                pixels = numpy.arange(6 * 5, dtype=numpy.float32).reshape(6, 5)
+                numpy.testing.assert_array_equal(
+                    tifffile.written[pipeline.values('videos-tiff')[0]],
+                    pixels.T.reshape((5, 2, 3), order='F'),
+                )
+
+    def test_14_cnmf_reads_the_movies_written_by_the_latest_step(self):
+        # Given
+        caiman = InMemoryCaiman(self._file_system)
+        loaded_files = []
+        load = caiman.load
+        caiman.load = lambda fname: loaded_files.append(fname) or load(fname)
+        pipeline = self._pipeline_with_two_videos(caiman)
+        pipeline.caiman.motion_correction(caiman_keep_mmap=True)
+        pipeline.caiman.export_videos_to_tiff()
+        loaded_files.clear()
+
+        # When
+        pipeline.caiman.cnmf()
+
+        # Then
+        self.assertEqual(loaded_files, pipeline.values('videos-tiff'))
+
+    def _pipeline_with_two_videos(self, caiman):
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.tiff', '')
+        self._file_system.write('input_dir/file2.tiff', '')
+        return CIPipe.with_videos_from_directory('input_dir', file_system=self._file_system, caiman=caiman)
+
+    def _record_received_dviews(self, caiman):
+        received_dviews = []
+        motion_correct, cnmf = caiman.motion_correction.MotionCorrect, caiman.source_extraction.cnmf.CNMF
+
+        def recording_motion_correct(fname, dview=None, **kwargs):
+            received_dviews.append(dview)
+            return motion_correct(fname, dview=dview, **kwargs)
+
+        def recording_cnmf(dview=None, **kwargs):
+            received_dviews.append(dview)
+            return cnmf(dview=dview, **kwargs)
+
+        caiman.motion_correction.MotionCorrect = recording_motion_correct
+        caiman.source_extraction.cnmf.CNMF = recording_cnmf
+        return received_dviews
+
     def _assert_output_files(self, pipeline, key, expected_paths, file_system):
         output = pipeline.output(key)
         self.assertEqual(len(output), len(expected_paths))
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy
+
+from ci_pipe.utils.chunked_tiff_writer import ChunkedTiffWriter
+
+
+class RecordingTiffFile:
+    def __init__(self):
+        self.written = {}
+        self.arguments = {}
+
+    def imwrite(self, file, data=None, shape=None, dtype=None, **kwargs):
+        self.written[file] = numpy.stack([frame for _, frame in zip(range(shape[0]), data)])
+        self.arguments[file] = {'shape': shape, 'dtype': dtype, **kwargs}
+
+
+class RecordingMovie:
+    def __init__(self, frames):
+        self._frames = frames
+        self.read_slices = []
+        self.shape = frames.shape
+        self.dtype = frames.dtype
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __getitem__(self, item):
+        self.read_slices.append((item.start, item.stop))
+        return self._frames[item]
+
+
+class ChunkedTiffWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tifffile = RecordingTiffFile()
+        self._frames = numpy.arange(7 * 2 * 3, dtype=numpy.float32).reshape(7, 2, 3)
+
+    def test_01_a_writer_streams_the_movie_in_chunks_of_frames(self):
+        # Given
+        movie = RecordingMovie(self._frames)
+        writer = ChunkedTiffWriter(chunk_frames=3, tifffile=self._tifffile)
+
+        # When
+        writer.write(movie, 'movie.tif')
+
+        # Then
+        self.assertEqual(movie.read_slices, [(0, 3), (3, 6), (6, 7)])
+        numpy.testing.assert_array_equal(self._tifffile.written['movie.tif'], self._frames)
+
+    def test_02_a_writer_writes_a_bigtiff_with_the_given_compression(self):
+        # Given
+        writer = ChunkedTiffWriter(chunk_frames=3, compression='zlib', tifffile=self._tifffile)
+
+        # When
+        writer.write(self._frames, 'movie.tif')
+
+        # Then
+        arguments = self._tifffile.arguments['movie.tif']
+        self.assertEqual(arguments['shape'], (7, 2, 3))
+        self.assertEqual(arguments['dtype'], numpy.float32)
+        self.assertTrue(arguments['bigtiff'])
+        self.assertEqual(arguments['compression'], 'zlib')
+
+    def test_03_a_writer_reports_the_frames_written_after_each_chunk(self):
+        # Given
+        progress = []
+        writer = ChunkedTiffWriter(chunk_frames=3, tifffile=self._tifffile)
+
+        # When
+        writer.write(self._frames, 'movie.tif', on_chunk_written=lambda done, total: progress.append((done, total)))
+
+        # Then
+        self.assertEqual(progress, [(3, 7), (6, 7), (7, 7)])
+
+
+if __name__ == '__main__':
+    unittest.main()
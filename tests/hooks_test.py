@@ -0,0 +1,176 @@
+import unittest
+
+from ci_pipe.errors.invalid_hook_event_error import InvalidHookEventError
+from ci_pipe.pipeline import CIPipe
+from ci_pipe.utils.hook_registry import HookRegistry
+from external_dependencies.isx.in_memory_isx import InMemoryISX
+from tests.ci_pipe_test_case import CIPipeTestCase
+
+
+class HooksTestCase(CIPipeTestCase):
+    def setUp(self):
+        super().setUp()
+        self._events = []
+
+    def test_01_a_pipeline_runs_step_hooks_around_each_step(self):
+        # Given
+        pipeline = CIPipe({'numbers': [1]}, file_system=self._file_system)
+        pipeline.add_hook(HookRegistry.PRE_STEP, self._record_step_event("pre"))
+        pipeline.add_hook(HookRegistry.POST_STEP, self._record_step_event("post"))
+
+        # When
+        pipeline.step("Scale by 2", self.scale, factor=2)
+        pipeline.step("Add one", self.add_one)
+
+        # Then
+        self.assertEqual(self._events, [
+            ("pre", "Scale by 2", {'factor': 2}),
+            ("post", "Scale by 2", {'factor': 2}),
+            ("pre", "Add one", {}),
+            ("post", "Add one", {}),
+        ])
+
+    def test_02_a_pipeline_runs_input_hooks_for_each_input_of_a_module_step(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+        )
+        pipeline.add_hook(HookRegistry.PRE_STEP, self._record_step_function_name)
+        pipeline.add_hook(HookRegistry.PER_INPUT_START, self._record_input_event("start"))
+        pipeline.add_hook(HookRegistry.PER_INPUT_END, self._record_input_event("end"))
+
+        # When
+        pipeline.isx.preprocess_videos()
+
+        # Then
+        first_ids, second_ids = [entry['ids'] for entry in pipeline.output('videos-isxd')]
+        self.assertEqual(self._events, [
+            "preprocess_videos",
+            ("start", "ISX Preprocess Videos", first_ids),
+            ("end", "ISX Preprocess Videos", first_ids),
+            ("start", "ISX Preprocess Videos", second_ids),
+            ("end", "ISX Preprocess Videos", second_ids),
+        ])
+
+    def test_03_a_pipeline_runs_clean_up_hooks_for_each_removed_file(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+        )
+        pipeline.add_hook(HookRegistry.ON_CLEAN_UP, lambda pipeline, key, path: self._events.append((key, path)))
+
+        # When
+        pipeline.isx.preprocess_videos()
+        pipeline.isx.preprocess_videos()
+
+        # Then
+        self.assertEqual(self._events, [
+            ('videos-isxd', 'output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd'),
+            ('videos-isxd', 'output/Main Branch - Step 1 - ISX Preprocess Videos/file2-PP.isxd'),
+        ])
+
+    def test_04_a_branch_shares_the_hooks_of_its_pipeline(self):
+        # Given
+        pipeline = CIPipe({'numbers': [1]}, file_system=self._file_system)
+        pipeline.add_hook(HookRegistry.PRE_STEP, self._record_step_event("pre"))
+
+        # When
+        pipeline.branch("New Branch").step("Add one", self.add_one)
+
+        # Then
+        self.assertEqual(self._events, [("pre", "Add one", {})])
+
+    def test_05_a_pipeline_can_not_register_hooks_for_unknown_events(self):
+        # Given
+        pipeline = CIPipe({'numbers': [1]}, file_system=self._file_system)
+
+        # When / Then
+        with self.assertRaises(InvalidHookEventError):
+            pipeline.add_hook("on_magic", lambda **context: None)
+
+    def test_06_a_pipeline_runs_progress_hooks_for_the_progress_reported_by_a_step(self):
+        # Given
+        pipeline = CIPipe({'numbers': [1]}, file_system=self._file_system)
+        pipeline.add_hook(HookRegistry.ON_PROGRESS, lambda pipeline, step_name, ids, done, total:
+                          self._events.append((step_name, ids, done, total)))
+
+        # When
+        pipeline.step("Report progress", self._report_half_done(pipeline))
+
+        # Then
+        ids = pipeline.output('numbers')[0]['ids']
+        self.assertEqual(self._events, [("Report progress", ids, 1, 2)])
+
+    def test_07_a_pipeline_runs_post_step_hooks_with_the_error_of_a_failed_step(self):
+        # Given
+        pipeline = CIPipe({'numbers': [1]}, file_system=self._file_system)
+        pipeline.add_hook(HookRegistry.POST_STEP, lambda step, error, **context: self._events.append((step, error)))
+
+        # When
+        with self.assertRaises(ZeroDivisionError):
+            pipeline.step("Divide by zero", self._divide_by_zero)
+
+        # Then
+        (step, error), = self._events
+        self.assertIsNone(step)
+        self.assertIsInstance(error, ZeroDivisionError)
+
+    def test_08_a_pipeline_runs_clean_up_hooks_once_deferred_files_are_removed(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            clean_up_mode='deferred',
+        )
+        pipeline.add_hook(HookRegistry.ON_CLEAN_UP, lambda pipeline, key, path: self._events.append(path))
+        pipeline.isx.preprocess_videos()
+        pipeline.isx.preprocess_videos()
+        self.assertEqual(self._events, [])
+
+        # When
+        pipeline.flush_clean_up()
+
+        # Then
+        self.assertEqual(self._events, [
+            'output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd',
+            'output/Main Branch - Step 1 - ISX Preprocess Videos/file2-PP.isxd',
+        ])
+
+    def _divide_by_zero(self, inputs):
+        return {'numbers': [{'ids': entry['ids'], 'value': entry['value'] / 0} for entry in inputs('numbers')]}
+
+    def _report_half_done(self, pipeline):
+        def report_half_done(inputs):
+            pipeline.report_progress(inputs('numbers')[0]['ids'], 1, 2)
+            return {}
+        return report_half_done
+
+    def _record_step_event(self, label):
+        def hook(pipeline, step_name, step_function, params, **context):
+            self._events.append((label, step_name, dict(params)))
+        return hook
+
+    def _record_step_function_name(self, step_function, **context):
+        self._events.append(step_function.__name__)
+
+    def _record_input_event(self, label):
+        def hook(pipeline, step_name, ids):
+            self._events.append((label, step_name, ids))
+        return hook
+
+    def _initialize_directory_with_two_videos(self):
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', '')
+        self._file_system.write('input_dir/file2.isxd', '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+
+from benchmarks.import_time import import_time_report
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    def test_01_importing_the_pipeline_does_not_import_heavy_dependencies(self):
+        # When
+        report = import_time_report("ci_pipe.pipeline", repeat=1)
+
+        # Then
+        self.assertEqual(report["eager_lazy_dependencies"], [])
+        self.assertIsNotNone(report["cumulative_us"])
+
+    def test_02_importing_multiple_pipelines_does_not_import_heavy_dependencies(self):
+        # When
+        report = import_time_report("ci_pipe.multi_pipeline", repeat=1)
+
+        # Then
+        self.assertEqual(report["eager_lazy_dependencies"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+
+from ci_pipe.pipeline import CIPipe
+from external_dependencies.isx.in_memory_isx import InMemoryISX
+from tests.ci_pipe_test_case import CIPipeTestCase
+
+
+class InterruptedISX(InMemoryISX):
+    def __init__(self, file_system, failing_inputs=()):
+        super().__init__(file_system)
+        self.failing_inputs = set(failing_inputs)
+        self.processed_inputs = []
+
+    def preprocess(self, input_movie_files, output_movie_files, **kwargs):
+        if input_movie_files[0] in self.failing_inputs:
+            raise RuntimeError(f"Interrupted while processing {input_movie_files[0]}")
+        super().preprocess(input_movie_files, output_movie_files, **kwargs)
+        self.processed_inputs.extend(input_movie_files)
+
+
+class InputCheckpointsTestCase(CIPipeTestCase):
+    def test_01_a_resumed_step_only_processes_the_inputs_that_did_not_finish(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        self._run_interrupted_preprocess()
+        isx = InterruptedISX(self._file_system)
+
+        # When
+        self._pipeline_with(isx).isx.preprocess_videos()
+
+        # Then
+        self.assertEqual(isx.processed_inputs, ['input_dir/file2.isxd'])
+
+    def test_02_a_resumed_step_processes_again_the_inputs_whose_outputs_changed(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        self._run_interrupted_preprocess()
+        self._file_system.write('output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd', 'corrupted')
+        isx = InterruptedISX(self._file_system)
+
+        # When
+        self._pipeline_with(isx).isx.preprocess_videos()
+
+        # Then
+        self.assertEqual(isx.processed_inputs, ['input_dir/file1.isxd', 'input_dir/file2.isxd'])
+
+    def test_03_a_resumed_step_processes_again_the_inputs_whose_outputs_are_missing(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        self._run_interrupted_preprocess()
+        self._file_system.remove('output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd')
+        isx = InterruptedISX(self._file_system)
+
+        # When
+        self._pipeline_with(isx).isx.preprocess_videos()
+
+        # Then
+        self.assertEqual(isx.processed_inputs, ['input_dir/file1.isxd', 'input_dir/file2.isxd'])
+
+    def test_04_a_completed_step_drops_its_progress_and_keeps_all_its_outputs(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        self._run_interrupted_preprocess()
+
+        # When
+        pipeline = self._pipeline_with(InterruptedISX(self._file_system))
+        pipeline.isx.preprocess_videos()
+
+        # Then
+        self.assertEqual(self._file_system.read('trace.json.progress'), '')
+        self.assertEqual(pipeline.values('videos-isxd'), [
+            'output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd',
+            'output/Main Branch - Step 1 - ISX Preprocess Videos/file2-PP.isxd',
+        ])
+
+    def test_05_a_step_with_different_params_does_not_reuse_the_progress_of_another_one(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        self._run_interrupted_preprocess()
+        isx = InterruptedISX(self._file_system)
+
+        # When
+        self._pipeline_with(isx).isx.preprocess_videos(isx_pp_temporal_downsample_factor=2)
+
+        # Then
+        self.assertEqual(isx.processed_inputs, ['input_dir/file1.isxd', 'input_dir/file2.isxd'])
+
+    def test_06_a_pipeline_without_input_checkpoints_processes_every_input_again(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        self._run_interrupted_preprocess()
+        isx = InterruptedISX(self._file_system)
+
+        # When
+        self._pipeline_with(isx, input_checkpoints_enabled=False).isx.preprocess_videos()
+
+        # Then
+        self.assertEqual(isx.processed_inputs, ['input_dir/file1.isxd', 'input_dir/file2.isxd'])
+
+    def test_07_inputs_finished_by_a_thread_pool_are_recorded_even_if_another_one_fails(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        self._run_interrupted_preprocess(defaults={"executor": "threads", "max_workers": 2})
+        isx = InterruptedISX(self._file_system)
+
+        # When
+        self._pipeline_with(isx).isx.preprocess_videos()
+
+        # Then
+        self.assertEqual(isx.processed_inputs, ['input_dir/file2.isxd'])
+
+    def test_08_input_checkpoints_are_disabled_by_default(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        self._run_interrupted_preprocess()
+        isx = InterruptedISX(self._file_system)
+
+        # When
+        CIPipe.with_videos_from_directory("input_dir", file_system=self._file_system, isx=isx).isx.preprocess_videos()
+
+        # Then
+        self.assertEqual(isx.processed_inputs, ['input_dir/file1.isxd', 'input_dir/file2.isxd'])
+
+    def _run_interrupted_preprocess(self, defaults=None):
+        isx = InterruptedISX(self._file_system, failing_inputs=['input_dir/file2.isxd'])
+        with self.assertRaises(RuntimeError):
+            self._pipeline_with(isx, defaults=defaults).isx.preprocess_videos()
+
+    def _pipeline_with(self, isx, input_checkpoints_enabled=True, defaults=None):
+        return CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=isx,
+            defaults=defaults,
+            input_checkpoints_enabled=input_checkpoints_enabled,
+        )
+
+    def _initialize_directory_with_two_videos(self):
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', '')
+        self._file_system.write('input_dir/file2.isxd', '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,13 @@
+import os
+import tempfile
 import unittest
 
+from ci_pipe.errors.invalid_copy_strategy_error import InvalidCopyStrategyError
+from ci_pipe.errors.invalid_executor_error import InvalidExecutorError
 from ci_pipe.errors.isx_backend_not_configured_error import ISXBackendNotConfiguredError
 from ci_pipe.pipeline import CIPipe
+from external_dependencies.file_system.persistent_file_system import PersistentFileSystem
+from external_dependencies.isx import module_isx
 from external_dependencies.isx.in_memory_isx import InMemoryISX
 from tests.ci_pipe_test_case import CIPipeTestCase
 
@@ -431,6 +437,144 @@ class ISXTestCase(CIPipeTestCase):
                 ),
             )
 
+    def test_15_a_pipeline_with_isx_can_run_steps_concurrently_with_same_outputs_and_trace(self):
+        # Given
+        self._initialize_directory_with_three_original_videos()
+        serial_pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            trace_path="serial_trace.json",
+            outputs_directory="output",
+        )
+        threaded_pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            trace_path="threaded_trace.json",
+            outputs_directory="output",
+            defaults={"executor": "threads", "max_workers": 3},
+        )
+
+        # When
+        for pipeline in (serial_pipeline, threaded_pipeline):
+            pipeline.isx.preprocess_videos()
+            pipeline.isx.motion_correction_videos()
+            pipeline.isx.extract_neurons_pca_ica()
+            pipeline.isx.detect_events_in_cells()
+
+        # Then
+        self._assert_output_files(
+            threaded_pipeline,
+            "events-isxd",
+            [
+                "output/Main Branch - Step 4 - ISX Detect Events In Cells/file1-PP-MC-PCA-ICA-ED.isxd",
+                "output/Main Branch - Step 4 - ISX Detect Events In Cells/file2-PP-MC-PCA-ICA-ED.isxd",
+                "output/Main Branch - Step 4 - ISX Detect Events In Cells/file3-PP-MC-PCA-ICA-ED.isxd",
+            ],
+            self._file_system,
+        )
+        self.assertEqual(serial_pipeline.trace_as_json(), threaded_pipeline.trace_as_json())
+        self.assertEqual(threaded_pipeline.defaults()["executor"], "threads")
+
+    def test_16_a_pipeline_with_an_invalid_executor_can_not_run_isx_step(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            defaults={"executor": "gpu"},
+        )
+
+        # When / Then
+        with self.assertRaises(InvalidExecutorError):
+            pipeline.isx.preprocess_videos()
+
+    def test_17_a_pipeline_with_metrics_enabled_records_step_metrics_in_trace(self):
+        # Given
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', 'abc')
+        self._file_system.write('input_dir/file2.isxd', 'defg')
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            metrics_enabled=True,
+        )
+
+        # When
+        pipeline.isx.preprocess_videos()
+
+        # Then
+        metrics = pipeline.trace_as_json()["Main Branch"]["steps"][0]["metrics"]
+        self.assertGreaterEqual(metrics["wall_time"], 0)
+        self.assertGreaterEqual(metrics["cpu_time"], 0)
+        self.assertEqual(metrics["bytes_read"], 7)
+        self.assertEqual(metrics["bytes_written"], 0)
+        self.assertEqual(
+            [input_metrics["ids"] for input_metrics in metrics["inputs"]],
+            [entry["ids"] for entry in pipeline.output("videos-isxd")],
+        )
+
+    def test_18_a_pipeline_copies_cellsets_for_auto_accept_reject_cells_instead_of_hardlinking_them(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            defaults={"copy_strategy": "hardlink"},
+            auto_clean_up_enabled=False,
+        )
+        pipeline.isx.extract_neurons_pca_ica()
+        pipeline.isx.detect_events_in_cells()
+        original_cellsets = pipeline.values('cellsets-isxd')
+
+        # When
+        pipeline.isx.auto_accept_reject_cells()
+
+        # Then
+        trace = pipeline.trace_as_json()
+        self.assertEqual(trace["pipeline"]["defaults"]["copy_strategy"], "hardlink")
+        self.assertEqual(trace["Main Branch"]["steps"][2]["copy_strategies"], ["copy"])
+        for original_cellset, cellset in zip(original_cellsets, pipeline.values('cellsets-isxd')):
+            self.assertIsNot(self._file_system.files[cellset], self._file_system.files[original_cellset])
+
+    def test_19_a_pipeline_reports_the_copy_strategy_it_fell_back_to(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            defaults={"copy_strategy": "reflink"},
+        )
+        pipeline.isx.extract_neurons_pca_ica()
+        pipeline.isx.detect_events_in_cells()
+
+        # When
+        pipeline.isx.auto_accept_reject_cells()
+
+        # Then
+        self.assertEqual(pipeline.trace_as_json()["Main Branch"]["steps"][2]["copy_strategies"], ["copy"])
+
+    def test_20_a_pipeline_with_an_invalid_copy_strategy_can_not_copy_files(self):
+        # Given
+        self._initialize_directory_with_two_videos()
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            defaults={"copy_strategy": "teleport"},
+        )
+        pipeline.isx.extract_neurons_pca_ica()
+        pipeline.isx.detect_events_in_cells()
+
+        # When / Then
+        with self.assertRaises(InvalidCopyStrategyError):
+            pipeline.isx.auto_accept_reject_cells()
+
     def _assert_output_files(self, pipeline, key, expected_paths, file_system):
         output = pipeline.output(key)
         self.assertEqual(len(output), len(expected_paths))
@@ -438,6 +582,37 @@ class ISXTestCase(CIPipeTestCase):
             self.assertEqual(output[i]['value'], expected)
             self.assertTrue(file_system.exists(expected))
 
+    def test_21_a_pipeline_with_a_module_isx_backend_can_run_steps_in_worker_processes(self):
+        # Given
+        with tempfile.TemporaryDirectory() as directory:
+            input_dir = os.path.join(directory, "input_dir")
+            os.makedirs(input_dir)
+            for name in ("file1.isxd", "file2.isxd"):
+                open(os.path.join(input_dir, name), "w").close()
+            pipeline = CIPipe.with_videos_from_directory(
+                input_dir,
+                file_system=PersistentFileSystem(),
+                isx=module_isx,
+                outputs_directory=os.path.join(directory, "output"),
+                trace_path=os.path.join(directory, "trace.json"),
+                defaults={"executor": "processes", "max_workers": 2},
+            )
+
+            # When
+            pipeline.isx.preprocess_videos()
+            pipeline.isx.motion_correction_videos()
+
+            # Then
+            self.assertEqual(
+                [os.path.relpath(path, directory) for path in pipeline.values("videos-isxd")],
+                [
+                    "output/Main Branch - Step 2 - ISX Motion Correction Videos/file1-PP-MC.isxd",
+                    "output/Main Branch - Step 2 - ISX Motion Correction Videos/file2-PP-MC.isxd",
+                ],
+            )
+            for key in ("videos-isxd", "motion-correction-translations", "motion-correction-mean-images"):
+                self.assertTrue(all(os.path.exists(path) for path in pipeline.values(key)))
+
     def _initialize_directory_with_two_videos(self):
         self._file_system.makedirs('input_dir')
         self._file_system.write('input_dir/file1.isxd', '')
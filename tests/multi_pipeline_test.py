@@ -1,6 +1,13 @@
 import unittest
 
+from ci_pipe.cache.step_cache import StepCache
+from ci_pipe.errors.invalid_executor_error import InvalidExecutorError
+from ci_pipe.errors.isx_backend_not_configured_error import ISXBackendNotConfiguredError
+from ci_pipe.errors.pipelines_execution_error import PipelinesExecutionError
 from ci_pipe.multi_pipeline import MultiCIPipe
+from ci_pipe.utils.executor import Executor
+from ci_pipe.utils.hook_registry import HookRegistry
+from external_dependencies.caiman.in_memory_caiman import InMemoryCaiman
 from external_dependencies.isx.in_memory_isx import InMemoryISX
 from tests.ci_pipe_test_case import CIPipeTestCase
 
@@ -125,8 +132,123 @@ class MultiPipelineTestCase(CIPipeTestCase):
         # Then
         values = multi_pipe.values('videos-isxd')
         self.assertCountEqual(values, ['input_dir/pipeline1/file1.isxd', 'input_dir/pipeline2/file2.isxd'])
-    
-        
+
+
+    def test_07_multi_pipeline_can_run_module_calls_concurrently(self):
+        # Given
+        self._initialize_directory_with_three_pipelines()
+
+        # When
+        multi_pipe = MultiCIPipe(
+            'input_dir',
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            executor=Executor(Executor.THREADS, max_workers=3),
+        )
+        multi_pipe.isx.preprocess_videos()
+
+        # Then
+        for name in ('pipeline1', 'pipeline2', 'pipeline3'):
+            self.assertTrue(self._file_system.exists(
+                f'output/{name}/Main Branch - Step 1 - ISX Preprocess Videos/{name}-file-PP.isxd'))
+        self.assertEqual(multi_pipe.branch("Second branch").executor().executor_type(), Executor.THREADS)
+
+    def test_08_multi_pipeline_aggregates_errors_per_pipeline(self):
+        # Given
+        self._initialize_directory_with_three_pipelines()
+        multi_pipe = MultiCIPipe(
+            'input_dir',
+            file_system=self._file_system,
+            executor=Executor(Executor.THREADS),
+        )
+
+        # When / Then
+        with self.assertRaises(PipelinesExecutionError) as context:
+            multi_pipe.isx.preprocess_videos()
+        self.assertCountEqual(context.exception.errors.keys(), ['pipeline1', 'pipeline2', 'pipeline3'])
+        self.assertIsInstance(context.exception.errors['pipeline1'], ISXBackendNotConfiguredError)
+
+    def test_09_multi_pipeline_can_not_use_a_process_executor(self):
+        # Given
+        self._initialize_directory_with_three_pipelines()
+
+        # When / Then
+        with self.assertRaises(InvalidExecutorError):
+            MultiCIPipe(
+                'input_dir',
+                file_system=self._file_system,
+                executor=Executor(Executor.PROCESSES),
+            )
+
+    def test_10_multi_pipeline_shares_a_single_caiman_cluster_between_its_pipelines(self):
+        # Given
+        self._file_system.makedirs('input_dir')
+        for name in ('pipeline1', 'pipeline2'):
+            self._file_system.makedirs(f'input_dir/{name}')
+            self._file_system.write(f'input_dir/{name}/{name}-file.tiff', '')
+        caiman = InMemoryCaiman(self._file_system)
+        multi_pipe = MultiCIPipe('input_dir', file_system=self._file_system, caiman=caiman)
+
+        # When
+        multi_pipe.start_caiman_cluster()
+        multi_pipe.caiman.motion_correction()
+        multi_pipe.shutdown_caiman_cluster()
+
+        # Then
+        started_cluster, = caiman.cluster.started_clusters
+        self.assertTrue(started_cluster.terminated)
+        self.assertIs(multi_pipe.pipeline('pipeline1').caiman_cluster(), multi_pipe.pipeline('pipeline2').caiman_cluster())
+
+    def test_11_a_serial_multi_pipeline_stops_at_the_first_error_and_raises_it(self):
+        # Given
+        self._initialize_directory_with_three_pipelines()
+        multi_pipe = MultiCIPipe('input_dir', file_system=self._file_system)
+        visited_pipelines = []
+
+        def failing_action(pipeline):
+            visited_pipelines.append(pipeline)
+            raise ValueError("step failed")
+
+        # When / Then
+        with self.assertRaises(ValueError):
+            multi_pipe.with_pipelines_do(failing_action)
+        self.assertEqual(len(visited_pipelines), 1)
+
+    def test_12_multi_pipeline_forwards_the_pipeline_options_to_every_pipeline(self):
+        # Given
+        self._initialize_directory_with_three_pipelines()
+        hooks = HookRegistry()
+        step_metrics = []
+        hooks.register(HookRegistry.POST_STEP, lambda step, **context: step_metrics.append(step.metrics()))
+        counted_pipelines = []
+
+        def count_videos(inputs):
+            counted_pipelines.append(inputs('videos-isxd')[0]['value'])
+            return {'videos-count': [{'ids': inputs('videos-isxd')[0]['ids'], 'value': len(inputs('videos-isxd'))}]}
+
+        multi_pipe = MultiCIPipe(
+            'input_dir',
+            file_system=self._file_system,
+            hooks=hooks,
+            step_cache=StepCache(self._file_system, 'cache'),
+            metrics_enabled=True,
+        )
+
+        # When
+        multi_pipe.with_pipelines_do(lambda pipeline: pipeline.step("Count videos", count_videos))
+        multi_pipe.with_pipelines_do(lambda pipeline: pipeline.step("Count videos", count_videos))
+
+        # Then
+        self.assertEqual(len(counted_pipelines), 3)
+        self.assertEqual(len(step_metrics), 6)
+        self.assertEqual([metrics['cached'] for metrics in step_metrics], [False] * 3 + [True] * 3)
+        self.assertIs(multi_pipe.pipeline('pipeline1').hooks(), hooks)
+
+    def _initialize_directory_with_three_pipelines(self):
+        self._file_system.makedirs('input_dir')
+        for name in ('pipeline1', 'pipeline2', 'pipeline3'):
+            self._file_system.makedirs(f'input_dir/{name}')
+            self._file_system.write(f'input_dir/{name}/{name}-file.isxd', '')
 
 
 if __name__ == '__main__':
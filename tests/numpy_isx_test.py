@@ -0,0 +1,525 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import numpy
+from numpy.lib.format import open_memmap
+
+from ci_pipe.pipeline import CIPipe
+from external_dependencies.file_system.persistent_file_system import PersistentFileSystem
+from external_dependencies.isx.in_memory_isx import InMemoryISX
+from external_dependencies.isx.numpy_isx import NumpyISX, PercentileSketch
+
+
+class NumpyISXTestCase(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        random = numpy.random.default_rng(0)
+        self._frames = random.uniform(1, 10, size=(12, 3, 4)).astype(numpy.float32)
+
+    def test_01_dff_normalizes_each_frame_by_the_mean_of_its_pixels(self):
+        # Given
+        input_path = self._write_movie('movie.isxd', self._frames)
+        output_path = self._path('movie-DFF.isxd')
+
+        # When
+        NumpyISX(chunk_frames=5).dff([input_path], [output_path], f0_type='mean')
+
+        # Then
+        f0 = self._frames.astype(numpy.float64).mean(axis=0)
+        numpy.testing.assert_allclose(numpy.load(output_path), (self._frames - f0) / f0, rtol=1e-5)
+
+    def test_02_dff_can_normalize_by_the_minimum_of_each_pixel(self):
+        # Given
+        input_path = self._write_movie('movie.isxd', self._frames)
+        output_path = self._path('movie-DFF.isxd')
+
+        # When
+        NumpyISX(chunk_frames=5).dff([input_path], [output_path], f0_type='min')
+
+        # Then
+        f0 = self._frames.min(axis=0)
+        numpy.testing.assert_allclose(numpy.load(output_path), (self._frames - f0) / f0, rtol=1e-5)
+
+    def test_03_dff_computes_f0_over_all_the_movies_of_a_series(self):
+        # Given
+        first_path = self._write_movie('first.isxd', self._frames[:7])
+        second_path = self._write_movie('second.isxd', self._frames[7:])
+        output_paths = [self._path('first-DFF.isxd'), self._path('second-DFF.isxd')]
+
+        # When
+        NumpyISX(chunk_frames=4).dff([first_path, second_path], output_paths, f0_type='min')
+
+        # Then
+        f0 = self._frames.min(axis=0)
+        numpy.testing.assert_allclose(numpy.load(output_paths[1]), (self._frames[7:] - f0) / f0, rtol=1e-5)
+
+    def test_04_percentile_sketch_estimates_the_percentile_of_each_pixel(self):
+        # Given
+        samples = numpy.random.default_rng(1).normal(100, 10, size=(5000, 2, 2))
+        sketch = PercentileSketch(50)
+
+        # When
+        for start in range(0, len(samples), 300):
+            sketch.update(samples[start:start + 300])
+
+        # Then
+        numpy.testing.assert_allclose(sketch.value(), numpy.percentile(samples, 50, axis=0), atol=0.5)
+
+    def test_05_percentile_sketch_is_exact_with_less_than_five_frames(self):
+        # Given
+        sketch = PercentileSketch(50)
+
+        # When
+        sketch.update(self._frames[:3])
+
+        # Then
+        numpy.testing.assert_allclose(sketch.value(), numpy.median(self._frames[:3], axis=0))
+
+    def test_06_dff_can_not_use_an_unknown_f0_type(self):
+        # Given
+        input_path = self._write_movie('movie.isxd', self._frames)
+
+        # When / Then
+        with self.assertRaises(ValueError):
+            NumpyISX().dff([input_path], [self._path('movie-DFF.isxd')], f0_type='median')
+
+    def test_07_operations_without_a_numpy_implementation_are_delegated_to_the_fallback(self):
+        # Given
+        fallback = InMemoryISX(PersistentFileSystem())
+        output_path = self._path('movie-PP.isxd')
+
+        # When
+        NumpyISX(fallback=fallback).preprocess([self._write_movie('movie.isxd', self._frames)], [output_path])
+
+        # Then
+        self.assertTrue(os.path.exists(output_path))
+        with self.assertRaises(AttributeError):
+            NumpyISX().preprocess([], [])
+
+    def test_08_a_pipeline_can_normalize_videos_with_the_numpy_backend(self):
+        # Given
+        os.makedirs(self._path('input'))
+        self._write_movie('input/movie.isxd', self._frames)
+        pipeline = CIPipe.with_videos_from_directory(
+            self._path('input'),
+            outputs_directory=self._path('output'),
+            trace_path=self._path('trace.json'),
+            file_system=PersistentFileSystem(),
+            isx=NumpyISX(),
+        )
+
+        # When
+        pipeline.isx.normalize_dff_videos()
+
+        # Then
+        output_path, = pipeline.values('videos-isxd')
+        self.assertEqual(output_path, self._path('output/Main Branch - Step 1 - ISX Normalize DFF Videos/movie-DFF.isxd'))
+        self.assertEqual(numpy.load(output_path).shape, self._frames.shape)
+
+    def test_09_spatial_filter_removes_the_frequencies_outside_the_cut_offs(self):
+        # Given
+        rows, columns = numpy.mgrid[0:16, 0:16]
+        slow_wave = numpy.cos(2 * numpy.pi * rows / 16)
+        fast_wave = numpy.cos(2 * numpy.pi * 4 * columns / 16)
+        frames = numpy.stack([5 + slow_wave + fast_wave] * 6).astype(numpy.float32)
+        input_path = self._write_movie('movie.isxd', frames)
+        output_path = self._path('movie-BP.isxd')
+
+        # When
+        NumpyISX(chunk_frames=4).spatial_filter(
+            [input_path], [output_path], low_cutoff=0.1, high_cutoff=0.5, subtract_global_minimum=False)
+
+        # Then
+        numpy.testing.assert_allclose(numpy.load(output_path), numpy.stack([fast_wave] * 6), atol=1e-5)
+
+    def test_10_spatial_filter_can_retain_the_mean_of_each_frame(self):
+        # Given
+        input_path = self._write_movie('movie.isxd', self._frames)
+        output_path = self._path('movie-BP.isxd')
+
+        # When
+        NumpyISX(chunk_frames=5).spatial_filter(
+            [input_path], [output_path], low_cutoff=0.2, high_cutoff=0.5, retain_mean=True,
+            subtract_global_minimum=False)
+
+        # Then
+        numpy.testing.assert_allclose(
+            numpy.load(output_path).mean(axis=(1, 2)), self._frames.mean(axis=(1, 2)), rtol=1e-5)
+
+    def test_11_spatial_filter_subtracts_the_global_minimum_of_all_the_movies(self):
+        # Given
+        first_path = self._write_movie('first.isxd', self._frames[:7])
+        second_path = self._write_movie('second.isxd', self._frames[7:])
+        output_paths = [self._path('first-BP.isxd'), self._path('second-BP.isxd')]
+
+        # When
+        NumpyISX(chunk_frames=3).spatial_filter([first_path, second_path], output_paths)
+
+        # Then
+        outputs = [numpy.load(output_path) for output_path in output_paths]
+        self.assertAlmostEqual(min(output.min() for output in outputs), 0.0, places=5)
+        self.assertTrue(all(output.min() >= 0 for output in outputs))
+
+    def test_12_project_movie_writes_the_statistic_of_each_pixel(self):
+        # Given
+        input_path = self._write_movie('movie.isxd', self._frames)
+
+        # When
+        for stat_type in NumpyISX.STAT_TYPES:
+            NumpyISX(chunk_frames=5).project_movie([input_path], self._path(f'{stat_type}.isxd'), stat_type=stat_type)
+
+        # Then
+        for stat_type, expected in [('mean', self._frames.mean(axis=0)), ('min', self._frames.min(axis=0)),
+                                    ('max', self._frames.max(axis=0)), ('standard_deviation', self._frames.std(axis=0))]:
+            numpy.testing.assert_allclose(numpy.load(self._path(f'{stat_type}.isxd')), expected, rtol=1e-4)
+
+    def test_13_motion_correct_aligns_the_frames_and_writes_translations_and_crop_rect(self):
+        # Given
+        input_path = self._write_movie('movie.isxd', self._shifted_frames([(0, 0), (2, -3), (-4, 1), (5, 5)]))
+        output_path, translations_path, crop_rect_path = [
+            self._path(name) for name in ('movie-MC.isxd', 'movie-translations.csv', 'movie-crop-rect.csv')]
+
+        # When
+        NumpyISX(chunk_frames=3).motion_correct(
+            [input_path], [output_path], max_translation=10, output_translation_files=[translations_path],
+            output_crop_rect_file=crop_rect_path)
+
+        # Then
+        output = numpy.load(output_path)
+        self.assertEqual(output.shape, (4, 55, 56))
+        numpy.testing.assert_allclose(output, numpy.stack([output[0]] * 4))
+        with open(translations_path) as translations_file:
+            self.assertEqual(translations_file.read().splitlines(), [
+                'x_translation,y_translation,time', '0,0,0.0', '3,-2,0.05', '-1,4,0.1', '-5,-5,0.15'])
+        with open(crop_rect_path) as crop_rect_file:
+            self.assertEqual(crop_rect_file.read().strip(), '3,4,56,55')
+
+    def test_14_motion_correct_can_preserve_the_input_dimensions(self):
+        # Given
+        input_path = self._write_movie('movie.isxd', self._shifted_frames([(0, 0), (2, -3)]))
+        output_path = self._path('movie-MC.isxd')
+
+        # When
+        NumpyISX().motion_correct([input_path], [output_path], preserve_input_dimensions=True,
+                                  output_crop_rect_file=self._path('movie-crop-rect.csv'))
+
+        # Then
+        self.assertEqual(numpy.load(output_path).shape, (2, 64, 64))
+        with open(self._path('movie-crop-rect.csv')) as crop_rect_file:
+            self.assertEqual(crop_rect_file.read().strip(), '0,0,64,64')
+
+    def test_15_motion_correct_does_not_translate_frames_further_than_max_translation(self):
+        # Given
+        input_path = self._write_movie('movie.isxd', self._shifted_frames([(0, 0), (8, 0)]))
+
+        # When
+        NumpyISX().motion_correct([input_path], [self._path('movie-MC.isxd')], max_translation=4,
+                                  output_translation_files=[self._path('movie-translations.csv')])
+
+        # Then
+        with open(self._path('movie-translations.csv')) as translations_file:
+            x_translation, y_translation, _ = translations_file.read().splitlines()[2].split(',')
+        self.assertEqual(int(x_translation), 0)
+        self.assertLessEqual(abs(int(y_translation)), 4)
+
+    def test_16_a_pipeline_can_motion_correct_videos_with_the_numpy_backend(self):
+        # Given
+        os.makedirs(self._path('input'))
+        self._write_movie('input/movie.isxd', self._shifted_frames([(0, 0), (2, -3), (-4, 1)]))
+        pipeline = CIPipe.with_videos_from_directory(
+            self._path('input'),
+            outputs_directory=self._path('output'),
+            trace_path=self._path('trace.json'),
+            file_system=PersistentFileSystem(),
+            isx=NumpyISX(),
+        )
+
+        # When
+        pipeline.isx.motion_correction_videos()
+
+        # Then
+        for key in ('videos-isxd', 'motion-correction-translations', 'motion-correction-crop-rect',
+                    'motion-correction-mean-images'):
+            output_path, = pipeline.values(key)
+            self.assertTrue(os.path.exists(output_path))
+
+    def test_17_event_detection_finds_the_peaks_above_the_noise_of_every_cell(self):
+        # Given
+        traces = self._noisy_traces(cells=3, frames=200)
+        traces[0, [50, 120]] += 20
+        traces[2, 80] += 20
+        cell_set_path = self._write_cell_set('cells.isxd', traces)
+
+        # When
+        NumpyISX().event_detection(
+            [cell_set_path], [self._path('events.isxd')], event_time_ref='maximum')
+
+        # Then
+        event_set = NumpyISX().EventSet.read(self._path('events.isxd'))
+        self.assertEqual(event_set.num_cells, 3)
+        numpy.testing.assert_allclose(event_set.get_cell_data(0)[0], [5e6, 12e6])
+        self.assertEqual(len(event_set.get_cell_data(1)[0]), 0)
+        numpy.testing.assert_allclose(event_set.get_cell_data(2)[1], [traces[2, 80]])
+
+    def test_18_event_detection_keeps_only_the_highest_peak_within_tau(self):
+        # Given
+        traces = self._noisy_traces(cells=1, frames=200)
+        traces[0, 50] += 20
+        traces[0, 52] += 25
+        traces[0, 90] += 20
+        cell_set_path = self._write_cell_set('cells.isxd', traces)
+
+        # When
+        NumpyISX().event_detection(
+            [cell_set_path], [self._path('events.isxd')], tau=0.5, event_time_ref='maximum')
+
+        # Then
+        offsets, _ = NumpyISX().EventSet.read(self._path('events.isxd')).get_cell_data(0)
+        numpy.testing.assert_allclose(offsets, [5.2e6, 9e6])
+
+    def test_19_event_detection_can_place_events_at_the_beginning_of_their_rise(self):
+        # Given
+        traces = self._noisy_traces(cells=1, frames=200)
+        traces[0, 60:64] += [10, 15, 20, 8]
+        cell_set_path = self._write_cell_set('cells.isxd', traces)
+
+        # When
+        NumpyISX().event_detection(
+            [cell_set_path], [self._path('events.isxd')], event_time_ref='beginning')
+
+        # Then
+        offsets, _ = NumpyISX().EventSet.read(self._path('events.isxd')).get_cell_data(0)
+        numpy.testing.assert_allclose(offsets, [6e6])
+
+    def test_20_event_detection_can_include_negative_transients_and_skip_cells_not_accepted(self):
+        # Given
+        traces = self._noisy_traces(cells=2, frames=200)
+        traces[:, 40] += 20
+        traces[:, 100] -= 20
+        cell_set_path = self._write_cell_set('cells.isxd', traces, statuses=['accepted', 'rejected'])
+
+        # When
+        NumpyISX().event_detection(
+            [cell_set_path], [self._path('events.isxd')], event_time_ref='maximum',
+            ignore_negative_transients=False, accepted_cells_only=True)
+
+        # Then
+        event_set = NumpyISX().EventSet.read(self._path('events.isxd'))
+        offsets, amplitudes = event_set.get_cell_data(0)
+        numpy.testing.assert_allclose(offsets, [4e6, 10e6])
+        self.assertTrue(amplitudes[0] > 0 > amplitudes[1])
+        self.assertEqual(len(event_set.get_cell_data(1)[0]), 0)
+
+    def test_21_a_pipeline_can_detect_events_with_the_numpy_backend(self):
+        # Given
+        traces = self._noisy_traces(cells=2, frames=100)
+        pipeline = CIPipe(
+            {'cellsets-isxd': [self._write_cell_set('cells.isxd', traces)]},
+            outputs_directory=self._path('output'),
+            trace_path=self._path('trace.json'),
+            file_system=PersistentFileSystem(),
+            isx=NumpyISX(),
+        )
+
+        # When
+        pipeline.isx.detect_events_in_cells()
+
+        # Then
+        output_path, = pipeline.values('events-isxd')
+        self.assertEqual(NumpyISX().EventSet.read(output_path).num_cells, 2)
+
+    def test_22_pca_ica_extracts_the_image_and_trace_of_every_cell(self):
+        # Given
+        frames, cell_centers, cell_traces = self._movie_with_cells()
+        input_path = self._write_movie('movie.isxd', frames)
+
+        # When
+        NumpyISX().pca_ica([input_path], [self._path('cells.isxd')], num_pcs=5, num_ics=5, block_size=128)
+
+        # Then
+        cell_set = NumpyISX().CellSet.read(self._path('cells.isxd'))
+        self.assertEqual(cell_set.num_cells, 5)
+        found_centers = [numpy.unravel_index(image.argmax(), image.shape) for image in cell_set.images]
+        self.assertCountEqual([tuple(int(c) for c in center) for center in found_centers], cell_centers)
+        for center, trace in zip(found_centers, cell_set.traces):
+            expected_trace = cell_traces[cell_centers.index(tuple(int(c) for c in center))]
+            self.assertGreater(numpy.corrcoef(trace, expected_trace)[0, 1], 0.95)
+
+    def test_23_pca_ica_shares_the_cells_of_a_series_and_splits_their_traces_per_movie(self):
+        # Given
+        frames, _, _ = self._movie_with_cells()
+        first_path = self._write_movie('first.isxd', frames[:400])
+        second_path = self._write_movie('second.isxd', frames[400:])
+        output_paths = [self._path('first-cells.isxd'), self._path('second-cells.isxd')]
+
+        # When
+        NumpyISX().pca_ica([first_path, second_path], output_paths, num_pcs=5, num_ics=5, block_size=128)
+
+        # Then
+        first_cell_set, second_cell_set = [NumpyISX().CellSet.read(path) for path in output_paths]
+        numpy.testing.assert_array_equal(first_cell_set.images, second_cell_set.images)
+        self.assertEqual(first_cell_set.traces.shape, (5, 400))
+        self.assertEqual(second_cell_set.traces.shape, (5, 200))
+
+    def test_24_pca_ica_can_estimate_the_number_of_cells_from_their_diameter(self):
+        # Given
+        frames, _, _ = self._movie_with_cells()
+        input_path = self._write_movie('movie.isxd', frames)
+
+        # When
+        NumpyISX().pca_ica([input_path], [self._path('cells.isxd')], num_pcs=8, num_ics=120,
+                           auto_estimate_num_ics=True, average_cell_diameter=13)
+
+        # Then
+        self.assertEqual(NumpyISX().CellSet.read(self._path('cells.isxd')).num_cells, 7)
+
+    def test_25_a_pipeline_can_extract_cells_and_detect_their_events_with_the_numpy_backend(self):
+        # Given
+        os.makedirs(self._path('input'))
+        self._write_movie('input/movie.isxd', self._movie_with_cells()[0])
+        pipeline = CIPipe.with_videos_from_directory(
+            self._path('input'),
+            outputs_directory=self._path('output'),
+            trace_path=self._path('trace.json'),
+            file_system=PersistentFileSystem(),
+            isx=NumpyISX(),
+        )
+
+        # When
+        pipeline.isx.extract_neurons_pca_ica(isx_pca_ica_num_pcs=5, isx_pca_ica_num_ics=5)
+        pipeline.isx.detect_events_in_cells()
+
+        # Then
+        cell_set_path, = pipeline.values('cellsets-isxd')
+        event_set_path, = pipeline.values('events-isxd')
+        self.assertEqual(NumpyISX().CellSet.read(cell_set_path).num_cells, 5)
+        self.assertEqual(NumpyISX().EventSet.read(event_set_path).num_cells, 5)
+
+    def test_26_movies_and_cell_sets_of_the_fallback_are_read_through_its_api(self):
+        # Given
+        fallback = InMemoryISX(PersistentFileSystem())
+        numpy_isx = NumpyISX(fallback=fallback)
+        numpy_isx.preprocess([self._write_movie('movie.isxd', self._frames)], [self._path('movie-PP.isxd')])
+        fallback.pca_ica([self._path('movie-PP.isxd')], [self._path('movie-PCA-ICA.isxd')], 4)
+
+        # When
+        numpy_isx.spatial_filter([self._path('movie-PP.isxd')], [self._path('movie-BP.isxd')],
+                                 subtract_global_minimum=False)
+        numpy_isx.event_detection([self._path('movie-PCA-ICA.isxd')], [self._path('movie-ED.isxd')])
+
+        # Then
+        self.assertEqual(numpy.load(self._path('movie-BP.isxd')).shape, (3, 2, 2))
+        self.assertEqual(NumpyISX().EventSet.read(self._path('movie-ED.isxd')).num_cells, 1)
+
+    def test_27_inputs_that_are_not_numpy_files_need_a_fallback_to_be_read(self):
+        # Given
+        with open(self._path('movie.isxd'), 'w') as movie_file:
+            movie_file.write('not a numpy movie')
+
+        # When / Then
+        with self.assertRaises(ValueError):
+            NumpyISX().dff([self._path('movie.isxd')], [self._path('movie-DFF.isxd')])
+
+    def test_28_pca_ica_stores_the_sampling_period_of_the_movies_in_the_cell_sets(self):
+        # Given
+        frames, _, _ = self._movie_with_cells()
+        input_path = self._write_movie('movie.isxd', frames[:100])
+
+        # When
+        NumpyISX(frame_rate=10).pca_ica([input_path], [self._path('cells.isxd')], num_pcs=5, num_ics=5)
+
+        # Then
+        self.assertEqual(NumpyISX().CellSet.read(self._path('cells.isxd')).period, 0.1)
+
+    def test_29_motion_correct_times_the_translations_with_the_timing_of_the_movie(self):
+        # Given
+        fallback = InMemoryISX(PersistentFileSystem())
+        fallback.preprocess([], [self._path('movie-PP.isxd')])
+
+        # When
+        NumpyISX(fallback=fallback).motion_correct(
+            [self._path('movie-PP.isxd')], [self._path('movie-MC.isxd')],
+            output_translation_files=[self._path('translations.csv')])
+
+        # Then
+        with open(self._path('translations.csv'), newline='') as translations_file:
+            times = [float(row['time']) for row in csv.DictReader(translations_file)]
+        numpy.testing.assert_allclose(times, [0, 0.05, 0.1])
+
+    def test_30_pca_ica_extracts_every_cell_with_each_unmix_type(self):
+        # Given
+        frames, cell_centers, _ = self._movie_with_cells()
+        input_path = self._write_movie('movie.isxd', frames)
+
+        for unmix_type in NumpyISX.UNMIX_TYPES:
+            with self.subTest(unmix_type=unmix_type):
+                # When
+                NumpyISX().pca_ica([input_path], [self._path('cells.isxd')], num_pcs=10, num_ics=5,
+                                   unmix_type=unmix_type, ica_temporal_weight=0.5)
+
+                # Then
+                images = NumpyISX().CellSet.read(self._path('cells.isxd')).images
+                found_centers = [numpy.unravel_index(image.argmax(), image.shape) for image in images]
+                self.assertCountEqual([tuple(int(c) for c in center) for center in found_centers], cell_centers)
+
+    def test_31_motion_correct_times_the_translations_of_each_movie_with_its_own_timing(self):
+        # Given
+        fallback = InMemoryISX(PersistentFileSystem())
+        fallback.preprocess([], [self._path('movie2-PP.isxd')])
+        self._write_movie('movie1.isxd', numpy.ones((3, 2, 2), dtype=numpy.float32))
+
+        # When
+        NumpyISX(frame_rate=10, fallback=fallback).motion_correct(
+            [self._path('movie1.isxd'), self._path('movie2-PP.isxd')],
+            [self._path('movie1-MC.isxd'), self._path('movie2-MC.isxd')],
+            output_translation_files=[self._path('translations1.csv'), self._path('translations2.csv')])
+
+        # Then
+        for name, expected_times in (('translations1.csv', [0, 0.1, 0.2]), ('translations2.csv', [0, 0.05, 0.1])):
+            with open(self._path(name), newline='') as translations_file:
+                times = [float(row['time']) for row in csv.DictReader(translations_file)]
+            numpy.testing.assert_allclose(times, expected_times)
+
+    def _path(self, name):
+        return os.path.join(self._directory.name, name)
+
+    def _shifted_frames(self, shifts):
+        # A smooth image, so its bandpassed versions still have a clear correlation peak
+        noise = numpy.random.default_rng(2).normal(size=(64, 64))
+        low_frequencies = numpy.hypot(numpy.fft.fftfreq(64)[:, numpy.newaxis], numpy.fft.rfftfreq(64)) < 0.1
+        image = numpy.fft.irfft2(numpy.fft.rfft2(noise) * low_frequencies, s=(64, 64)) + 5
+        return numpy.stack([numpy.roll(image, shift, axis=(0, 1)) for shift in shifts]).astype(numpy.float32)
+
+    def _movie_with_cells(self):
+        # Five gaussian cells with sparse decaying transients, plus a little noise
+        random = numpy.random.default_rng(4)
+        rows, columns = numpy.mgrid[0:32, 0:32]
+        cell_centers = [(8, 8), (8, 24), (24, 8), (24, 24), (16, 16)]
+        images = numpy.stack([numpy.exp(-((rows - row) ** 2 + (columns - column) ** 2) / 8)
+                              for row, column in cell_centers])
+        cell_traces = numpy.zeros((5, 600))
+        for cell_trace in cell_traces:
+            for start in random.choice(590, 15, replace=False):
+                cell_trace[start:start + 10] += 3 * numpy.exp(-numpy.arange(10) / 3)
+        frames = numpy.einsum('ct,chw->thw', cell_traces, images) + random.normal(0, 0.05, size=(600, 32, 32))
+        return frames.astype(numpy.float32), cell_centers, cell_traces
+
+    def _noisy_traces(self, cells, frames):
+        return numpy.random.default_rng(3).normal(0, 1, size=(cells, frames))
+
+    def _write_cell_set(self, name, traces, statuses=None, period=0.1):
+        NumpyISX().CellSet.write(self._path(name), numpy.zeros((len(traces), 4, 4)), traces, period, statuses)
+        return self._path(name)
+
+    def _write_movie(self, name, frames):
+        movie = open_memmap(self._path(name), mode='w+', dtype=frames.dtype, shape=frames.shape)
+        movie[:] = frames
+        movie.flush()
+        return self._path(name)
+
+
+if __name__ == '__main__':
+    unittest.main()
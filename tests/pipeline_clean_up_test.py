@@ -1,9 +1,17 @@
 import unittest
+from unittest import mock
 
 from ci_pipe.pipeline import CIPipe
 from tests.ci_pipe_test_case import CIPipeTestCase
+from external_dependencies.file_system.in_memory_file_system import InMemoryFileSystem
 from external_dependencies.isx.in_memory_isx import InMemoryISX
 
+
+class ReadOnlyInMemoryFileSystem(InMemoryFileSystem):
+    def remove(self, path):
+        raise PermissionError(f"Permission denied: {path}")
+
+
 class PipelineCleanUpTestCase(CIPipeTestCase):
     def test_01_clean_up_after_key_reutilization(self):
         # Given
@@ -164,6 +172,187 @@ class PipelineCleanUpTestCase(CIPipeTestCase):
         )
         self.assertTrue(self._file_system.exists('input_dir/file1.isxd'))
 
+    def test_06_clean_up_keeps_outputs_inherited_by_a_branch_without_steps(self):
+        # Given
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', '')
+        pipeline_input = 'input_dir'
+        pipeline = CIPipe.with_videos_from_directory(
+            pipeline_input,
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+        )
+        pipeline.isx.preprocess_videos()
+        branched_pipeline = pipeline.branch('Branch 2')
+
+        # When
+        pipeline.isx.preprocess_videos()
+
+        # Then
+        self._assert_output_files(
+            branched_pipeline,
+            'videos-isxd',
+            [
+                'output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd',
+            ],
+            self._file_system,
+        )
+
+    def test_07_manual_clean_up_removes_all_old_values(self):
+        # Given
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', '')
+        pipeline_input = 'input_dir'
+        pipeline = CIPipe.with_videos_from_directory(
+            pipeline_input,
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            auto_clean_up_enabled=False,
+        )
+        pipeline.isx.preprocess_videos()
+        pipeline.isx.preprocess_videos()
+        pipeline.isx.preprocess_videos()
+
+        # When
+        pipeline.clean_up_all()
+
+        # Then
+        self.assertFalse(self._file_system.exists('output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd'))
+        self.assertFalse(self._file_system.exists('output/Main Branch - Step 2 - ISX Preprocess Videos/file1-PP-PP.isxd'))
+        self._assert_output_files(
+            pipeline,
+            'videos-isxd',
+            [
+                'output/Main Branch - Step 3 - ISX Preprocess Videos/file1-PP-PP-PP.isxd',
+            ],
+            self._file_system,
+        )
+
+    def test_08_deferred_clean_up_removes_old_values_when_flushed(self):
+        # Given
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', '')
+        pipeline = CIPipe.with_videos_from_directory(
+            'input_dir',
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            clean_up_mode='deferred',
+        )
+        pipeline.isx.preprocess_videos()
+        pipeline.isx.preprocess_videos()
+        self.assertTrue(self._file_system.exists('output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd'))
+
+        # When
+        pipeline.flush_clean_up()
+
+        # Then
+        self.assertFalse(self._file_system.exists('output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd'))
+        self.assertTrue(self._file_system.exists('output/Main Branch - Step 2 - ISX Preprocess Videos/file1-PP-PP.isxd'))
+
+    def test_09_background_clean_up_removes_old_values(self):
+        # Given
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', '')
+        pipeline = CIPipe.with_videos_from_directory(
+            'input_dir',
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            clean_up_mode='background',
+        )
+
+        # When
+        pipeline.isx.preprocess_videos()
+        pipeline.isx.preprocess_videos()
+        pipeline.flush_clean_up()
+
+        # Then
+        self.assertFalse(self._file_system.exists('output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd'))
+        self.assertTrue(self._file_system.exists('output/Main Branch - Step 2 - ISX Preprocess Videos/file1-PP-PP.isxd'))
+
+    def test_10_clean_up_removal_failures_are_recorded_in_trace_when_flushed(self):
+        # Given
+        file_system = ReadOnlyInMemoryFileSystem()
+        file_system.makedirs('input_dir')
+        file_system.write('input_dir/file1.isxd', '')
+        pipeline = CIPipe.with_videos_from_directory(
+            'input_dir',
+            file_system=file_system,
+            isx=InMemoryISX(file_system),
+            clean_up_mode='deferred',
+        )
+
+        # When
+        pipeline.isx.preprocess_videos()
+        pipeline.isx.preprocess_videos()
+        pipeline.flush_clean_up()
+
+        # Then
+        clean_up_errors = pipeline.trace_as_json()['Main Branch']['clean_up_errors']
+        self.assertEqual(len(clean_up_errors), 1)
+        self.assertEqual(clean_up_errors[0]['path'], 'output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd')
+        self.assertIn('Permission denied', clean_up_errors[0]['error'])
+
+    def test_11_immediate_clean_up_raises_removal_errors(self):
+        # Given
+        file_system = ReadOnlyInMemoryFileSystem()
+        file_system.makedirs('input_dir')
+        file_system.write('input_dir/file1.isxd', '')
+        pipeline = CIPipe.with_videos_from_directory(
+            'input_dir',
+            file_system=file_system,
+            isx=InMemoryISX(file_system),
+        )
+        pipeline.isx.preprocess_videos()
+
+        # When / Then
+        with self.assertRaises(PermissionError):
+            pipeline.isx.preprocess_videos()
+
+    def test_12_removal_failures_of_the_last_step_are_recorded_in_trace_at_exit(self):
+        # Given
+        file_system = ReadOnlyInMemoryFileSystem()
+        file_system.makedirs('input_dir')
+        file_system.write('input_dir/file1.isxd', '')
+        with mock.patch('atexit.register') as register_at_exit:
+            pipeline = CIPipe.with_videos_from_directory(
+                'input_dir',
+                file_system=file_system,
+                isx=InMemoryISX(file_system),
+                clean_up_mode='background',
+            )
+        pipeline.isx.preprocess_videos()
+        pipeline.isx.preprocess_videos()
+
+        # When
+        exit_handler, = [call.args[0] for call in register_at_exit.call_args_list]
+        exit_handler()
+
+        # Then
+        clean_up_errors = pipeline.trace_as_json()['Main Branch']['clean_up_errors']
+        self.assertEqual([error['path'] for error in clean_up_errors],
+                         ['output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd'])
+
+    def test_13_an_output_kept_for_a_branch_is_removed_once_that_branch_supersedes_it(self):
+        # Given
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', '')
+        pipeline = CIPipe.with_videos_from_directory(
+            'input_dir',
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+        )
+        pipeline.isx.preprocess_videos()
+        branched_pipeline = pipeline.branch('Branch 2')
+        pipeline.isx.preprocess_videos()
+
+        # When
+        branched_pipeline.isx.preprocess_videos()
+
+        # Then
+        self.assertFalse(self._file_system.exists('output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd'))
+        self.assertTrue(self._file_system.exists('output/Main Branch - Step 2 - ISX Preprocess Videos/file1-PP-PP.isxd'))
+        self.assertTrue(self._file_system.exists('output/Branch 2 - Step 2 - ISX Preprocess Videos/file1-PP-PP.isxd'))
+
     def _assert_output_files(self, pipeline, key, expected_paths, file_system):
         output = pipeline.output(key)
         self.assertEqual(len(output), len(expected_paths))
@@ -2,6 +2,7 @@ import unittest
 
 from ci_pipe.errors.defaults_after_step_error import DefaultsAfterStepsError
 from ci_pipe.errors.output_key_not_found_error import OutputKeyNotFoundError
+from ci_pipe.errors.pending_steps_error import PendingStepsError
 from ci_pipe.errors.resume_execution_error import ResumeExecutionError
 from ci_pipe.pipeline import CIPipe
 from tests.ci_pipe_test_case import CIPipeTestCase
@@ -386,6 +387,169 @@ class PipelineTestCase(CIPipeTestCase):
         values = pipeline.values('numbers')
         self.assertListEqual(values, [1, 2, 3])
 
+    def test_28_a_resumed_pipeline_finds_latest_outputs_of_restored_steps(self):
+        # Given
+        pipeline_input = {'numbers': [0]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system)
+        pipeline.step("Add one", self.add_one)
+        pipeline.step("Add one with different key", self.add_one_with_different_key)
+        pipeline.step("Add one", self.add_one)
+
+        # When
+        resume_pipeline = CIPipe(pipeline_input, file_system=self._file_system)
+        resume_pipeline.step("Scale by 3", self.scale, factor=3)
+
+        # Then
+        self.assertEqual(resume_pipeline.values('numbers'), [6])
+        self.assertEqual(resume_pipeline.values('another_numbers'), [2])
+        self.assertCountEqual(resume_pipeline.all_keys(), ['numbers', 'another_numbers'])
+
+    def test_29_a_lazy_pipeline_does_not_execute_steps_until_run(self):
+        # Given
+        pipeline_input = {'numbers': [0]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, lazy=True)
+
+        # When
+        pipeline.step("Add one", self.add_one)
+        pipeline.step("Add another one", self.add_one)
+
+        # Then
+        self.assertEqual([step.name() for step in pipeline.pending_steps()], ["Add one", "Add another one"])
+        pipeline.run()
+        self.assertEqual(pipeline.pending_steps(), [])
+        self.assertEqual(pipeline.values('numbers'), [2])
+
+    def test_30_a_lazy_pipeline_produces_the_same_trace_as_an_eager_pipeline(self):
+        # Given
+        pipeline_input = {'numbers': [1, 2]}
+        eager_pipeline = CIPipe(pipeline_input, file_system=self._file_system, trace_path="eager_trace.json")
+        lazy_pipeline = CIPipe(pipeline_input, file_system=self._file_system, trace_path="lazy_trace.json", lazy=True)
+
+        # When
+        for pipeline in (eager_pipeline, lazy_pipeline):
+            pipeline.step("Scale by 2", self.scale, factor=2)
+            pipeline.step("Add one with different key", self.add_one_with_different_key)
+        lazy_pipeline.run()
+
+        # Then
+        self.assertEqual(lazy_pipeline.trace_as_json(), eager_pipeline.trace_as_json())
+
+    def test_31_a_lazy_pipeline_can_not_set_defaults_while_steps_are_pending(self):
+        # Given
+        pipeline_input = {'numbers': [1, 2, 3]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, lazy=True)
+        pipeline.step("Scale by default factor", self.scale)
+
+        # When / Then
+        with self.assertRaises(DefaultsAfterStepsError):
+            pipeline.set_defaults(factor=3)
+
+    def test_32_a_lazy_pipeline_runs_pending_steps_before_branching(self):
+        # Given
+        pipeline_input = {'numbers': [0]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, lazy=True)
+        pipeline.step("Add one", self.add_one)
+
+        # When
+        branch = pipeline.branch("New Branch")
+        branch.step("Add another one", self.add_one).run()
+
+        # Then
+        self.assertEqual(pipeline.values('numbers'), [1])
+        self.assertEqual(branch.values('numbers'), [2])
+
+    def test_33_a_pipeline_joins_keys_by_id(self):
+        # Given
+        pipeline_input = {'numbers': [1, 2]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system)
+        pipeline.step("Copy numbers", self.copy_numbers_to, 'another_numbers', 'more_numbers')
+
+        # When
+        rows = pipeline.join_keys('numbers', 'another_numbers', 'more_numbers')
+
+        # Then
+        ids = [entry['ids'] for entry in pipeline.output('numbers')]
+        self.assertEqual(rows, [(ids[0], 1, 1, 1), (ids[1], 2, 2, 2)])
+
+    def test_34_joining_keys_matches_many_entries_with_the_same_ids_and_skips_unmatched_ones(self):
+        # Given
+        pipeline_input = {'numbers': [1, 2]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system)
+        pipeline.step("Two planes for first number", self.two_planes_for_first_number)
+
+        # When
+        pairs = pipeline.associate_keys_by_id('numbers', 'planes')
+        groups = pipeline.group_keys_by_id('numbers', 'planes')
+
+        # Then
+        first_ids = pipeline.output('numbers')[0]['ids']
+        self.assertEqual(pairs, [(first_ids, 1, 'plane 0'), (first_ids, 1, 'plane 1')])
+        self.assertEqual(groups, {tuple(first_ids): ([1], ['plane 0', 'plane 1'])})
+
+    def test_35_a_pipeline_records_step_metrics_only_when_enabled(self):
+        # Given
+        pipeline_input = {'numbers': [0]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, trace_path="trace.json")
+        measured_pipeline = CIPipe(pipeline_input, file_system=self._file_system, trace_path="measured_trace.json",
+                                   metrics_enabled=True)
+
+        # When
+        pipeline.step("Add one", self.add_one)
+        measured_pipeline.step("Add one", self.add_one)
+
+        # Then
+        self.assertNotIn("metrics", pipeline.trace_as_json()["Main Branch"]["steps"][0])
+        metrics = measured_pipeline.trace_as_json()["Main Branch"]["steps"][0]["metrics"]
+        self.assertCountEqual(
+            metrics.keys(),
+            ["wall_time", "cpu_time", "peak_rss_increase", "bytes_read", "bytes_written", "inputs", "cached"],
+        )
+
+    def test_36_a_lazy_pipeline_can_not_read_outputs_while_steps_are_pending(self):
+        # Given
+        pipeline_input = {'numbers': [1, 2]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, lazy=True)
+
+        # When
+        pipeline.step("Multiply by two", self.multiply_by_two)
+
+        # Then
+        with self.assertRaises(PendingStepsError):
+            pipeline.values('numbers')
+        self.assertEqual(pipeline.run().values('numbers'), [2, 4])
+
+    def test_37_a_lazy_pipeline_keeps_a_failed_step_pending_and_runs_it_again(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, lazy=True)
+        self._add_one_fails = True
+        pipeline.step("Add one", self.add_one_unless_failing)
+        pipeline.step("Multiply by two", self.multiply_by_two)
+        with self.assertRaises(RuntimeError):
+            pipeline.run()
+
+        # When
+        self._add_one_fails = False
+        pipeline.run()
+
+        # Then
+        self.assertEqual(pipeline.values('numbers'), [4])
+        self.assertEqual([step['name'] for step in pipeline.trace_as_json()['Main Branch']['steps']],
+                         ["Add one", "Multiply by two"])
+
+    # Step functions
+
+    def add_one_unless_failing(self, inputs):
+        if self._add_one_fails:
+            raise RuntimeError("add one failed")
+        return self.add_one(inputs)
+
+    def copy_numbers_to(self, inputs, *keys):
+        return {key: [dict(entry) for entry in inputs('numbers')] for key in keys}
+
+    def two_planes_for_first_number(self, inputs):
+        first_ids = inputs('numbers')[0]['ids']
+        return {'planes': [{'ids': first_ids, 'value': f'plane {plane}'} for plane in range(2)]}
 
 
 if __name__ == '__main__':
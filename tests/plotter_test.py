@@ -112,6 +112,34 @@ class PlotterTestCase(CIPipeTestCase):
         out = self._out()
         self.assertIn("Branch 'NonExistent' not found", out)
 
+    def test_04_plotter_prints_hot_spots_sorted_by_metric(self):
+        # Given
+        pipeline = CIPipe({'numbers': [0]}, file_system=self._file_system, metrics_enabled=True)
+        pipeline.step("Add one", self.add_one)
+        pipeline.step("Multiply by two", self.multiply_by_two)
+        first_step, second_step = pipeline._trace.steps_from("Main Branch")
+        first_step.metrics().update(wall_time=1.0, cpu_time=3.0)
+        second_step.metrics().update(wall_time=2.0, cpu_time=0.5)
+
+        # When
+        self._plotter.get_hot_spots_from_branch(pipeline._trace, "Main Branch", sort_by="cpu_time")
+
+        # Then
+        out = self._out()
+        self.assertIn("Hot spots of branch: Main Branch (sorted by cpu_time)", out)
+        self.assertLess(out.index("1. Add one"), out.index("2. Multiply by two"))
+
+    def test_05_plotter_handles_invalid_hot_spots_metric(self):
+        # Given
+        pipeline = CIPipe({'numbers': [0]}, file_system=self._file_system, metrics_enabled=True)
+        pipeline.step("Add one", self.add_one)
+
+        # When
+        self._plotter.get_hot_spots_from_branch(pipeline._trace, "Main Branch", sort_by="color")
+
+        # Then
+        self.assertIn("Can not sort by 'color'", self._out())
+
     def _expected_output_directory(self) -> str:
         return "output"
 
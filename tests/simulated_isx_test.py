@@ -0,0 +1,71 @@
+import time
+import unittest
+
+from ci_pipe.pipeline import CIPipe
+from external_dependencies.isx.simulated_isx import SimulatedISX
+from tests.ci_pipe_test_case import CIPipeTestCase
+
+
+class SimulatedISXTestCase(CIPipeTestCase):
+    def test_01_simulated_isx_writes_outputs_sized_after_their_inputs(self):
+        # Given
+        self._initialize_directory_with_two_videos(sizes=[1000, 2000])
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=SimulatedISX(self._file_system),
+        )
+
+        # When
+        pipeline.isx.motion_correction_videos()
+        pipeline.isx.extract_neurons_pca_ica()
+
+        # Then
+        self.assertEqual(self._sizes_of(pipeline.values('videos-isxd')), [1000, 2000])
+        self.assertEqual(self._sizes_of(pipeline.values('cellsets-isxd')), [50, 100])
+
+    def test_02_simulated_isx_uses_the_given_size_ratios_and_sparse_outputs(self):
+        # Given
+        self._initialize_directory_with_two_videos(sizes=[1000, 2000])
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=SimulatedISX(self._file_system, size_ratios={"preprocess": 0.5}, sparse=True),
+        )
+
+        # When
+        pipeline.isx.preprocess_videos()
+
+        # Then
+        self.assertEqual(self._sizes_of(pipeline.values('videos-isxd')), [500, 1000])
+        self.assertEqual(self._file_system.read(pipeline.values('videos-isxd')[0]), "\0" * 500)
+
+    def test_03_simulated_isx_waits_the_latency_of_each_operation(self):
+        # Given
+        self._initialize_directory_with_two_videos(sizes=[10, 10])
+        pipeline = CIPipe.with_videos_from_directory(
+            "input_dir",
+            file_system=self._file_system,
+            isx=SimulatedISX(self._file_system, latencies={"spatial_filter": SimulatedISX.uniform(0.02, 0.03)},
+                             seed=1),
+        )
+
+        # When
+        started = time.perf_counter()
+        pipeline.isx.bandpass_filter_videos()
+        elapsed = time.perf_counter() - started
+
+        # Then
+        self.assertGreaterEqual(elapsed, 0.04)
+
+    def _initialize_directory_with_two_videos(self, sizes):
+        self._file_system.makedirs('input_dir')
+        for index, size in enumerate(sizes, start=1):
+            self._file_system.write(f'input_dir/file{index}.isxd', "x" * size)
+
+    def _sizes_of(self, paths):
+        return [self._file_system.size(path) for path in paths]
+
+
+if __name__ == '__main__':
+    unittest.main()
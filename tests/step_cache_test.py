@@ -0,0 +1,249 @@
+import unittest
+
+from ci_pipe.cache.step_cache import StepCache
+from ci_pipe.pipeline import CIPipe
+from external_dependencies.isx.in_memory_isx import InMemoryISX
+from tests.ci_pipe_test_case import CIPipeTestCase
+
+
+class StepCacheTestCase(CIPipeTestCase):
+    def setUp(self):
+        super().setUp()
+        self._step_cache = StepCache(self._file_system, "cache")
+        self._executions = 0
+
+    def test_01_a_step_with_same_params_and_inputs_is_not_executed_again_in_another_branch(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, step_cache=self._step_cache)
+        new_pipeline_branch = pipeline.branch("Secondary Branch")
+
+        # When
+        pipeline.step("Counted scale", self.counted_scale, factor=2)
+        new_pipeline_branch.step("Counted scale", self.counted_scale, factor=2)
+
+        # Then
+        self.assertEqual(self._executions, 1)
+        self.assertEqual(new_pipeline_branch.values('numbers'), [2])
+        self.assertEqual(new_pipeline_branch.trace_as_json()["Secondary Branch"]["steps"][0]["params"], {'factor': 2})
+
+    def test_02_a_step_with_different_params_is_executed_again(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, step_cache=self._step_cache)
+        new_pipeline_branch = pipeline.branch("Secondary Branch")
+
+        # When
+        pipeline.step("Counted scale", self.counted_scale, factor=2)
+        new_pipeline_branch.step("Counted scale", self.counted_scale, factor=3)
+
+        # Then
+        self.assertEqual(self._executions, 2)
+        self.assertEqual(new_pipeline_branch.values('numbers'), [3])
+
+    def test_03_a_step_whose_input_files_changed_is_executed_again(self):
+        # Given
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', 'original')
+        first_pipeline = CIPipe.with_videos_from_directory(
+            'input_dir', file_system=self._file_system, trace_path="first_trace.json", step_cache=self._step_cache,
+        )
+        first_pipeline.step("Counted copy", self.counted_copy)
+
+        # When
+        self._file_system.write('input_dir/file1.isxd', 'modified')
+        second_pipeline = CIPipe.with_videos_from_directory(
+            'input_dir', file_system=self._file_system, trace_path="second_trace.json", step_cache=self._step_cache,
+        )
+        second_pipeline.step("Counted copy", self.counted_copy)
+
+        # Then
+        self.assertEqual(self._executions, 2)
+
+    def test_04_cached_output_files_are_materialized_in_the_new_step_directory_after_clean_up(self):
+        # Given
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', '')
+        pipeline = CIPipe.with_videos_from_directory(
+            'input_dir',
+            file_system=self._file_system,
+            isx=InMemoryISX(self._file_system),
+            step_cache=self._step_cache,
+        )
+        new_pipeline_branch = pipeline.branch("Secondary Branch")
+        pipeline.isx.preprocess_videos()
+        pipeline.isx.bandpass_filter_videos()
+
+        # When
+        new_pipeline_branch.isx.preprocess_videos()
+
+        # Then
+        self.assertFalse(self._file_system.exists('output/Main Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd'))
+        self.assertEqual(
+            new_pipeline_branch.values('videos-isxd'),
+            ['output/Secondary Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd'],
+        )
+        self.assertTrue(self._file_system.exists('output/Secondary Branch - Step 1 - ISX Preprocess Videos/file1-PP.isxd'))
+
+    def test_05_input_files_are_hashed_again_only_after_they_change(self):
+        # Given
+        hashed_paths = []
+        content_hash = self._file_system.content_hash
+        self._file_system.content_hash = lambda path: hashed_paths.append(path) or content_hash(path)
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', 'original')
+        pipeline = CIPipe.with_videos_from_directory(
+            'input_dir', file_system=self._file_system, step_cache=self._step_cache,
+        )
+        pipeline.branch("Secondary Branch").step("Counted copy", self.counted_copy)
+
+        # When
+        pipeline.branch("Third Branch").step("Counted copy", self.counted_copy)
+        self._file_system.write('input_dir/file1.isxd', 'modified')
+        StepCache(self._file_system, "cache").lookup("Counted copy", self.counted_copy, (), {}, pipeline.output, "output")
+
+        # Then
+        self.assertEqual(self._executions, 1)
+        self.assertEqual(hashed_paths, ['input_dir/file1.isxd', 'input_dir/file1.isxd'])
+
+    def test_06_a_step_with_the_same_name_and_params_but_another_function_is_executed(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, step_cache=self._step_cache)
+        new_pipeline_branch = pipeline.branch("Secondary Branch")
+
+        # When
+        pipeline.step("Counted step", self.counted_scale, factor=2)
+        new_pipeline_branch.step("Counted step", self.counted_add, factor=2)
+
+        # Then
+        self.assertEqual(self._executions, 2)
+        self.assertEqual(new_pipeline_branch.values('numbers'), [3])
+
+    def test_07_input_paths_passed_through_by_a_step_are_not_copied_into_the_cache(self):
+        # Given
+        self._file_system.makedirs('input_dir')
+        self._file_system.write('input_dir/file1.isxd', '')
+        pipeline = CIPipe.with_videos_from_directory(
+            'input_dir', file_system=self._file_system, step_cache=self._step_cache,
+        )
+        new_pipeline_branch = pipeline.branch("Secondary Branch")
+        pipeline.step("Counted copy", self.counted_copy)
+
+        # When
+        new_pipeline_branch.step("Counted copy", self.counted_copy)
+
+        # Then
+        self.assertEqual(self._executions, 1)
+        self.assertEqual(new_pipeline_branch.values('copies'), ['input_dir/file1.isxd'])
+        self.assertFalse(any(path.endswith('file1.isxd') for path in self._file_system.listdir('cache')))
+
+    def test_08_pruning_evicts_the_least_recently_used_entries_over_the_size_limit(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, step_cache=self._step_cache)
+        new_pipeline_branch = pipeline.branch("Secondary Branch")
+        pipeline.step("Write file", self.file_writer(pipeline), content='a' * 10)
+        pipeline.step("Write file", self.file_writer(pipeline), content='b' * 20)
+        new_pipeline_branch.step("Write file", self.file_writer(new_pipeline_branch), content='a' * 10)
+
+        # When
+        removed_entries = self._step_cache.prune(max_bytes=25)
+
+        # Then
+        self.assertEqual(removed_entries, 1)
+        self.assertEqual(self._step_cache.size(), 10)
+        self.assertEqual(self._executions, 2)
+
+    def test_09_pruning_does_not_remove_files_of_directories_that_only_share_the_cache_prefix(self):
+        # Given
+        pipeline_input = {'paths': ['cache2/file.isxd']}
+        self._file_system.makedirs('cache2')
+        self._file_system.write('cache2/file.isxd', 'content')
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, step_cache=self._step_cache)
+        pipeline.step("Counted pass through", self.counted_pass_through)
+
+        # When
+        self._step_cache.prune(max_bytes=0)
+
+        # Then
+        self.assertTrue(self._file_system.exists('cache2/file.isxd'))
+
+    # Pipeline step functions
+
+    def test_10_a_step_restored_from_the_cache_records_its_metrics_as_cached(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, step_cache=self._step_cache,
+                          metrics_enabled=True)
+        new_pipeline_branch = pipeline.branch("Secondary Branch")
+        pipeline.step("Counted scale", self.counted_scale, factor=2)
+
+        # When
+        new_pipeline_branch.step("Counted scale", self.counted_scale, factor=2)
+
+        # Then
+        metrics = new_pipeline_branch.trace_as_json()["Secondary Branch"]["steps"][0]["metrics"]
+        self.assertTrue(metrics["cached"])
+        self.assertGreaterEqual(metrics["wall_time"], 0)
+        self.assertEqual(metrics["bytes_read"], 0)
+
+    def test_11_a_step_with_different_positional_args_is_executed_again(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, step_cache=self._step_cache)
+        new_pipeline_branch = pipeline.branch("Secondary Branch")
+
+        # When
+        pipeline.step("Counted scale", self.counted_positional_scale, 2)
+        new_pipeline_branch.step("Counted scale", self.counted_positional_scale, 3)
+
+        # Then
+        self.assertEqual(self._executions, 2)
+        self.assertEqual(pipeline.values('numbers'), [2])
+        self.assertEqual(new_pipeline_branch.values('numbers'), [3])
+
+    def test_12_steps_without_files_leave_no_empty_step_directories(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, step_cache=self._step_cache)
+        new_pipeline_branch = pipeline.branch("Secondary Branch")
+
+        # When
+        pipeline.step("Counted scale", self.counted_scale, factor=2)
+        new_pipeline_branch.step("Counted scale", self.counted_scale, factor=2)
+
+        # Then
+        self.assertFalse(self._file_system.exists('output/Main Branch - Step 1 - Counted scale'))
+        self.assertFalse(self._file_system.exists('output/Secondary Branch - Step 1 - Counted scale'))
+
+    def counted_scale(self, inputs, *, factor=1):
+        self._executions += 1
+        return self.scale(inputs, factor=factor)
+
+    def counted_positional_scale(self, inputs, factor):
+        return self.counted_scale(inputs, factor=factor)
+
+    def counted_add(self, inputs, *, factor=1):
+        self._executions += 1
+        return {'numbers': [{'ids': x['ids'], 'value': x['value'] + factor} for x in inputs('numbers')]}
+
+    def counted_pass_through(self, inputs):
+        self._executions += 1
+        return {'paths': inputs('paths')}
+
+    def file_writer(self, pipeline):
+        def write_file(inputs, *, content=''):
+            self._executions += 1
+            output_path = self._file_system.join(pipeline.create_output_directory_for_next_step("Write file"), 'file.txt')
+            self._file_system.write(output_path, content)
+            return {'files': [{'ids': inputs('numbers')[0]['ids'], 'value': output_path}]}
+        return write_file
+
+    def counted_copy(self, inputs):
+        self._executions += 1
+        return {'copies': [{'ids': x['ids'], 'value': x['value']} for x in inputs('videos-isxd')]}
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import hashlib
+import json
 import unittest
 
 from ci_pipe.pipeline import CIPipe
 from ci_pipe.schema_validator import SchemaValidator
+from ci_pipe.trace.trace_repository import TraceRepository
 from tests.ci_pipe_test_case import CIPipeTestCase
 
 
@@ -182,6 +184,123 @@ class TraceTestCase(CIPipeTestCase):
         # Then
         self.assertTrue(pipeline.assert_trace_is_valid())
 
+    def test_05_a_journaled_pipeline_generates_the_same_trace_as_a_regular_pipeline(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        regular_pipeline = CIPipe(pipeline_input, file_system=self._file_system, trace_path="regular.json")
+        journaled_pipeline = CIPipe(pipeline_input, file_system=self._file_system, trace_path="journaled.json",
+                                    trace_journal_enabled=True)
+
+        # When
+        for pipeline in (regular_pipeline, journaled_pipeline):
+            pipeline.step("Add one", self.add_one)
+            branched_pipeline = pipeline.branch("Secondary Branch")
+            branched_pipeline.step("Add one", self.add_one)
+
+        # Then
+        self.assertEqual(regular_pipeline.trace_as_json(), journaled_pipeline.trace_as_json())
+        self.assertFalse(self._file_system.exists("journaled.json"))
+
+    def test_06_a_journaled_pipeline_appends_only_new_steps_to_the_journal(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, trace_journal_enabled=True)
+
+        # When
+        pipeline.step("Add one", self.add_one)
+        pipeline.branch("Secondary Branch").step("Add one", self.add_one)
+        pipeline.step("Add one", self.add_one)
+
+        # Then
+        self.assertEqual(len(pipeline.trace_as_json()["Secondary Branch"]["steps"]), 2)
+        journal_lines = self._file_system.read("trace.json.journal").splitlines()
+        self.assertEqual(len(journal_lines), 5)
+        self.assertEqual(json.loads(journal_lines[-1])["start"], 1)
+        self.assertEqual(len(json.loads(journal_lines[-1])["steps"]), 1)
+
+    def test_07_compacting_a_journaled_trace_exports_a_valid_trace_file(self):
+        # Given
+        pipeline_input = {'numbers': [0]}
+        self._trace_builder.with_inputs(
+            {
+                "numbers": [
+                    {
+                        "ids": [hashlib.sha256(("numbers" + str(0)).encode()).hexdigest()],
+                        "value": 0
+                    }
+                ]
+            }
+        ).with_outputs_directory(
+            self._expected_output_directory()).with_empty_branch().with_steps_in_branch(
+            {
+                "index": 1,
+                "name": "Add one",
+                "params": {},
+                "outputs": {
+                    "numbers": [
+                        {
+                            "ids": [hashlib.sha256(("numbers" + str(0)).encode()).hexdigest()],
+                            "value": 1
+                        }
+                    ]
+                }
+            }
+        )
+        validator = SchemaValidator.new_for(self._trace_builder)
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system, outputs_directory='output',
+                          trace_journal_enabled=True)
+        pipeline.step("Add one", self.add_one)
+
+        # When
+        pipeline.compact_trace()
+
+        # Then
+        self.assertTrue(validator.validate(json.loads(self._file_system.read("trace.json"))))
+        self.assertEqual(self._file_system.read("trace.json.journal"), "")
+
+    def test_08_trace_queries_reuse_the_in_memory_trace_while_the_trace_file_is_unchanged(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system)
+        pipeline.step("Add one", self.add_one)
+        repository = TraceRepository(self._file_system, "trace.json")
+
+        # When
+        first_trace = repository.load()
+        second_trace = repository.load()
+
+        # Then
+        self.assertIs(first_trace, second_trace)
+        self.assertEqual(repository.generation(), 1)
+
+    def test_09_trace_queries_reload_the_trace_after_the_trace_file_changes(self):
+        # Given
+        pipeline_input = {'numbers': [1]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system)
+        repository = TraceRepository(self._file_system, "trace.json")
+        trace_before_step = repository.load()
+
+        # When
+        pipeline.step("Add one", self.add_one)
+        trace_after_step = repository.load()
+
+        # Then
+        self.assertIsNot(trace_before_step, trace_after_step)
+        self.assertEqual(len(trace_after_step.steps_from("Main Branch")), 1)
+
+    def test_10_changing_the_trace_as_json_does_not_change_the_pipeline(self):
+        # Given
+        pipeline_input = {'numbers': [1, 2]}
+        pipeline = CIPipe(pipeline_input, file_system=self._file_system)
+        pipeline.step("Multiply by two", self.multiply_by_two)
+
+        # When
+        pipeline.trace_as_json()['Main Branch']['steps'][0]['outputs']['numbers'][0]['value'] = 999
+
+        # Then
+        self.assertEqual(pipeline.values('numbers'), [2, 4])
+        self.assertEqual(pipeline.trace_as_json()['Main Branch']['steps'][0]['outputs']['numbers'][0]['value'], 2)
+
     def _expected_output_directory(self) -> str:
         return "output"
 